@@ -0,0 +1,98 @@
+"""
+ONNX 인코더 정합성/처리량 검증 도구
+onnxruntime 인코더(int8, 있으면 float32)의 임베딩이 저장소의 PyTorch 임베딩과 얼마나 같은지
+코사인 유사도와 검색 recall@k로 확인하고, 배치 크기별 처리량(texts/sec)을 PyTorch와 비교합니다.
+저장소 청크 임베딩은 생성 스크립트가 PyTorch로 만든 값이므로 torch 없이도 정합성을 확인할 수 있습니다.
+
+사용법:
+    python check_onnx_encoder.py [PKL ...] [--samples 256] [--k 10] [--batch-sizes 1 8 32]
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+
+from vector_store import load_vectorstore, vectorstore_exists
+from onnx_encoder import OnnxEncoder, onnx_model_dir, ONNX_FP32_FILE
+from check_quantization import PKL_FILES
+
+
+def load_encoders(model_name: str) -> dict:
+    """비교할 인코더 {이름: 인코더} (int8 필수, float32와 PyTorch는 있으면 포함)"""
+    encoders = {'onnx-int8': OnnxEncoder.load(model_name, quantized=True)}
+    if os.path.exists(os.path.join(onnx_model_dir(model_name), ONNX_FP32_FILE)):
+        encoders['onnx-fp32'] = OnnxEncoder.load(model_name, quantized=False)
+    try:
+        from sentence_transformers import SentenceTransformer
+        encoders['torch'] = SentenceTransformer(model_name, device='cpu')
+    except Exception as e:
+        print(f"[WARNING] PyTorch 모델 없음, 저장소 임베딩과만 비교: {e}")
+    return encoders
+
+
+def parity(store, encoders: dict, rows: np.ndarray, k: int) -> None:
+    """저장소 PyTorch 임베딩 대비 코사인 유사도와 recall@k (청크 텍스트를 쿼리로 사용)"""
+    texts = [store.texts[int(row)] for row in rows]
+    reference = store.dense_embeddings()[rows]
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    ref_top = np.argsort(-store.scores(reference), axis=1)[:, :k]
+
+    header = f"{'인코더':<10} {'cos 평균':>9} {'cos 최소':>9} {'cos p1':>8} {'R@' + str(k):>7}"
+    print(header)
+    print("-" * len(header))
+    for name, encoder in encoders.items():
+        embeddings = encoder.encode(texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True)
+        cosines = np.sum(embeddings * reference, axis=1)
+        top = np.argsort(-store.scores(embeddings), axis=1)[:, :k]
+        recall = np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, top)])
+        print(f"{name:<10} {cosines.mean():>9.4f} {cosines.min():>9.4f} {np.percentile(cosines, 1):>8.4f} {recall:>7.3f}")
+
+
+def throughput(encoders: dict, texts: list, batch_sizes) -> None:
+    """배치 크기별 처리량 (texts/sec, 예열 후 측정)"""
+    header = f"{'인코더':<10} " + " ".join(f"{'배치 ' + str(b):>10}" for b in batch_sizes)
+    print(header)
+    print("-" * len(header))
+    for name, encoder in encoders.items():
+        encoder.encode(texts[:8], batch_size=8)
+        cells = []
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+            cells.append(len(texts) / (time.perf_counter() - start))
+        print(f"{name:<10} " + " ".join(f"{cell:>10.1f}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX 인코더 정합성/처리량 검증")
+    parser.add_argument('pkl_files', nargs='*', default=PKL_FILES)
+    parser.add_argument('--samples', type=int, default=256, help="저장소별 비교할 청크 수")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    encoders = {}
+    for pkl_file in args.pkl_files:
+        if not vectorstore_exists(pkl_file):
+            print(f"❌ 파일이 존재하지 않습니다: {pkl_file}")
+            continue
+
+        store = load_vectorstore(pkl_file)
+        print(f"\n📁 {os.path.basename(pkl_file)}: {store}")
+        try:
+            encoders = encoders or load_encoders(store.model_name)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return
+
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(len(store), size=min(args.samples, len(store)), replace=False))
+        parity(store, encoders, rows, args.k)
+
+        print(f"\n⏱️ 처리량 (texts/sec, 청크 {len(rows)}개)")
+        throughput(encoders, [store.texts[int(row)] for row in rows], args.batch_sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+임베딩 양자화 검증 도구
+float16 / int8 저장 시 float32 원본 대비 검색 순위가 유지되는지 recall@k로 확인합니다.
+쿼리는 search_comprehensive_violation_cases가 조문별로 생성하는 쿼리와 동일합니다.
+"""
+
+import os
+import argparse
+import numpy as np
+
+from vector_store import load_vectorstore, evaluate_quantization_recall, vectorstore_exists
+from search_queries import build_article_search_queries
+
+PKL_FILES = [
+    'enhanced_vectorstore_20250914_101739.pkl',
+    '3. 지방자치단체의 재의·제소 조례 모음집(Ⅸ) (1)_new_vectorstore.pkl'
+]
+
+# 검증용 조문 샘플 (분야별 쿼리 분기가 모두 나오도록 구성)
+SAMPLE_ARTICLES = [
+    {'article_number': '1', 'article_title': '목적', 'content': '이 조례는 주차장의 설치 및 관리에 관한 사항을 규정함을 목적으로 한다.'},
+    {'article_number': '3', 'article_title': '건축허가 기준', 'content': '시장은 건축허가 신청 시 법률 및 시행령에서 정하지 않은 서류를 추가로 요구할 수 있다.'},
+    {'article_number': '5', 'article_title': '환경보전 조치', 'content': '시장은 대기오염 사업장에 대하여 영업 정지를 명령하고 처분할 권한을 가진다.'},
+    {'article_number': '7', 'article_title': '도시계획위원회', 'content': '용도지역의 지정 및 변경에 관한 사항은 위원회의 승인을 받아야 한다.'},
+    {'article_number': '9', 'article_title': '과태료', 'content': '제5조를 위반한 자에게는 100만원 이하의 과태료를 부과한다.'},
+]
+
+
+def build_query_vectors(model_name: str, use_self_queries: bool, store, num_self_queries: int = 200) -> np.ndarray:
+    """조문 쿼리 임베딩 생성 (모델이 없으면 저장소 청크 임베딩을 쿼리로 사용)"""
+    queries = list(dict.fromkeys(
+        query for article in SAMPLE_ARTICLES for query in build_article_search_queries(article)
+    ))
+
+    if not use_self_queries:
+        try:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+            print(f"[INFO] 조문 쿼리 {len(queries)}개 임베딩 ({model_name})")
+            return model.encode(queries, convert_to_numpy=True, normalize_embeddings=True)
+        except Exception as e:
+            print(f"[WARNING] 모델 로드 실패, 청크 임베딩을 쿼리로 사용: {e}")
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(store), size=min(num_self_queries, len(store)), replace=False)
+    print(f"[INFO] 청크 임베딩 {len(rows)}개를 쿼리로 사용")
+    return store.dense_embeddings()[np.sort(rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 양자화 recall@k 검증")
+    parser.add_argument('pkl_files', nargs='*', default=PKL_FILES)
+    parser.add_argument('--self-queries', action='store_true', help="모델 없이 청크 임베딩을 쿼리로 사용")
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10])
+    args = parser.parse_args()
+
+    for pkl_file in args.pkl_files:
+        if not vectorstore_exists(pkl_file):
+            print(f"❌ 파일이 존재하지 않습니다: {pkl_file}")
+            continue
+
+        store = load_vectorstore(pkl_file)
+        print(f"\n📁 {os.path.basename(pkl_file)}: {store}")
+
+        query_vectors = build_query_vectors(store.model_name, args.self_queries, store)
+        report = evaluate_quantization_recall(store, query_vectors, ks=tuple(args.k))
+
+        header = f"{'타입':<8} {'임베딩(KB)':>10} " + " ".join(f"{'R@' + str(k):>7} {'순위@' + str(k):>7}" for k in args.k)
+        print(header)
+        print("-" * len(header))
+        for row in report:
+            cells = " ".join(f"{row[f'recall@{k}']:>7.3f} {row[f'same_ranking@{k}']:>7.3f}" for k in args.k)
+            print(f"{row['dtype']:<8} {row['embedding_bytes'] / 1024:>10.1f} {cells}")
+
+
+if __name__ == "__main__":
+    main()
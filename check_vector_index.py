@@ -0,0 +1,157 @@
+"""
+벡터 색인 recall/지연 시간 검증 도구
+HNSW 색인의 ef별, FAISS IVF-PQ 색인의 nprobe별, PCA 2단계 검색의 축소 차원별
+recall@k와 쿼리당 검색 시간, 메모리를 전수 내적(exact)과 비교합니다.
+쿼리는 저장소의 쿼리 임베딩 뱅크가 있으면 그것을, 없으면 check_quantization과 같은 조문 쿼리를 사용합니다.
+--scale N [...]을 주면 저장소 임베딩에 잡음을 더해 N개로 늘린 합성 저장소에서도 측정하고,
+마지막에 저장소 크기별 지연 시간 곡선을 출력합니다.
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+
+from vector_store import VectorStore, load_vectorstore, vectorstore_exists
+from vector_index import (ExactIndex, HNSWIndex, FaissFlatIndex, FaissIVFPQIndex, PCAIndex,
+                          HNSW_M, HNSW_EF_CONSTRUCTION, IVFPQ_REFINE, PCA_CANDIDATES)
+from query_bank import QUERY_BANK_FILE
+from check_quantization import PKL_FILES, build_query_vectors
+
+
+def load_query_vectors(store: VectorStore, use_self_queries: bool) -> np.ndarray:
+    """쿼리 임베딩 뱅크 (없으면 조문 쿼리 또는 청크 임베딩)"""
+    bank_path = os.path.join(store.store_dir, QUERY_BANK_FILE) if store.store_dir else None
+    if not use_self_queries and bank_path and os.path.exists(bank_path):
+        queries = np.load(bank_path)
+        print(f"[INFO] 쿼리 임베딩 뱅크 {len(queries)}개를 쿼리로 사용")
+        return queries
+    return build_query_vectors(store.model_name, use_self_queries, store)
+
+
+def scaled_store(store: VectorStore, size: int, noise: float = 0.05) -> VectorStore:
+    """저장소 임베딩에 가우시안 잡음을 더해 size개로 늘린 합성 저장소 (텍스트 없음)"""
+    rng = np.random.default_rng(0)
+    base = store.dense_embeddings()
+    rows = rng.integers(0, len(base), size=size)
+    embeddings = base[rows] + rng.normal(scale=noise, size=(size, base.shape[1])).astype(np.float32)
+    return VectorStore.from_columns(embeddings, [''] * size, meta=dict(store.meta))
+
+
+def time_per_query(index, queries: np.ndarray, k: int, repeat: int = 3) -> float:
+    """쿼리 1개씩 검색할 때의 평균 시간 (ms)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query[None, :], k)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries) * 1000
+
+
+def index_bytes(index) -> int:
+    """색인이 메모리에 두는 크기 (exact는 임베딩 행렬)"""
+    if isinstance(index, HNSWIndex):
+        return int(index.graph.index_file_size())
+    if isinstance(index, FaissFlatIndex):
+        import faiss
+        return int(len(faiss.serialize_index(index.index)))
+    if isinstance(index, PCAIndex):
+        return int(index.reduced.nbytes + index.projection.nbytes)
+    return int(index.store.embeddings.nbytes)
+
+
+def report(store: VectorStore, queries: np.ndarray, k: int, efs, M: int, ef_construction: int,
+           nprobes=(), refine: int = IVFPQ_REFINE, pca_dims=(), pca_candidates: int = PCA_CANDIDATES) -> dict:
+    """색인별 recall@k / 지연 시간 표 출력, {색인 이름: ms/쿼리} 반환"""
+    exact = ExactIndex(store)
+    ref_ids, _ = exact.search(queries, k)
+    exact_ms = time_per_query(exact, queries, k)
+
+    # (이름, 색인, 검색 파라미터 설정 함수) 목록
+    runs = []
+    if efs:
+        start = time.perf_counter()
+        hnsw = HNSWIndex.build(store, M=M, ef_construction=ef_construction)
+        print(f"[INFO] HNSW 생성 {time.perf_counter() - start:.2f}초 (M={M}, ef_construction={ef_construction})")
+        for ef in efs:
+            runs.append((f"hnsw ef={ef}", hnsw, lambda index, ef=ef: setattr(index, 'ef', ef)))
+
+    if nprobes:
+        try:
+            start = time.perf_counter()
+            ivfpq = FaissIVFPQIndex.build(store, refine=refine)
+            print(f"[INFO] IVF-PQ 생성 {time.perf_counter() - start:.2f}초 ({ivfpq.params()})")
+            for nprobe in nprobes:
+                runs.append((f"ivfpq np={nprobe}", ivfpq, lambda index, nprobe=nprobe: setattr(index, 'nprobe', nprobe)))
+        except ImportError as e:
+            print(f"[WARNING] faiss 없음, IVF-PQ 생략: {e}")
+
+    for dims in pca_dims:
+        start = time.perf_counter()
+        pca = PCAIndex.build(store, dims=dims, candidates=pca_candidates)
+        print(f"[INFO] PCA {dims}차원 생성 {time.perf_counter() - start:.2f}초")
+        runs.append((f"pca d={dims}", pca, lambda index: None))
+
+    header = f"{'색인':<14} {'R@' + str(k):>7} {'ms/쿼리':>9} {'속도비':>7} {'메모리(MB)':>10}"
+    print(header)
+    print("-" * len(header))
+    print(f"{'exact':<14} {1.0:>7.3f} {exact_ms:>9.3f} {1.0:>7.1f} {index_bytes(exact) / 2**20:>10.1f}")
+    latencies = {'exact': exact_ms}
+    for name, index, configure in runs:
+        configure(index)
+        ids, _ = index.search(queries, k)
+        recall = np.mean([len(set(r) & set(c)) / len(r) for r, c in zip(ref_ids, ids)])
+        ms = time_per_query(index, queries, k)
+        latencies[name] = ms
+        print(f"{name:<14} {recall:>7.3f} {ms:>9.3f} {exact_ms / ms:>7.1f} {index_bytes(index) / 2**20:>10.1f}")
+    return latencies
+
+
+def print_latency_curve(curve: dict) -> None:
+    """저장소 크기별 쿼리당 검색 시간 (ms)"""
+    names = list(dict.fromkeys(name for latencies in curve.values() for name in latencies))
+    header = f"{'청크 수':>10} " + " ".join(f"{name:>13}" for name in names)
+    print(header)
+    print("-" * len(header))
+    for size, latencies in curve.items():
+        print(f"{size:>10,} " + " ".join(f"{latencies.get(name, float('nan')):>13.3f}" for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 색인 recall@k / 지연 시간 검증")
+    parser.add_argument('pkl_files', nargs='*', default=PKL_FILES)
+    parser.add_argument('--self-queries', action='store_true', help="모델 없이 청크 임베딩을 쿼리로 사용")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--M', type=int, default=HNSW_M)
+    parser.add_argument('--ef-construction', type=int, default=HNSW_EF_CONSTRUCTION)
+    parser.add_argument('--ef', type=int, nargs='*', default=[16, 32, 64, 128, 256], help="HNSW ef (비우면 생략)")
+    parser.add_argument('--nprobe', type=int, nargs='*', default=[4, 16, 64], help="IVF-PQ nprobe (faiss 필요, 비우면 생략)")
+    parser.add_argument('--refine', type=int, default=IVFPQ_REFINE, help="IVF-PQ 후보 재계산 배수 (1이면 PQ 점수 그대로)")
+    parser.add_argument('--pca-dims', type=int, nargs='*', default=[64, 96, 128], help="PCA 축소 차원 (비우면 생략)")
+    parser.add_argument('--pca-candidates', type=int, default=PCA_CANDIDATES, help="PCA 1단계 후보 수")
+    parser.add_argument('--scale', type=int, nargs='*', default=[], help="합성 저장소 크기 (예: 100000)")
+    args = parser.parse_args()
+
+    for pkl_file in args.pkl_files:
+        if not vectorstore_exists(pkl_file):
+            print(f"❌ 파일이 존재하지 않습니다: {pkl_file}")
+            continue
+
+        store = load_vectorstore(pkl_file)
+        print(f"\n📁 {os.path.basename(pkl_file)}: {store}")
+        queries = load_query_vectors(store, args.self_queries)
+        options = (args.ef, args.M, args.ef_construction, args.nprobe, args.refine, args.pca_dims, args.pca_candidates)
+        curve = {len(store): report(store, queries, args.k, *options)}
+
+        for size in args.scale:
+            print(f"\n📁 합성 저장소 {size:,}개 (기반: {os.path.basename(pkl_file)})")
+            curve[size] = report(scaled_store(store, size), queries, args.k, *options)
+
+        if args.scale:
+            print(f"\n📈 저장소 크기별 ms/쿼리 ({os.path.basename(pkl_file)})")
+            print_latency_curve(curve)
+
+
+if __name__ == "__main__":
+    main()
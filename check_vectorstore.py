@@ -1,14 +1,23 @@
 """
 벡터스토어 확인 및 테스트 도구
-생성된 PKL 파일의 내용과 구조를 확인합니다.
+생성된 PKL 파일의 내용과 구조를 확인하고, 컬럼형 저장소로의 변환(migrate)과 성능 비교를 수행합니다.
+
+사용법:
+    python check_vectorstore.py                       # 기본 PKL 검사
+    python check_vectorstore.py migrate <PKL> [...]   # 컬럼형 저장소로 변환 + 검증 + 성능 리포트
 """
 
 import pickle
 import numpy as np
 import os
-from sentence_transformers import SentenceTransformer
+import sys
+import json
+import argparse
+import subprocess
 import time
 
+from vector_store import VectorStore, convert_pickle_to_store_dir, store_dir_for, EMBEDDING_DTYPES
+
 def load_and_inspect_vectorstore(pkl_path):
     """벡터스토어 로드 및 구조 확인"""
     if not os.path.exists(pkl_path):
@@ -71,6 +80,8 @@ def test_search_functionality(vectorstore, query="기관위임사무"):
     
     try:
         # 모델 로드
+        from sentence_transformers import SentenceTransformer
+
         model_name = vectorstore.get('model_name', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
         print(f"모델 로딩: {model_name}")
         model = SentenceTransformer(model_name)
@@ -158,6 +169,178 @@ def analyze_chunk_distribution(vectorstore):
     for source, count in sources.items():
         print(f"    - {source}: {count}개")
 
+# 새 프로세스에서 한 번 로드하여 콜드 로드 시간과 RSS 증가량을 측정하는 스크립트
+_COLD_LOAD_SCRIPT = """
+import json, sys, time, pickle
+sys.path.insert(0, sys.argv[3])
+from check_vectorstore import current_rss_mb
+from vector_store import VectorStore
+base = current_rss_mb()
+start = time.perf_counter()
+if sys.argv[1] == 'pkl':
+    with open(sys.argv[2], 'rb') as f:
+        store = pickle.load(f)
+else:
+    store = VectorStore.open(sys.argv[2])
+elapsed = time.perf_counter() - start
+rss = current_rss_mb()
+print(json.dumps({'seconds': elapsed, 'rss_mb': rss - base if rss is not None else None}))
+"""
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS (MB, 측정 불가 시 None)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def measure_cold_load(fmt, path):
+    """새 프로세스에서 로드 시간과 RSS 증가량 측정"""
+    output = subprocess.run(
+        [sys.executable, '-c', _COLD_LOAD_SCRIPT, fmt, path, os.path.dirname(os.path.abspath(__file__))],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_warm_load(load_fn, repeat=5):
+    """같은 프로세스에서 반복 로드 시 중간값 (초)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def measure_query_latency(search_fn, query_vectors):
+    """단일 쿼리 검색 지연시간 p50/p95 (밀리초)"""
+    timings = []
+    for query in query_vectors:
+        start = time.perf_counter()
+        search_fn(query[None, :])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def legacy_columns(legacy_data):
+    """원본 PKL의 청크 텍스트 목록과 행 정규화 임베딩 (어댑터를 거치지 않은 원본 배열)"""
+    if legacy_data.get('chunks'):
+        items = legacy_data['chunks']
+    elif legacy_data.get('documents'):
+        items = legacy_data['documents']
+    else:
+        items = legacy_data.get('texts') or []
+    texts = [(item.get('text', item.get('content', '')) or '') if isinstance(item, dict) else str(item) for item in items]
+
+    embeddings = np.array(legacy_data.get('embeddings', np.zeros((0, 0))), dtype=np.float32)
+    if embeddings.ndim != 2:
+        embeddings = embeddings.reshape(len(embeddings), -1)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+    return texts, embeddings
+
+
+def verify_migration(legacy_data, store):
+    """모든 청크의 텍스트와 임베딩이 원본 PKL과 같은지 확인 (개수가 하나라도 다르면 실패)"""
+    texts, embeddings = legacy_columns(legacy_data)
+    if len(texts) != len(embeddings):
+        return False, f"원본 PKL 텍스트 {len(texts)}개와 임베딩 {len(embeddings)}개 수 불일치"
+    if len(texts) != len(store):
+        return False, f"청크 수 불일치: {len(texts)} → {len(store)}"
+
+    for i, text in enumerate(texts):
+        if text != store.texts[i]:
+            return False, f"{i}번 청크 텍스트 불일치"
+
+    # 양자화 저장 시 허용 오차: float16은 상대 오차, int8은 스케일의 절반
+    converted = store.dense_embeddings()
+    if store.scales is not None:
+        tolerance = store.scales / 2 + 1e-6
+    elif store.embedding_dtype == 'float16':
+        tolerance = 1e-3
+    else:
+        tolerance = 1e-6
+    error = np.abs(converted - embeddings)
+    if np.any(error > tolerance):
+        return False, f"임베딩 오차 초과 (최대 {error.max():.2e})"
+    return True, f"{len(store)}개 청크 텍스트·임베딩 일치 (최대 오차 {error.max():.2e})"
+
+
+def migrate_vectorstore(pkl_path, embedding_dtype='float32', num_queries=200, top_k=5):
+    """PKL을 컬럼형 저장소로 변환하고 검증 후 기존/신규 포맷 성능을 비교 출력"""
+    if not os.path.exists(pkl_path):
+        print(f"❌ 파일이 존재하지 않습니다: {pkl_path}")
+        return False
+
+    print(f"\n🚚 변환: {pkl_path}")
+    store_dir = convert_pickle_to_store_dir(pkl_path, store_dir_for(pkl_path), embedding_dtype)
+    print(f"  - 출력: {store_dir} ({embedding_dtype})")
+
+    with open(pkl_path, 'rb') as f:
+        legacy = pickle.load(f)
+    store = VectorStore.open(store_dir)
+
+    ok, message = verify_migration(legacy, store)
+    print(f"  {'✅' if ok else '❌'} 검증: {message}")
+    if not ok:
+        return False
+
+    # 쿼리: 저장소 청크 임베딩 중 일부 (인코더 없이 비교 가능)
+    rng = np.random.default_rng(0)
+    rows = np.sort(rng.choice(len(store), size=min(num_queries, len(store)), replace=False))
+    legacy_chunks, legacy_embeddings = legacy_columns(legacy)
+    query_vectors = legacy_embeddings[rows]
+
+    def legacy_search(query):
+        similarities = np.dot(query, legacy_embeddings.T).flatten()
+        top = np.argsort(similarities)[::-1][:top_k]
+        return [legacy_chunks[i] for i in top]
+
+    def columnar_search(query):
+        return [record.text for record in store.top_records(store.scores(query), top_k)]
+
+    def legacy_load():
+        with open(pkl_path, 'rb') as f:
+            pickle.load(f)
+
+    report = {}
+    for fmt, path, load_fn, search_fn in [
+        ('pkl', pkl_path, legacy_load, legacy_search),
+        ('vstore', store_dir, lambda: VectorStore.open(store_dir), columnar_search),
+    ]:
+        cold = measure_cold_load(fmt, path)
+        p50, p95 = measure_query_latency(search_fn, query_vectors)
+        report[fmt] = {
+            'cold_s': cold['seconds'],
+            'warm_s': measure_warm_load(load_fn),
+            'rss_mb': cold['rss_mb'],
+            'p50_ms': p50,
+            'p95_ms': p95,
+        }
+
+    def fmt_rss(value):
+        return f"{value:.1f}" if value is not None else "N/A"
+
+    print(f"\n📊 성능 비교 (쿼리 {len(query_vectors)}개, top-{top_k})")
+    print(f"{'항목':<18} {'PKL':>12} {'컬럼형':>12}")
+    print("-" * 44)
+    print(f"{'콜드 로드 (ms)':<18} {report['pkl']['cold_s'] * 1000:>12.2f} {report['vstore']['cold_s'] * 1000:>12.2f}")
+    print(f"{'웜 로드 (ms)':<18} {report['pkl']['warm_s'] * 1000:>12.2f} {report['vstore']['warm_s'] * 1000:>12.2f}")
+    print(f"{'RSS 증가 (MB)':<18} {fmt_rss(report['pkl']['rss_mb']):>12} {fmt_rss(report['vstore']['rss_mb']):>12}")
+    print(f"{'쿼리 p50 (ms)':<18} {report['pkl']['p50_ms']:>12.3f} {report['vstore']['p50_ms']:>12.3f}")
+    print(f"{'쿼리 p95 (ms)':<18} {report['pkl']['p95_ms']:>12.3f} {report['vstore']['p95_ms']:>12.3f}")
+    return True
+
+
 def main():
     """메인 함수"""
     print("🔍 벡터스토어 검사 도구")
@@ -191,4 +374,16 @@ def main():
     print(f"\n✅ 벡터스토어 검사 완료!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        parser = argparse.ArgumentParser(description="PKL 벡터스토어를 컬럼형 저장소로 변환하고 성능 비교")
+        parser.add_argument('command')
+        parser.add_argument('pkl_files', nargs='+')
+        parser.add_argument('--dtype', choices=EMBEDDING_DTYPES, default='float32', help="임베딩 저장 타입 (기본 float32, float16은 순위 거의 유지, "
+                                 "int8은 크기 1/4이지만 상위 10개 순위가 약 30%% 바뀜 - check_quantization.py로 확인 후 사용)")
+        parser.add_argument('--queries', type=int, default=200, help="지연시간 측정 쿼리 수")
+        args = parser.parse_args()
+
+        results = [migrate_vectorstore(path, args.dtype, args.queries) for path in args.pkl_files]
+        sys.exit(0 if all(results) else 1)
+    else:
+        main()
\ No newline at end of file
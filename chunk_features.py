@@ -0,0 +1,223 @@
+"""
+청크 특징 컬럼 모듈
+품질 판정, 목차 감지, 문장 수, 법률 지표 어휘 포함 여부(비트마스크)를 저장소 생성 시 한 번만 계산해
+numpy 컬럼으로 저장합니다. 검색 시에는 마스크 조회와 popcount만으로 필터링과 가산점을 계산합니다.
+"""
+
+import os
+import re
+import json
+import numpy as np
+from typing import List, Dict, Optional, Sequence
+
+FEATURES_VERSION = 1
+FEATURES_MANIFEST_FILE = 'chunk_features.json'
+FEATURE_FILE_PREFIX = 'feature_'
+
+# 유용한 설명 텍스트 판정용 어휘 (is_quality_content)
+USEFUL_KEYWORDS = ['판단', '해석', '따라서', '경우', '규정', '위반', '적법', '위법', '검토', '사례', '판례']
+# RAG 검색 법률 분석 가산점 어휘
+ANALYSIS_KEYWORDS = ['판단', '검토', '위법', '적법', '사례', '판례', '해석', '기준']
+# 위법 판례 관련성 검증 어휘
+RELEVANCE_KEYWORDS = ['조례', '위법', '기관위임', '상위법령', '권한', '사무']
+# 조례 문맥 지표
+ORDINANCE_INDICATORS = ['조례안', '조례 제정', '지방자치단체', '자치사무', '위임사무']
+# 이론적 배경 지표
+THEORY_INDICATORS = ['원칙', '판례', '헌법재판소', '대법원', '이론', '학설', '법리', '조례', '위법', '무효', '법령', '위반']
+
+# 비트마스크 컬럼 이름 -> 어휘 (어휘의 i번째 용어가 i번째 비트)
+VOCABULARIES = {
+    'useful': USEFUL_KEYWORDS,
+    'analysis': ANALYSIS_KEYWORDS,
+    'relevance': RELEVANCE_KEYWORDS,
+    'ordinance': ORDINANCE_INDICATORS,
+    'theory': THEORY_INDICATORS,
+}
+
+# 목차/제목 패턴
+TOC_PATTERNS = [
+    re.compile(r'^제\d+장\s+', re.MULTILINE),  # 제1장
+    re.compile(r'^제\d+절\s+', re.MULTILINE),  # 제1절
+    re.compile(r'^\d+\.\s+\w+\s*$', re.MULTILINE),  # 1. 제목
+    re.compile(r'^[가-힣]+\s+\d+$', re.MULTILINE),  # 목차 번호
+    re.compile(r'^\s*목\s*차\s*$', re.MULTILINE),  # 목차
+    re.compile(r'^\s*차\s*례\s*$', re.MULTILINE),  # 차례
+]
+
+
+def _mask_dtype(num_bits: int) -> np.dtype:
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if num_bits <= np.dtype(dtype).itemsize * 8:
+            return np.dtype(dtype)
+    raise ValueError(f"어휘가 너무 큽니다: {num_bits}개")
+
+
+def keyword_mask(text: str, vocabulary: List[str]) -> int:
+    """어휘 중 텍스트에 포함된 용어의 비트마스크"""
+    mask = 0
+    for bit, keyword in enumerate(vocabulary):
+        if keyword in text:
+            mask |= 1 << bit
+    return mask
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """비트마스크별 설정된 비트 수"""
+    masks = np.asarray(masks)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int32)
+    as_bytes = masks.reshape(-1, 1).view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1).sum(axis=1).reshape(masks.shape).astype(np.int32)
+
+
+def count_sentences(text: str) -> int:
+    """문장 완성도 지표 (마침표 수 기준)"""
+    return text.count('.') + text.count('다.') + text.count('함.')
+
+
+def is_toc_text(text: str) -> bool:
+    """목차/제목 패턴 포함 여부"""
+    stripped = text.strip()
+    return any(pattern.search(stripped) for pattern in TOC_PATTERNS)
+
+
+def is_quality_content(text: str, is_toc: Optional[bool] = None, sentence_count: Optional[int] = None) -> bool:
+    """유용한 내용인지 판단 (목차/제목만 있는 청크 제외)"""
+    # 최소 길이 체크 (100자 미만은 목차일 가능성 높음)
+    if len(text) < 100:
+        return False
+
+    # 목차 패턴이 있어도 내용이 충분히 있으면 허용
+    if is_toc_text(text) if is_toc is None else is_toc:
+        return len(text) > 300
+
+    # 문장 완성도 체크
+    if (count_sentences(text) if sentence_count is None else sentence_count) < 2:
+        return False
+
+    # 실제 법률 용어나 설명이 포함되어 있는지
+    has_useful_content = any(kw in text for kw in USEFUL_KEYWORDS)
+    return has_useful_content or len(text) > 500
+
+
+class ChunkFeatures:
+    """청크별 특징 컬럼 (text_length, sentence_count, is_toc, is_quality, 어휘별 비트마스크)"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['text_length'])
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__['columns'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"ChunkFeatures(chunks={len(self)}, quality={int(np.count_nonzero(self.is_quality))})"
+
+    def mask(self, vocabulary: str) -> np.ndarray:
+        """어휘 비트마스크 컬럼"""
+        return self.columns[f'{vocabulary}_mask']
+
+    def keyword_counts(self, vocabulary: str, docs: Optional[np.ndarray] = None) -> np.ndarray:
+        """청크별 어휘 포함 개수 (popcount)"""
+        masks = self.mask(vocabulary)
+        return popcount(masks if docs is None else masks[docs])
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> 'ChunkFeatures':
+        """청크 텍스트로부터 특징 계산"""
+        count = len(texts)
+        columns = {
+            'text_length': np.zeros(count, dtype=np.int32),
+            'sentence_count': np.zeros(count, dtype=np.int32),
+            'is_toc': np.zeros(count, dtype=bool),
+            'is_quality': np.zeros(count, dtype=bool),
+        }
+        for name, vocabulary in VOCABULARIES.items():
+            columns[f'{name}_mask'] = np.zeros(count, dtype=_mask_dtype(len(vocabulary)))
+
+        for i, text in enumerate(texts):
+            sentence_count = count_sentences(text)
+            is_toc = is_toc_text(text)
+            columns['text_length'][i] = len(text)
+            columns['sentence_count'][i] = sentence_count
+            columns['is_toc'][i] = is_toc
+            columns['is_quality'][i] = is_quality_content(text, is_toc, sentence_count)
+            for name, vocabulary in VOCABULARIES.items():
+                columns[f'{name}_mask'][i] = keyword_mask(text, vocabulary)
+
+        return cls(columns)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence['ChunkFeatures']) -> 'ChunkFeatures':
+        """배치별로 계산한 특징을 청크 순서대로 이어 붙이기"""
+        if not parts:
+            return cls.build([])
+        return cls({name: np.concatenate([part.columns[name] for part in parts]) for name in parts[0].columns})
+
+    def save(self, store_dir: str) -> None:
+        """저장소 디렉터리에 특징 컬럼 작성 (임시 파일에 쓴 뒤 교체, 매니페스트를 마지막에 써서 완료 표시)"""
+        for name, column in self.columns.items():
+            path = os.path.join(store_dir, f'{FEATURE_FILE_PREFIX}{name}.npy')
+            tmp_path = f'{path}.tmp-{os.getpid()}'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, column)
+            os.replace(tmp_path, path)
+
+        manifest_path = os.path.join(store_dir, FEATURES_MANIFEST_FILE)
+        tmp_path = f'{manifest_path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'features_version': FEATURES_VERSION,
+                'count': len(self),
+                'columns': sorted(self.columns),
+                'vocabularies': VOCABULARIES,
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    @classmethod
+    def open(cls, store_dir: str, expected_count: Optional[int] = None) -> Optional['ChunkFeatures']:
+        """저장된 특징 컬럼 열기 (없거나 버전/청크 수/어휘가 다르면 None)"""
+        manifest_path = os.path.join(store_dir, FEATURES_MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('features_version') != FEATURES_VERSION or manifest.get('vocabularies') != VOCABULARIES:
+            return None
+        if expected_count is not None and manifest.get('count') != expected_count:
+            return None
+
+        return cls({
+            name: np.load(os.path.join(store_dir, f'{FEATURE_FILE_PREFIX}{name}.npy'), mmap_mode='r')
+            for name in manifest['columns']
+        })
+
+
+def chunk_features_for(store) -> ChunkFeatures:
+    """저장소의 특징 컬럼 (저장된 컬럼을 열고, 없으면 계산해 저장소 디렉터리에 저장)"""
+    features = getattr(store, '_chunk_features', None)
+    if features is not None:
+        return features
+
+    store_dir = store.store_dir
+    if store_dir:
+        features = ChunkFeatures.open(store_dir, expected_count=len(store))
+
+    if features is None:
+        features = ChunkFeatures.build(store.texts)
+        # 다른 버전/어휘의 컬럼이 이미 있으면 다른 프로세스가 mmap 중일 수 있으므로 덮어쓰지 않고 메모리에만 유지
+        if store_dir and os.path.exists(os.path.join(store_dir, FEATURES_MANIFEST_FILE)):
+            print(f"[INFO] 저장된 청크 특징이 현재 설정과 달라 메모리에서만 사용합니다 ({store_dir})")
+        elif store_dir:
+            try:
+                features.save(store_dir)
+            except OSError as e:
+                print(f"[WARNING] 청크 특징 저장 실패 ({store_dir}): {e}")
+
+    store._chunk_features = features
+    return features
@@ -4,23 +4,27 @@
 법령명 정규화를 통해 중복을 제거하고 Gemini API 호출을 최적화합니다.
 """
 
-import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import re
-import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import streamlit as st
 from law_name_normalizer import LawNameNormalizer
+from vector_store import get_vectorstore_registry, vectorstore_exists, ChunkRecord
+from keyword_index import keyword_index_for
+from search_queries import build_article_search_queries, build_theory_keyword_queries, CONTEXT_KEYWORD_QUERIES
+from retrieval import ArticleQueryBatch, HybridRetriever, encode_queries, search_many, hybrid_search_enabled
+from reranker import reranker_for, RERANK_CANDIDATES
+from embedding_cache import cached_encode
+from embedding_service import embedding_service_for, ModelMismatchError
+from chunk_features import chunk_features_for, popcount
 
 def load_vectorstore_safe(pkl_path: str) -> Dict[str, Any]:
-    """안전한 벡터스토어 로드"""
+    """안전한 벡터스토어 로드 (프로세스 전역 레지스트리 경유)"""
     try:
-        if not os.path.exists(pkl_path):
+        if not vectorstore_exists(pkl_path):
             return None
         
-        with open(pkl_path, 'rb') as f:
-            return pickle.load(f)
+        return get_vectorstore_registry().get(pkl_path)
     except Exception as e:
         st.error(f"벡터스토어 로드 실패 ({pkl_path}): {str(e)}")
         return None
@@ -125,13 +129,10 @@ def normalize_and_deduplicate_laws(law_names: List[str]) -> List[str]:
         return list(set(law_names))
 
 def calculate_text_similarity(text1: str, text2: str, model) -> float:
-    """두 텍스트 간 유사도 계산"""
+    """두 텍스트 간 유사도 계산 (정규화 임베딩의 내적 = 코사인 유사도)"""
     try:
-        embeddings = model.encode([text1, text2])
-        similarity = np.dot(embeddings[0], embeddings[1]) / (
-            np.linalg.norm(embeddings[0]) * np.linalg.norm(embeddings[1])
-        )
-        return float(similarity)
+        embeddings = cached_encode(model, [text1, text2])
+        return float(np.dot(embeddings[0], embeddings[1]))
     except Exception as e:
         st.error(f"유사도 계산 오류: {str(e)}")
         return 0.0
@@ -180,23 +181,75 @@ def analyze_violation_risk(ordinance_content: str, case_content: str, case_info:
         'case_source': case_info.get('source', '판례집')
     }
 
-def search_comprehensive_violation_cases(ordinance_articles: List[Dict], pkl_paths: List[str], max_results: int = 5) -> List[Dict]:
-    """종합 위법성 판례 검색"""
+def search_comprehensive_violation_cases(ordinance_articles: List[Dict], pkl_paths: List[str], max_results: int = 5,
+                                         rerank: bool = False, hybrid: Optional[bool] = None) -> List[Dict]:
+    """종합 위법성 판례 검색
+
+    rerank=True이면 조문 내용으로 상위 후보를 크로스 인코더 재순위하고,
+    hybrid=True(또는 ORDINANCE_HYBRID_SEARCH=1)이면 임베딩 점수와 BM25 키워드 점수를 순위 융합합니다.
+    """
     if not ordinance_articles:
         return []
     
     try:
-        # 모델 로드
-        model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-        st.write(f"[DEBUG] 종합 위법성 분석 모델 로드 완료")
-        
+        use_hybrid = hybrid_search_enabled(hybrid)
+        min_similarity = 0.15  # 임계값 다시 높임 (관련성 중시)
         comprehensive_results = []
         all_violation_risks = []  # 모든 조례의 위험 사례를 수집
         
+        # 벡터스토어는 조문 루프 밖에서 한 번만 조회하고, 저장소를 만든 모델로 인코더를 정함
+        vectorstores = []
+        for pkl_path in pkl_paths:
+            vectorstore = load_vectorstore_safe(pkl_path)
+            if not vectorstore:
+                continue
+            try:
+                vectorstores.append((pkl_path, vectorstore, embedding_service_for(vectorstore)))
+            except ModelMismatchError as e:
+                st.error(f"PKL 모델 불일치로 건너뜀 ({pkl_path}): {e}")
+            except Exception as e:
+                st.error(f"임베딩 모델 로드에 실패했습니다 ({pkl_path}, {vectorstore.model_name}): {e}")
+        
         # 1단계: 모든 조례에 대해 관련 사례 검색
         st.write(f"[DEBUG] 총 {len(ordinance_articles)}개 조례에 대해 위법 사례 검색 중...")
         
-        for article in ordinance_articles:
+        # 전체 조문의 쿼리를 모델별로 중복 없이 한 번만 임베딩하고 저장소별로 한 번에 점수 계산
+        article_queries = [build_article_search_queries(article) for article in ordinance_articles]
+        query_batches = {}
+        
+        store_results = []
+        for pkl_path, vectorstore, model in vectorstores:
+            try:
+                if model.model_name not in query_batches:
+                    query_batches[model.model_name] = ArticleQueryBatch(model, article_queries)
+                    st.write(f"[DEBUG] {model.model_name} - 고유 검색 쿼리 {len(query_batches[model.model_name].unique_queries)}개 (조문 {len(article_queries)}개)")
+                query_batch = query_batches[model.model_name]
+                
+                # 조문별 임베딩 최고 점수 (하이브리드이면 임계값 이하 임베딩 후보를 뺀 뒤 BM25 점수와 순위 융합)
+                reranker = reranker_for(vectorstore) if rerank else None
+                num_candidates = max(max_results, RERANK_CANDIDATES) if reranker else max_results
+                if use_hybrid:
+                    article_records = query_batch.hybrid_search(HybridRetriever(vectorstore), num_candidates,
+                                                                min_dense_score=min_similarity)
+                else:
+                    article_records = query_batch.search(vectorstore, num_candidates)
+                
+                if reranker:
+                    # 조문 제목+내용과 후보 청크 쌍을 배치로 재순위하여 프롬프트로 넘길 청크 수 축소
+                    article_records = [
+                        [record for record, _ in reranker.rerank(f"{article['article_title']} {article['content']}", records, max_results)]
+                        for article, records in zip(ordinance_articles, article_records)
+                    ]
+                    st.write(f"[DEBUG] {pkl_path} - 재순위 완료 (캐시 적중률 {reranker.stats()['hit_rate']:.1%})")
+                
+                # 관련성 검증용 비트마스크는 저장소마다 한 번만 조회 (저장소 생성 시 계산된 특징 컬럼)
+                features = chunk_features_for(vectorstore)
+                store_results.append((pkl_path, vectorstore, article_records,
+                                      features.mask('relevance'), features.mask('ordinance')))
+            except Exception as e:
+                st.error(f"PKL 검색 오류 ({pkl_path}): {str(e)}")
+        
+        for article_pos, article in enumerate(ordinance_articles):
             article_results = {
                 'ordinance_article': f"제{article['article_number']}조",
                 'ordinance_title': article['article_title'],
@@ -205,99 +258,28 @@ def search_comprehensive_violation_cases(ordinance_articles: List[Dict], pkl_pat
             }
             
             # 각 PKL 파일에서 검색
-            for pkl_path in pkl_paths:
-                if not os.path.exists(pkl_path):
-                    continue
-                
-                vectorstore = load_vectorstore_safe(pkl_path)
-                if not vectorstore:
-                    continue
-                
+            for pkl_path, vectorstore, article_records, relevance_masks, ordinance_masks in store_results:
                 try:
-                    # 조문에서 핵심 키워드 추출
-                    content_keywords = []
-                    
-                    # 사무 관련 키워드 추출
-                    if any(word in article['content'] for word in ['허가', '승인', '신고', '인허가', '지정']):
-                        content_keywords.extend(['기관위임사무', '허가사무', '인허가'])
-                    
-                    # 권한 관련 키워드 추출  
-                    if any(word in article['content'] for word in ['권한', '지시', '명령', '처분']):
-                        content_keywords.extend(['권한위임', '처분권한'])
-                    
-                    # 법령 관련 키워드 추출
-                    if any(word in article['content'] for word in ['법률', '시행령', '시행규칙']):
-                        content_keywords.extend(['상위법령위반', '법령충돌'])
-                    
-                    # 조문 제목에서 핵심 분야 추출
-                    title_field = ""
-                    if any(word in article['article_title'] for word in ['건축', '건설', '개발']):
-                        title_field = "건축"
-                        content_keywords.extend(['건축허가', '개발행위허가'])
-                    elif any(word in article['article_title'] for word in ['환경', '대기', '수질']):
-                        title_field = "환경"
-                        content_keywords.extend(['환경영향평가', '환경허가'])
-                    elif any(word in article['article_title'] for word in ['도시', '계획', '용도']):
-                        title_field = "도시계획"
-                        content_keywords.extend(['도시계획', '용도지역'])
-                    
-                    # 개선된 검색 쿼리 생성
-                    search_queries = [
-                        f"{title_field} 기관위임사무 조례 위법" if title_field else "기관위임사무 조례 위법",
-                        f"{article['article_title']} 위법 판례",
-                        "조례 제정권한 한계 위반",
-                        "상위법령 위반 조례",
-                    ]
-                    
-                    # 키워드가 있으면 추가 쿼리 생성
-                    if content_keywords:
-                        for keyword in content_keywords[:3]:  # 상위 3개만
-                            search_queries.append(f"{keyword} 조례 위법")
-                    
-                    all_similarities = []
-                    embeddings = vectorstore.get('embeddings', np.array([]))
-                    
-                    if len(embeddings) == 0:
+                    if len(vectorstore) == 0:
                         continue
                     
-                    # 다중 쿼리로 검색하여 결과 통합
-                    for query in search_queries:
-                        query_embedding = model.encode([query])
-                        similarities = np.dot(query_embedding, embeddings.T).flatten()
-                        all_similarities.extend([(i, sim) for i, sim in enumerate(similarities)])
-                    
-                    # 중복 제거하고 최고 점수로 정렬
-                    idx_scores = {}
-                    for idx, score in all_similarities:
-                        if idx not in idx_scores or score > idx_scores[idx]:
-                            idx_scores[idx] = score
+                    # 조문 쿼리별 최고 점수(하이브리드이면 융합 점수) 기준 상위 결과
+                    top_records = article_records[article_pos]
+                    similarities = [record.dense_score if use_hybrid else record.score for record in top_records]
                     
-                    # 상위 결과 선택
-                    top_items = sorted(idx_scores.items(), key=lambda x: x[1], reverse=True)[:max_results]
+                    st.write(f"[DEBUG] {article['article_title']} - 검색된 결과 수: {len(top_records)}, 최고 유사도: {max(similarities, default=0)}, chunks: {len(vectorstore)}개")
                     
-                    # PKL 파일 구조에 맞춰 documents 사용
-                    chunks = vectorstore.get('chunks', [])
-                    if len(chunks) == 0:
-                        # chunks가 없으면 documents 사용
-                        documents = vectorstore.get('documents', [])
-                        if documents:
-                            # documents를 chunks 형태로 변환
-                            chunks = [{'text': doc} for doc in documents]
-                    
-                    st.write(f"[DEBUG] {article['article_title']} - 검색된 결과 수: {len(top_items)}, 최고 유사도: {top_items[0][1] if top_items else 0}, chunks: {len(chunks)}개")
-                    
-                    for idx, similarity in top_items:
-                        if similarity > 0.15:  # 임계값 다시 높임 (관련성 중시)
-                            chunk = chunks[idx]
-                            chunk_text = chunk.get('text', '')
+                    for record, similarity in zip(top_records, similarities):
+                        idx = record.index
+                        # 하이브리드는 융합 전에 임계값을 적용했으므로 키워드로만 찾은 결과도 유지
+                        if use_hybrid or similarity > min_similarity:
+                            chunk_text = vectorstore.texts[idx]
                             
-                            # 관련성 검증 - 핵심 키워드가 포함되어 있는지 확인
-                            relevance_keywords = ['조례', '위법', '기관위임', '상위법령', '권한', '사무']
-                            relevance_score = sum(1 for keyword in relevance_keywords if keyword in chunk_text)
+                            # 관련성 검증 - 핵심 키워드가 포함되어 있는지 확인 (저장소 생성 시 계산된 비트마스크)
+                            relevance_score = int(popcount(relevance_masks[idx]))
                             
                             # 조례와 관련된 내용인지 추가 확인
-                            ordinance_indicators = ['조례안', '조례 제정', '지방자치단체', '자치사무', '위임사무']
-                            has_ordinance_context = any(indicator in chunk_text for indicator in ordinance_indicators)
+                            has_ordinance_context = bool(ordinance_masks[idx])
                             
                             # 관련성이 낮으면 제외
                             if relevance_score < 2 and not has_ordinance_context:
@@ -307,9 +289,9 @@ def search_comprehensive_violation_cases(ordinance_articles: List[Dict], pkl_pat
                             # 위법 위험 분석
                             risk_analysis = analyze_violation_risk(
                                 article['content'],
-                                chunk['text'],
+                                chunk_text,
                                 {
-                                    'source': chunk.get('source', ''),
+                                    'source': vectorstore.source(idx),
                                     'legal_principle': '법령 위반 금지 원칙'
                                 }
                             )
@@ -483,33 +465,15 @@ def extract_and_normalize_relevant_laws(comprehensive_results: List[Dict]) -> Di
         st.error(f"법령명 추출/정규화 오류: {e}")
         return {'normalized_laws': [], 'law_details': [], 'error': str(e)}
 
-def search_theoretical_background(problem_keywords: List[str], pkl_paths: List[str], max_results: int = 8, context_analysis: Dict = None) -> List[Dict]:
-    """발견된 문제점에 대한 이론적 배경을 PKL에서 검색"""
+def search_theoretical_background(problem_keywords: List[str], pkl_paths: List[str], max_results: int = 8, context_analysis: Dict = None,
+                                  hybrid: Optional[bool] = None) -> List[Dict]:
+    """발견된 문제점에 대한 이론적 배경을 PKL에서 검색 (hybrid=True 또는 ORDINANCE_HYBRID_SEARCH=1이면 BM25와 순위 융합)"""
     if not problem_keywords:
         return []
     
     try:
-        # 여러 모델을 시도해보기
-        models_to_try = [
-            'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
-            'sentence-transformers/all-MiniLM-L6-v2', 
-            'sentence-transformers/all-mpnet-base-v2'
-        ]
-        
-        model = None
-        for model_name in models_to_try:
-            try:
-                model = SentenceTransformer(model_name)
-                st.write(f"[DEBUG] 이론적 배경 검색 모델 로드 완료: {model_name}")
-                break
-            except Exception as e:
-                st.write(f"[DEBUG] 모델 {model_name} 로드 실패: {str(e)}")
-                continue
-        
-        if model is None:
-            st.error("모든 임베딩 모델 로드에 실패했습니다.")
-            return []
-        
+        use_hybrid = hybrid_search_enabled(hybrid)
+        min_similarity = 0.1  # 임계값을 낮춰서 더 많은 결과 포함
         theoretical_results = []
 
         # 🔍 문맥 기반 동적 쿼리 생성
@@ -524,11 +488,7 @@ def search_theoretical_background(problem_keywords: List[str], pkl_paths: List[s
                 context = concept_info['context']
 
                 # 문맥에서 추가 키워드 추출
-                context_keywords = []
-                if '허가' in context: context_keywords.append('허가권한')
-                if '승인' in context: context_keywords.append('승인권한')
-                if '처분' in context: context_keywords.append('행정처분')
-                if '위임' in context: context_keywords.append('권한위임')
+                context_keywords = [query for word, query in CONTEXT_KEYWORD_QUERIES.items() if word in context]
 
                 # 개념별 특화 쿼리 생성
                 all_search_queries.extend([
@@ -558,53 +518,35 @@ def search_theoretical_background(problem_keywords: List[str], pkl_paths: List[s
 
                 all_search_queries.extend([f"{noun} 판례" for noun in problem_keywords_extracted])
 
-        # 기본 키워드 기반 쿼리도 포함
+        # 기본 키워드 기반 쿼리도 포함 (키워드별 특화된 검색 쿼리)
         for keyword in problem_keywords:
-            # 키워드별 특화된 검색 쿼리 생성
-            if keyword == "기관위임사무":
-                all_search_queries.extend([
-                    "기관위임사무", "조례 제정 금지", "지방자치법 제22조",
-                    "국가사무 위임", "시장 군수 구청장", "위임사무 조례", "기관위임 금지"
-                ])
-            elif keyword == "상위법령":
-                all_search_queries.extend([
-                    "상위법령", "법령우위", "조례 무효", "법령 충돌", "상위법 위반", "조례 위법"
-                ])
-            elif keyword == "권한":
-                all_search_queries.extend([
-                    "권한 위임", "권한배분", "법률유보", "조례 권한", "지방자치단체 권한"
-                ])
-            elif keyword == "위법":
-                all_search_queries.extend([
-                    "조례 위법", "무효 조례", "법령 위반", "조례 위반"
-                ])
-            elif keyword == "헌법위반":
-                all_search_queries.extend([
-                    "헌법위반", "기본권침해", "헌법재판소", "위헌조례", "헌법적 한계"
-                ])
-            elif keyword == "기본권":
-                all_search_queries.extend([
-                    "기본권침해", "재산권", "영업의자유", "평등권", "기본권 제한"
-                ])
-            elif keyword in ["평등원칙", "비례원칙"]:
-                all_search_queries.extend([
-                    f"{keyword}", f"{keyword} 위반", "헌법원칙", "조례 한계"
-                ])
-            elif keyword in ["조세", "벌금", "과태료"]:
-                all_search_queries.extend([
-                    "조세법률주의", "벌금 부과", "과태료", "법률유보", "조례 벌칙"
-                ])
-            else:
-                all_search_queries.extend([keyword, f"{keyword} 조례", f"{keyword} 위법", f"{keyword} 판례"])
+            all_search_queries.extend(build_theory_keyword_queries(keyword))
 
         # 중복 제거 및 우선순위 정렬
         unique_queries = list(dict.fromkeys(all_search_queries))  # 순서 유지하며 중복 제거
         st.write(f"[DEBUG] 생성된 검색 쿼리: {len(unique_queries)}개")
         st.write(f"[DEBUG] 상위 5개 쿼리: {unique_queries[:5]}")
 
+        # 임베딩 검색용 쿼리는 저장소를 만든 모델별로 한 번만 배치 임베딩해 캐시에 둠 (상위 15개 쿼리만 사용, 성능 고려)
+        dense_queries = unique_queries[:15]
+        model_ready = {}
+
+        def dense_model_for(vectorstore):
+            """임베딩 검색에 쓸 모델 (쿼리 임베딩에 실패한 모델은 None)"""
+            model = embedding_service_for(vectorstore)
+            if model.model_name not in model_ready:
+                try:
+                    encode_queries(model, dense_queries)
+                    model_ready[model.model_name] = True
+                    st.write(f"[DEBUG] 이론적 배경 검색 모델 준비 완료: {model.model_name}")
+                except Exception as e:
+                    st.error(f"임베딩 모델 로드에 실패했습니다 ({model.model_name}): {e}")
+                    model_ready[model.model_name] = False
+            return model if model_ready[model.model_name] else None
+
         # PKL 파일별 검색 (동적 쿼리 사용)
         for pkl_path in pkl_paths:
-                if not os.path.exists(pkl_path):
+                if not vectorstore_exists(pkl_path):
                     continue
                 
                 vectorstore = load_vectorstore_safe(pkl_path)
@@ -612,112 +554,71 @@ def search_theoretical_background(problem_keywords: List[str], pkl_paths: List[s
                     continue
                 
                 try:
-                    # PKL 파일 구조 상세 확인
-                    st.write(f"[DEBUG] {pkl_path} 구조 확인:")
-                    st.write(f"[DEBUG]   - keys: {list(vectorstore.keys())}")
-                    
-                    embeddings = vectorstore.get('embeddings', np.array([]))
-                    # PKL 파일 구조에 맞춰 documents 사용
-                    chunks = vectorstore.get('chunks', [])
-                    if len(chunks) == 0:
-                        # chunks가 없으면 documents 사용
-                        documents = vectorstore.get('documents', [])
-                        if documents:
-                            # documents를 chunks 형태로 변환
-                            chunks = [{'text': doc} for doc in documents]
-                            st.write(f"[DEBUG] documents를 chunks로 변환: {len(chunks)}개")
+                    texts = vectorstore.texts
+                    st.write(f"[DEBUG] {pkl_path} - {vectorstore}")
                     
-                    st.write(f"[DEBUG]   - embeddings type: {type(embeddings)}, shape: {embeddings.shape if hasattr(embeddings, 'shape') else 'N/A'}")
-                    st.write(f"[DEBUG]   - chunks type: {type(chunks)}, length: {len(chunks)}")
-                    
-                    if len(embeddings) == 0 or len(chunks) == 0:
-                        st.write(f"[DEBUG] {pkl_path} - embeddings: {len(embeddings)}, chunks: {len(chunks)} (건너뜀)")
+                    if len(vectorstore) == 0:
+                        st.write(f"[DEBUG] {pkl_path} - 청크 없음 (건너뜀)")
                         continue
                     
-                    # 첫 번째 chunk 내용 확인
-                    if len(chunks) > 0:
-                        first_chunk = chunks[0]
-                        st.write(f"[DEBUG]   - 첫 번째 chunk 구조: {type(first_chunk)}")
-                        if isinstance(first_chunk, dict):
-                            st.write(f"[DEBUG]   - chunk keys: {list(first_chunk.keys())}")
-                            text_content = first_chunk.get('text', first_chunk.get('content', ''))[:100]
-                            st.write(f"[DEBUG]   - 첫 100자: {text_content}")
-                        else:
-                            st.write(f"[DEBUG]   - chunk 내용: {str(first_chunk)[:100]}")
-                    
-                    # embeddings와 chunks 길이 일치 확인
-                    if len(embeddings) != len(chunks):
-                        st.write(f"[DEBUG] {pkl_path} - embeddings({len(embeddings)})와 chunks({len(chunks)}) 길이 불일치")
-                        min_length = min(len(embeddings), len(chunks))
-                        embeddings = embeddings[:min_length]
-                        chunks = chunks[:min_length]
-                        st.write(f"[DEBUG] {pkl_path} - {min_length}개로 조정")
-                    
-                    all_similarities = []
-                    keyword_matches = []  # 키워드 매칭 결과도 저장
+                    try:
+                        model = dense_model_for(vectorstore)
+                    except ModelMismatchError as e:
+                        st.error(f"PKL 모델 불일치로 건너뜀 ({pkl_path}): {e}")
+                        continue
                     
-                    # 1차: 임베딩 기반 검색 (동적 쿼리 사용)
-                    for query in unique_queries[:15]:  # 상위 15개 쿼리만 사용 (성능 고려)
-                        try:
-                            query_embedding = model.encode([query])
-                            similarities = np.dot(query_embedding, embeddings.T).flatten()
-                            all_similarities.extend([(i, sim) for i, sim in enumerate(similarities)])
-                        except Exception as e:
-                            st.write(f"[DEBUG] 임베딩 검색 실패 ({query}): {str(e)}")
-
-                    # 2차: 단순 키워드 매칭 (백업) - 동적 쿼리 사용
-                    for i, chunk in enumerate(chunks):
-                        chunk_text = ""
-                        if isinstance(chunk, dict):
-                            chunk_text = chunk.get('text', chunk.get('content', ''))
-                        else:
-                            chunk_text = str(chunk)
-
-                        # 키워드 매칭 점수 계산 (핵심 쿼리들로만)
-                        keyword_score = 0
-                        matched_queries = []
+                    if use_hybrid:
+                        # 임베딩 검색과 BM25 키워드 검색(상위 10개 쿼리)을 순위 융합 (임계값 이하 임베딩 후보는 융합 전에 제외)
+                        top_records = HybridRetriever(vectorstore).search(
+                            3, query_embeddings=encode_queries(model, dense_queries) if model else None,
+                            keyword_query=' '.join(unique_queries[:10]),
+                            min_dense_score=min_similarity
+                        )
+                    else:
+                        # 1차: 임베딩 기반 다중 쿼리 검색 (동적 쿼리 사용, 캐시된 쿼리 임베딩 재사용)
+                        candidate_scores = {record.index: record.score
+                                            for record in search_many(model, vectorstore, dense_queries, 3)} if model else {}
+
+                        # 2차: 단순 키워드 매칭 (백업) - 역색인에서 쿼리별 포함 청크 조회
+                        index = keyword_index_for(vectorstore)
+                        match_counts = np.zeros(len(vectorstore), dtype=np.int32)
                         for query in unique_queries[:10]:  # 상위 10개만
-                            if query.lower() in chunk_text.lower():
-                                keyword_score += 1
-                                matched_queries.append(query)
+                            match_counts[index.phrase_docs(query)] += 1
 
-                        if keyword_score > 0:
+                        matched = np.flatnonzero(match_counts)
+                        if len(matched):
+                            st.write(f"[DEBUG] 키워드 매칭 발견: {len(matched)}개 청크, 최대 {match_counts.max()}개 매칭")
+                        for idx in matched.tolist():
                             # 키워드 매칭 점수를 유사도처럼 사용 (0.5 + 매칭수 * 0.1)
-                            match_similarity = 0.5 + keyword_score * 0.1
-                            keyword_matches.append((i, match_similarity))
-                            st.write(f"[DEBUG] 키워드 매칭 발견: {matched_queries} - {keyword_score}개 매칭, 점수 {match_similarity:.3f}")
-                    
-                    # 임베딩 결과와 키워드 매칭 결과 결합
-                    all_similarities.extend(keyword_matches)
-                    
-                    # 중복 제거하고 최고 점수로 정렬
-                    idx_scores = {}
-                    for idx, score in all_similarities:
-                        if idx not in idx_scores or score > idx_scores[idx]:
-                            idx_scores[idx] = score
+                            candidate_scores[idx] = max(candidate_scores.get(idx, -1.0), 0.5 + match_counts[idx] * 0.1)
+
+                        # 임베딩 결과와 키워드 매칭 결과를 청크별 최고 점수로 결합하여 상위 결과 선택
+                        # (임베딩 상위 3개 밖의 키워드 청크는 임베딩 점수가 순위 밖이라 키워드 점수만으로 충분, 동점은 청크 순서)
+                        top_items = sorted(candidate_scores.items(), key=lambda x: (-x[1], x[0]))[:3]
+                        top_records = [ChunkRecord(vectorstore, idx, score) for idx, score in top_items]
                     
-                    # 상위 결과 선택
-                    top_items = sorted(idx_scores.items(), key=lambda x: x[1], reverse=True)[:3]
+                    st.write(f"[DEBUG] {pkl_path} - 검색 결과: {len(top_records)}개, chunks 길이: {len(vectorstore)}")
                     
-                    st.write(f"[DEBUG] {pkl_path} - 검색 결과: {len(top_items)}개, chunks 길이: {len(chunks)}")
+                    # 기본 법적 지표 비트마스크는 저장소마다 한 번만 조회
+                    theory_masks = chunk_features_for(vectorstore).mask('theory')
                     
-                    for idx, similarity in top_items:
-                        # 인덱스 범위 안전 검사
-                        if idx >= len(chunks):
-                            st.write(f"[DEBUG] 인덱스 {idx}가 chunks 길이 {len(chunks)}를 초과합니다.")
-                            continue
-                        
-                        if similarity > 0.1:  # 임계값을 낮춰서 더 많은 결과 포함
-                            chunk = chunks[idx]
-                            chunk_text = chunk.get('text', '')
+                    for record in top_records:
+                        idx = record.index
+                        if use_hybrid:
+                            similarity = record.dense_score
+                            st.write(f"[DEBUG] 융합 점수 {record.score:.4f} (임베딩 {record.dense_score:.3f} #{record.dense_rank}, 키워드 {record.sparse_score:.2f} #{record.sparse_rank})")
+                        else:
+                            similarity = record.score
+                        # 하이브리드는 융합 전에 임계값을 적용했으므로 키워드로만 찾은 결과도 유지
+                        if use_hybrid or similarity > min_similarity:
+                            chunk_text = texts[idx]
                             
                             # 🔍 문맥 기반 관련성 평가 (동적)
                             relevance_score = 0
                             matched_concepts = []
 
-                            # 1. 기본 법적 지표
-                            theory_indicators = ['원칙', '판례', '헌법재판소', '대법원', '이론', '학설', '법리', '조례', '위법', '무효', '법령', '위반']
-                            base_score = sum(1 for indicator in theory_indicators if indicator in chunk_text)
+                            # 1. 기본 법적 지표 (저장소 생성 시 계산된 비트마스크)
+                            base_score = int(popcount(theory_masks[idx]))
                             relevance_score += base_score
 
                             # 2. Gemini 분석에서 추출된 핵심 개념과의 매칭
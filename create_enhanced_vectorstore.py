@@ -12,7 +12,7 @@ import os
 import pickle
 import numpy as np
 import streamlit as st
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import time
 from datetime import datetime
 import re
@@ -21,9 +21,10 @@ import re
 import PyPDF2
 import fitz  # PyMuPDF
 
-# 임베딩 및 리랭킹용
-from sentence_transformers import SentenceTransformer, CrossEncoder
-import torch
+from vector_store import StoreWriter, store_dir_for
+from query_bank import build_query_bank
+from vector_index import save_vector_index
+from embedding_service import load_encoder, resolve_encoder_backend
 
 def extract_text_from_pdf_enhanced(pdf_path: str) -> str:
     """향상된 PDF 텍스트 추출"""
@@ -165,36 +166,53 @@ def smart_chunking(text: str, target_size: int = 1000, overlap: int = 100) -> Li
 def create_embeddings_with_reranker(chunks: List[Dict],
                                    embedding_model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2',
                                    reranker_model_name: str = 'cross-encoder/ms-marco-MiniLM-L-12-v2',
-                                   batch_size: int = 16) -> Tuple[np.ndarray, CrossEncoder]:
-    """임베딩 생성 + 리랭커 모델 로드"""
+                                   batch_size: int = 16, encoder_backend: str = None,
+                                   writer: Optional[StoreWriter] = None,
+                                   keep_embeddings: bool = True) -> Tuple[np.ndarray, Any]:
+    """임베딩 생성 + 리랭커 모델 로드 (encoder_backend='onnx'이면 onnxruntime int8 인코더)
+
+    writer를 주면 배치마다 컬럼형 저장소에 이어 쓰고, keep_embeddings=False이면 반환용 임베딩을 모으지 않습니다.
+    """
 
     try:
-        # GPU 사용 가능시 사용
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        # torch 백엔드에서만 torch를 불러와 GPU 사용 가능시 사용 (onnx/remote는 CPU)
+        backend = resolve_encoder_backend(encoder_backend)
+        torch = None
+        device = 'cpu'
+        if backend == 'torch':
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
 
         # 1. 임베딩 모델 로드
-        embedding_model = SentenceTransformer(embedding_model_name, device=device)
-        print(f"[INFO] 임베딩 모델 로드 완료: {embedding_model_name} (device: {device})")
+        embedding_model = load_encoder(embedding_model_name, backend, device=device)
+        print(f"[INFO] 임베딩 모델 로드 완료: {embedding_model_name} (device: {device}, 백엔드: {backend})")
 
-        # 2. 리랭커 모델 로드
+        # 2. 리랭커 모델 로드 (sentence-transformers가 없으면 리랭커 없이 진행)
+        reranker_model = None
         try:
-            reranker_model = CrossEncoder(reranker_model_name, device=device)
-            print(f"[INFO] 리랭커 모델 로드 완료: {reranker_model_name}")
-        except Exception as e:
-            print(f"[WARNING] 리랭커 모델 로드 실패, 다른 모델 시도: {str(e)}")
-            # 대안 모델들
-            fallback_models = [
-                'cross-encoder/ms-marco-MiniLM-L-6-v2',
-                'cross-encoder/ms-marco-TinyBERT-L-2-v2'
-            ]
-            reranker_model = None
-            for fallback in fallback_models:
-                try:
-                    reranker_model = CrossEncoder(fallback, device=device)
-                    print(f"[INFO] 대안 리랭커 모델 로드 완료: {fallback}")
-                    break
-                except:
-                    continue
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            print(f"[WARNING] sentence-transformers 없음, 리랭커 없이 진행: {e}")
+            CrossEncoder = None
+        if CrossEncoder is not None:
+            try:
+                reranker_model = CrossEncoder(reranker_model_name, device=device)
+                print(f"[INFO] 리랭커 모델 로드 완료: {reranker_model_name}")
+            except Exception as e:
+                print(f"[WARNING] 리랭커 모델 로드 실패, 다른 모델 시도: {str(e)}")
+                # 대안 모델들
+                fallback_models = [
+                    'cross-encoder/ms-marco-MiniLM-L-6-v2',
+                    'cross-encoder/ms-marco-TinyBERT-L-2-v2'
+                ]
+                reranker_model = None
+                for fallback in fallback_models:
+                    try:
+                        reranker_model = CrossEncoder(fallback, device=device)
+                        print(f"[INFO] 대안 리랭커 모델 로드 완료: {fallback}")
+                        break
+                    except:
+                        continue
 
         texts = [chunk['text'] for chunk in chunks]
         all_embeddings = []
@@ -206,30 +224,37 @@ def create_embeddings_with_reranker(chunks: List[Dict],
             print(f"[INFO] 임베딩 배치 {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size} 처리 중... ({len(batch_texts)}개)")
 
             # 메모리 정리
-            if i > 0:
-                torch.cuda.empty_cache() if torch.cuda.is_available() else None
+            if i > 0 and torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
 
+            batch_embeddings = []
             try:
-                batch_embeddings = embedding_model.encode(
+                batch_embeddings.extend(embedding_model.encode(
                     batch_texts,
                     batch_size=min(batch_size, len(batch_texts)),
                     show_progress_bar=True,
                     convert_to_numpy=True,
                     normalize_embeddings=True  # 코사인 유사도 최적화
-                )
-                all_embeddings.extend(batch_embeddings)
+                ))
 
             except Exception as e:
                 print(f"[ERROR] 배치 처리 실패: {str(e)}")
                 # 개별 처리로 폴백
+                batch_embeddings = []
                 for text in batch_texts:
                     try:
                         emb = embedding_model.encode([text], convert_to_numpy=True)[0]
-                        all_embeddings.append(emb)
+                        batch_embeddings.append(emb)
                     except:
                         # 더미 임베딩 (문제가 있는 텍스트용)
                         emb = np.zeros(embedding_model.get_sentence_embedding_dimension())
-                        all_embeddings.append(emb)
+                        batch_embeddings.append(emb)
+
+            if writer is not None:
+                batch_chunks = chunks[i:i + batch_size]
+                writer.add_chunks(np.array(batch_embeddings), batch_chunks, [chunk['metadata'] for chunk in batch_chunks])
+            if keep_embeddings:
+                all_embeddings.extend(batch_embeddings)
 
             time.sleep(0.1)  # 메모리 안정화
 
@@ -243,8 +268,10 @@ def create_embeddings_with_reranker(chunks: List[Dict],
         return np.array([]), None
 
 def process_multiple_pdfs(pdf_paths: List[str],
-                         output_path: str = None) -> str:
-    """여러 PDF 파일을 처리하여 통합 벡터스토어 생성"""
+                         output_path: str = None,
+                         encoder_backend: str = None,
+                         write_pickle: bool = True) -> str:
+    """여러 PDF 파일을 처리하여 통합 벡터스토어 생성 (write_pickle=False이면 PKL 없이 컬럼형 저장소만 생성)"""
 
     if not output_path:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -288,49 +315,63 @@ def process_multiple_pdfs(pdf_paths: List[str],
     if not chunks:
         raise ValueError("유효한 청크를 생성할 수 없습니다.")
 
-    # 4. 임베딩 및 리랭커 생성
+    # 4. 임베딩 및 리랭커 생성 (배치마다 컬럼형 저장소에 이어 쓰기)
     print("\n[STEP 4] 임베딩 및 리랭커 생성...")
-    embeddings, reranker = create_embeddings_with_reranker(chunks, batch_size=12)
-
-    if len(embeddings) == 0:
-        raise ValueError("임베딩 생성에 실패했습니다.")
-
-    # 5. 벡터스토어 저장
-    print("\n[STEP 5] 벡터스토어 저장...")
-
     vectorstore_data = {
-        # 기본 데이터
-        'documents': [chunk['text'] for chunk in chunks],
-        'embeddings': embeddings,
-        'metadatas': [chunk['metadata'] for chunk in chunks],
-        'chunks': chunks,  # 상세 정보 포함
-
         # 메타 정보
         'source_files': source_info,
         'created_at': datetime.now().isoformat(),
         'model_name': 'paraphrase-multilingual-MiniLM-L12-v2',
-        'embedding_dimension': embeddings.shape[1] if len(embeddings) > 0 else 0,
         'total_chunks': len(chunks),
         'total_documents': len(chunks),
         'chunk_strategy': 'smart_paragraph',
         'target_chunk_size': 1200,
         'overlap_size': 150,
 
-        # 리랭커 정보 (모델 객체는 저장하지 않음)
-        'has_reranker': reranker is not None,
-        'reranker_model_name': reranker.model.name_or_path if reranker else None,
-
         # 품질 통계
         'avg_chunk_length': np.mean([len(chunk['text']) for chunk in chunks]),
         'min_chunk_length': min([len(chunk['text']) for chunk in chunks]),
         'max_chunk_length': max([len(chunk['text']) for chunk in chunks])
     }
+    with StoreWriter(store_dir_for(output_path), vectorstore_data,
+                     source_path=output_path if write_pickle else None) as writer:
+        embeddings, reranker = create_embeddings_with_reranker(chunks, batch_size=12, encoder_backend=encoder_backend,
+                                                               writer=writer, keep_embeddings=write_pickle)
+
+        if writer.count != len(chunks):
+            raise ValueError("임베딩 생성에 실패했습니다.")
+
+        # 5. 벡터스토어 저장
+        print("\n[STEP 5] 벡터스토어 저장...")
+        vectorstore_data.update({
+            'embedding_dimension': writer.dimension or 0,
+
+            # 리랭커 정보 (모델 객체는 저장하지 않음)
+            'has_reranker': reranker is not None,
+            'reranker_model_name': reranker.model.name_or_path if reranker else None,
+        })
+        writer.meta.update(vectorstore_data)
+
+        if write_pickle:
+            vectorstore_data.update({
+                # 기본 데이터
+                'documents': [chunk['text'] for chunk in chunks],
+                'embeddings': embeddings,
+                'metadatas': [chunk['metadata'] for chunk in chunks],
+                'chunks': chunks,  # 상세 정보 포함
+            })
+            with open(output_path, 'wb') as f:
+                pickle.dump(vectorstore_data, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-    with open(output_path, 'wb') as f:
-        pickle.dump(vectorstore_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    store_dir = writer.out_dir
+    # 고정 검색 쿼리 임베딩 뱅크
+    build_query_bank(store_dir, backend=encoder_backend)
+    # 밀집 검색 색인 (매니페스트의 vector_index_backend, 없으면 저장소 크기로 선택)
+    save_vector_index(store_dir)
 
     print(f"\n[SUCCESS] 통합 벡터스토어 저장 완료: {output_path}")
-    print(f"[INFO] 총 {len(chunks)}개 청크, {embeddings.shape[1]}차원 임베딩")
+    print(f"[INFO] 컬럼형 저장소: {store_dir}")
+    print(f"[INFO] 총 {len(chunks)}개 청크, {vectorstore_data['embedding_dimension']}차원 임베딩")
     print(f"[INFO] 평균 청크 길이: {vectorstore_data['avg_chunk_length']:.0f}자")
     print(f"[INFO] 리랭커 포함: {'예' if reranker else '아니오'}")
 
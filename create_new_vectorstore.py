@@ -9,7 +9,7 @@ import os
 import pickle
 import numpy as np
 import streamlit as st
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 from datetime import datetime
 
@@ -17,9 +17,10 @@ from datetime import datetime
 import PyPDF2
 import fitz  # PyMuPDF
 
-# 임베딩용
-from sentence_transformers import SentenceTransformer
-import torch
+from vector_store import StoreWriter, store_dir_for
+from query_bank import build_query_bank
+from vector_index import save_vector_index
+from embedding_service import load_encoder, resolve_encoder_backend
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """PDF에서 텍스트 추출 (PyMuPDF 사용 - 한글 지원 우수)"""
@@ -128,14 +129,24 @@ def clean_and_chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) ->
     print(f"[INFO] 청킹 완료: {len(chunks)}개 청크 생성")
     return chunks
 
-def create_embeddings_batch(chunks: List[Dict], model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2', batch_size: int = 32) -> np.ndarray:
-    """메모리 효율적인 배치 임베딩 생성"""
+def create_embeddings_batch(chunks: List[Dict], model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2', batch_size: int = 32,
+                            encoder_backend: str = None, writer: Optional[StoreWriter] = None,
+                            keep_embeddings: bool = True) -> np.ndarray:
+    """메모리 효율적인 배치 임베딩 생성 (encoder_backend='onnx'이면 onnxruntime int8 인코더)
+
+    writer를 주면 배치마다 컬럼형 저장소에 이어 쓰고, keep_embeddings=False이면 반환용 임베딩을 모으지 않습니다.
+    """
 
     try:
-        # GPU 사용 가능시 사용, 아니면 CPU
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        model = SentenceTransformer(model_name, device=device)
-        print(f"[INFO] 모델 로드 완료: {model_name} (device: {device})")
+        # torch 백엔드에서만 torch를 불러와 GPU 사용 가능시 사용, 아니면 CPU
+        backend = resolve_encoder_backend(encoder_backend)
+        torch = None
+        device = 'cpu'
+        if backend == 'torch':
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        model = load_encoder(model_name, backend, device=device)
+        print(f"[INFO] 모델 로드 완료: {model_name} (device: {device}, 백엔드: {backend})")
 
         texts = [chunk['text'] for chunk in chunks]
         all_embeddings = []
@@ -147,30 +158,37 @@ def create_embeddings_batch(chunks: List[Dict], model_name: str = 'paraphrase-mu
             print(f"[INFO] 배치 {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size} 처리 중... ({len(batch_texts)}개)")
 
             # 메모리 정리
-            if i > 0:
-                torch.cuda.empty_cache() if torch.cuda.is_available() else None
+            if i > 0 and torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
 
+            batch_embeddings = []
             try:
-                batch_embeddings = model.encode(
+                batch_embeddings.extend(model.encode(
                     batch_texts,
                     batch_size=min(batch_size, len(batch_texts)),
                     show_progress_bar=True,
                     convert_to_numpy=True,
                     normalize_embeddings=True  # 코사인 유사도 최적화
-                )
-                all_embeddings.extend(batch_embeddings)
+                ))
 
             except Exception as e:
                 print(f"[ERROR] 배치 처리 실패: {str(e)}")
                 # 개별 처리로 폴백
+                batch_embeddings = []
                 for text in batch_texts:
                     try:
                         emb = model.encode([text], convert_to_numpy=True)[0]
-                        all_embeddings.append(emb)
+                        batch_embeddings.append(emb)
                     except:
                         # 더미 임베딩 (문제가 있는 텍스트용)
                         emb = np.zeros(model.get_sentence_embedding_dimension())
-                        all_embeddings.append(emb)
+                        batch_embeddings.append(emb)
+
+            if writer is not None:
+                batch_chunks = chunks[i:i + batch_size]
+                writer.add_chunks(np.array(batch_embeddings), batch_chunks, [chunk['metadata'] for chunk in batch_chunks])
+            if keep_embeddings:
+                all_embeddings.extend(batch_embeddings)
 
             time.sleep(0.1)  # 메모리 안정화
 
@@ -183,8 +201,9 @@ def create_embeddings_batch(chunks: List[Dict], model_name: str = 'paraphrase-mu
         print(f"[ERROR] 임베딩 생성 실패: {str(e)}")
         return np.array([])
 
-def create_new_vectorstore(pdf_path: str, output_path: str = None) -> str:
-    """새로운 벡터스토어 생성"""
+def create_new_vectorstore(pdf_path: str, output_path: str = None, encoder_backend: str = None,
+                           write_pickle: bool = True) -> str:
+    """새로운 벡터스토어 생성 (write_pickle=False이면 PKL 없이 컬럼형 저장소만 생성)"""
 
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF 파일을 찾을 수 없습니다: {pdf_path}")
@@ -207,34 +226,46 @@ def create_new_vectorstore(pdf_path: str, output_path: str = None) -> str:
     if not chunks:
         raise ValueError("유효한 청크를 생성할 수 없습니다.")
 
-    # 3. 임베딩 생성
+    # 3. 임베딩 생성 (배치마다 컬럼형 저장소에 이어 쓰기)
     print("[STEP 3] 임베딩 생성...")
-    embeddings = create_embeddings_batch(chunks, batch_size=16)  # 메모리 고려해서 작은 배치
-
-    if len(embeddings) == 0:
-        raise ValueError("임베딩 생성에 실패했습니다.")
-
-    # 4. 벡터스토어 저장
-    print("[STEP 4] 벡터스토어 저장...")
-
     vectorstore_data = {
-        'documents': [chunk['text'] for chunk in chunks],
-        'embeddings': embeddings,
-        'metadatas': [chunk['metadata'] for chunk in chunks],
-        'chunks': chunks,  # 상세 정보 포함
         'pdf_path': pdf_path,
         'created_at': datetime.now().isoformat(),
         'model_name': 'paraphrase-multilingual-MiniLM-L12-v2',
-        'embedding_dimension': embeddings.shape[1] if len(embeddings) > 0 else 0,
         'total_chunks': len(chunks),
         'total_documents': len(chunks)
     }
+    with StoreWriter(store_dir_for(output_path), vectorstore_data,
+                     source_path=output_path if write_pickle else None) as writer:
+        embeddings = create_embeddings_batch(chunks, batch_size=16, encoder_backend=encoder_backend,  # 메모리 고려해서 작은 배치
+                                             writer=writer, keep_embeddings=write_pickle)
+
+        if writer.count != len(chunks):
+            raise ValueError("임베딩 생성에 실패했습니다.")
+        vectorstore_data['embedding_dimension'] = writer.dimension or 0
+        writer.meta.update(vectorstore_data)
+
+        # 4. 벡터스토어 저장
+        print("[STEP 4] 벡터스토어 저장...")
+        if write_pickle:
+            vectorstore_data.update({
+                'documents': [chunk['text'] for chunk in chunks],
+                'embeddings': embeddings,
+                'metadatas': [chunk['metadata'] for chunk in chunks],
+                'chunks': chunks,  # 상세 정보 포함
+            })
+            with open(output_path, 'wb') as f:
+                pickle.dump(vectorstore_data, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-    with open(output_path, 'wb') as f:
-        pickle.dump(vectorstore_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    store_dir = writer.out_dir
+    # 고정 검색 쿼리 임베딩 뱅크
+    build_query_bank(store_dir, backend=encoder_backend)
+    # 밀집 검색 색인 (매니페스트의 vector_index_backend, 없으면 저장소 크기로 선택)
+    save_vector_index(store_dir)
 
     print(f"[SUCCESS] 벡터스토어 저장 완료: {output_path}")
-    print(f"[INFO] 총 {len(chunks)}개 청크, {embeddings.shape[1]}차원 임베딩")
+    print(f"[INFO] 컬럼형 저장소: {store_dir}")
+    print(f"[INFO] 총 {len(chunks)}개 청크, {vectorstore_data['embedding_dimension']}차원 임베딩")
 
     return output_path
 
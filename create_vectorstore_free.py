@@ -7,9 +7,12 @@
 import os
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import pandas as pd
 import time
+from vector_store import StoreWriter, store_dir_for
+from query_bank import build_query_bank
+from vector_index import save_vector_index
+from embedding_service import load_encoder
 
 def chunk_text(text, chunk_size=1000, overlap=200):
     """텍스트를 청크로 분할"""
@@ -41,52 +44,69 @@ def chunk_text(text, chunk_size=1000, overlap=200):
     
     return chunks
 
-def create_free_vectorstore(documents, output_path, model_name='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'):
-    """무료 sentence-transformers로 벡터스토어 생성"""
+def create_free_vectorstore(documents, output_path, model_name='sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+                            encoder_backend=None, write_pickle=True):
+    """무료 sentence-transformers로 벡터스토어 생성 (encoder_backend='onnx'이면 onnxruntime int8 인코더)
+
+    문서별 임베딩을 바로 컬럼형 저장소에 이어 쓰며, write_pickle=False이면 PKL 없이 컬럼형 저장소만 만듭니다.
+    """
     print(f"모델 로딩: {model_name}")
-    model = SentenceTransformer(model_name)
-    
-    all_chunks = []
-    all_embeddings = []
+    model = load_encoder(model_name, encoder_backend)
     
-    for i, doc in enumerate(documents):
-        print(f"문서 {i+1}/{len(documents)} 처리 중...")
-        
-        # 텍스트 청킹
-        chunks = chunk_text(doc['content'])
-        print(f"  - {len(chunks)}개 청크 생성")
-        
-        # 각 청크에 메타데이터 추가
-        for chunk in chunks:
-            chunk_with_meta = {
-                'text': chunk['text'],
-                'source': doc.get('source', f'document_{i+1}'),
-                'title': doc.get('title', f'문서 {i+1}'),
-                'page': doc.get('page', 1),
-                'chunk_id': len(all_chunks)
-            }
-            all_chunks.append(chunk_with_meta)
-        
-        # 임베딩 생성
-        chunk_texts = [chunk['text'] for chunk in chunks]
-        embeddings = model.encode(chunk_texts, show_progress_bar=True)
-        all_embeddings.extend(embeddings)
-        
-        print(f"  - {len(embeddings)}개 임베딩 생성 완료")
-    
-    # 벡터스토어 저장
     vectorstore = {
-        'chunks': all_chunks,
-        'embeddings': np.array(all_embeddings),
         'model_name': model_name,
         'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
     }
+    all_chunks = []
+    all_embeddings = []
+    
+    # 컬럼형 저장소(mmap 로드용)에 문서별로 이어 쓰기
+    with StoreWriter(store_dir_for(output_path), vectorstore,
+                     source_path=output_path if write_pickle else None) as writer:
+        for i, doc in enumerate(documents):
+            print(f"문서 {i+1}/{len(documents)} 처리 중...")
+            
+            # 텍스트 청킹
+            chunks = chunk_text(doc['content'])
+            print(f"  - {len(chunks)}개 청크 생성")
+            
+            # 각 청크에 메타데이터 추가
+            doc_chunks = []
+            for chunk in chunks:
+                chunk_with_meta = {
+                    'text': chunk['text'],
+                    'source': doc.get('source', f'document_{i+1}'),
+                    'title': doc.get('title', f'문서 {i+1}'),
+                    'page': doc.get('page', 1),
+                    'chunk_id': writer.count + len(doc_chunks)
+                }
+                doc_chunks.append(chunk_with_meta)
+            
+            # 임베딩 생성
+            chunk_texts = [chunk['text'] for chunk in chunks]
+            embeddings = model.encode(chunk_texts, show_progress_bar=True)
+            writer.add_chunks(embeddings, doc_chunks)
+            if write_pickle:
+                all_chunks.extend(doc_chunks)
+                all_embeddings.extend(embeddings)
+            
+            print(f"  - {len(embeddings)}개 임베딩 생성 완료")
+        
+        # 벡터스토어 저장
+        if write_pickle:
+            vectorstore['chunks'] = all_chunks
+            vectorstore['embeddings'] = np.array(all_embeddings)
+            with open(output_path, 'wb') as f:
+                pickle.dump(vectorstore, f)
     
-    with open(output_path, 'wb') as f:
-        pickle.dump(vectorstore, f)
+    store_dir = writer.out_dir
+    # 고정 검색 쿼리 임베딩 뱅크
+    build_query_bank(store_dir, model)
+    # 밀집 검색 색인 (매니페스트의 vector_index_backend, 없으면 저장소 크기로 선택)
+    save_vector_index(store_dir)
     
-    print(f"벡터스토어 저장 완료: {output_path}")
-    print(f"총 {len(all_chunks)}개 청크, {len(all_embeddings)}개 임베딩")
+    print(f"벡터스토어 저장 완료: {output_path if write_pickle else store_dir}")
+    print(f"총 {writer.count}개 청크, {writer.count}개 임베딩")
     
     return vectorstore
 
@@ -6,11 +6,14 @@
 import os
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import pandas as pd
 import time
 import gc
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from vector_store import StoreWriter, store_dir_for
+from query_bank import build_query_bank
+from vector_index import save_vector_index
+from embedding_service import load_encoder
 
 def chunk_text_memory_safe(text: str, chunk_size: int = 800, overlap: int = 150) -> List[Dict[str, Any]]:
     """메모리 효율적인 텍스트 청킹"""
@@ -47,7 +50,7 @@ def chunk_text_memory_safe(text: str, chunk_size: int = 800, overlap: int = 150)
     
     return chunks
 
-def create_embeddings_batch(model: SentenceTransformer, texts: List[str], batch_size: int = 32) -> np.ndarray:
+def create_embeddings_batch(model, texts: List[str], batch_size: int = 32) -> np.ndarray:
     """배치 단위로 임베딩 생성"""
     all_embeddings = []
     
@@ -72,9 +75,16 @@ def create_memory_safe_vectorstore(
     output_path: str,
     model_name: str = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
     batch_size: int = 16,
-    max_chunks_per_doc: int = 200
+    max_chunks_per_doc: int = 200,
+    vector_index_backend: Optional[str] = None,
+    encoder_backend: Optional[str] = None,
+    write_pickle: bool = True
 ) -> Dict[str, Any]:
-    """메모리 안전 벡터스토어 생성"""
+    """메모리 안전 벡터스토어 생성 (encoder_backend='onnx'이면 onnxruntime int8 인코더)
+
+    문서별 임베딩을 바로 컬럼형 저장소에 이어 씁니다. write_pickle=False이면 PKL을 쓰지 않아
+    전체 청크/임베딩을 메모리에 모으지 않습니다 (앱은 PKL 없이 컬럼형 저장소만으로 로드).
+    """
     
     print(f"메모리 안전 모드로 벡터스토어 생성: {output_path}")
     print(f"모델: {model_name}")
@@ -82,71 +92,12 @@ def create_memory_safe_vectorstore(
     
     # 모델 로드
     print("모델 로딩...")
-    model = SentenceTransformer(model_name)
+    model = load_encoder(model_name, encoder_backend)
     
-    all_chunks = []
-    all_embeddings = []
-    
-    for doc_idx, doc in enumerate(documents):
-        print(f"\n문서 {doc_idx + 1}/{len(documents)} 처리 중...")
-        print(f"문서 제목: {doc.get('title', 'Unknown')}")
-        
-        # 문서 청킹
-        chunks = chunk_text_memory_safe(doc['content'])
-        print(f"  - 총 {len(chunks)}개 청크 생성")
-        
-        # 청크 수 제한 (메모리 보호)
-        if len(chunks) > max_chunks_per_doc:
-            print(f"  - 청크 수를 {max_chunks_per_doc}개로 제한")
-            chunks = chunks[:max_chunks_per_doc]
-        
-        # 청크에 메타데이터 추가
-        doc_chunks = []
-        for chunk_idx, chunk in enumerate(chunks):
-            chunk_with_meta = {
-                'text': chunk['text'],
-                'source': doc.get('source', f'document_{doc_idx + 1}'),
-                'title': doc.get('title', f'문서 {doc_idx + 1}'),
-                'page': doc.get('page', 1),
-                'doc_id': doc_idx,
-                'chunk_id': len(all_chunks) + chunk_idx,
-                'start_pos': chunk['start_pos'],
-                'end_pos': chunk['end_pos']
-            }
-            doc_chunks.append(chunk_with_meta)
-        
-        # 배치 임베딩 생성
-        chunk_texts = [chunk['text'] for chunk in doc_chunks]
-        print(f"  - {len(chunk_texts)}개 청크 임베딩 생성 중...")
-        
-        doc_embeddings = create_embeddings_batch(model, chunk_texts, batch_size)
-        
-        # 결과 저장
-        all_chunks.extend(doc_chunks)
-        all_embeddings.append(doc_embeddings)
-        
-        print(f"  - 완료: {len(doc_embeddings)}개 임베딩")
-        
-        # 메모리 정리
-        del chunk_texts, doc_chunks, chunks, doc_embeddings
-        gc.collect()
-    
-    # 모든 임베딩 결합
-    print("\n임베딩 결합 중...")
-    final_embeddings = np.vstack(all_embeddings) if all_embeddings else np.array([])
-    
-    # 메모리 정리
-    del all_embeddings
-    gc.collect()
-    
-    # 벡터스토어 구성
+    # 벡터스토어 메타 정보 (청크/임베딩은 PKL을 쓸 때만 모음)
     vectorstore = {
-        'chunks': all_chunks,
-        'embeddings': final_embeddings,
         'model_name': model_name,
         'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-        'chunk_count': len(all_chunks),
-        'embedding_dimension': final_embeddings.shape[1] if len(final_embeddings) > 0 else 0,
         'creation_config': {
             'batch_size': batch_size,
             'max_chunks_per_doc': max_chunks_per_doc,
@@ -154,16 +105,93 @@ def create_memory_safe_vectorstore(
             'overlap': 150
         }
     }
+    if vector_index_backend:
+        # 매니페스트에 기록되어 색인 생성 시 사용 (예: 'faiss_ivfpq')
+        vectorstore['vector_index_backend'] = vector_index_backend
+    
+    all_chunks = []
+    all_embeddings = []
+    
+    # 컬럼형 저장소(mmap 로드용)에 문서별로 이어 쓰기
+    with StoreWriter(store_dir_for(output_path), vectorstore,
+                     source_path=output_path if write_pickle else None) as writer:
+        for doc_idx, doc in enumerate(documents):
+            print(f"\n문서 {doc_idx + 1}/{len(documents)} 처리 중...")
+            print(f"문서 제목: {doc.get('title', 'Unknown')}")
+            
+            # 문서 청킹
+            chunks = chunk_text_memory_safe(doc['content'])
+            print(f"  - 총 {len(chunks)}개 청크 생성")
+            
+            # 청크 수 제한 (메모리 보호)
+            if len(chunks) > max_chunks_per_doc:
+                print(f"  - 청크 수를 {max_chunks_per_doc}개로 제한")
+                chunks = chunks[:max_chunks_per_doc]
+            
+            # 청크에 메타데이터 추가
+            doc_chunks = []
+            for chunk_idx, chunk in enumerate(chunks):
+                chunk_with_meta = {
+                    'text': chunk['text'],
+                    'source': doc.get('source', f'document_{doc_idx + 1}'),
+                    'title': doc.get('title', f'문서 {doc_idx + 1}'),
+                    'page': doc.get('page', 1),
+                    'doc_id': doc_idx,
+                    'chunk_id': writer.count + chunk_idx,
+                    'start_pos': chunk['start_pos'],
+                    'end_pos': chunk['end_pos']
+                }
+                doc_chunks.append(chunk_with_meta)
+            
+            # 배치 임베딩 생성
+            chunk_texts = [chunk['text'] for chunk in doc_chunks]
+            print(f"  - {len(chunk_texts)}개 청크 임베딩 생성 중...")
+            
+            doc_embeddings = create_embeddings_batch(model, chunk_texts, batch_size)
+            
+            # 결과 저장
+            writer.add_chunks(doc_embeddings, doc_chunks)
+            if write_pickle:
+                all_chunks.extend(doc_chunks)
+                all_embeddings.append(doc_embeddings)
+            
+            print(f"  - 완료: {len(doc_embeddings)}개 임베딩")
+            
+            # 메모리 정리
+            del chunk_texts, doc_chunks, chunks, doc_embeddings
+            gc.collect()
+        
+        vectorstore['chunk_count'] = writer.count
+        vectorstore['embedding_dimension'] = writer.dimension or 0
+        writer.meta.update(vectorstore)
+        
+        if write_pickle:
+            # 모든 임베딩 결합
+            print("\n임베딩 결합 중...")
+            vectorstore['chunks'] = all_chunks
+            vectorstore['embeddings'] = np.vstack(all_embeddings) if all_embeddings else np.array([])
+            
+            # 메모리 정리
+            del all_embeddings
+            gc.collect()
+            
+            # 저장
+            print(f"\n벡터스토어 저장 중: {output_path}")
+            with open(output_path, 'wb') as f:
+                pickle.dump(vectorstore, f, protocol=pickle.HIGHEST_PROTOCOL)
     
-    # 저장
-    print(f"\n벡터스토어 저장 중: {output_path}")
-    with open(output_path, 'wb') as f:
-        pickle.dump(vectorstore, f, protocol=pickle.HIGHEST_PROTOCOL)
+    store_dir = writer.out_dir
+    # 고정 검색 쿼리 임베딩 뱅크
+    build_query_bank(store_dir, model)
+    # 밀집 검색 색인 (매니페스트의 vector_index_backend, 없으면 저장소 크기로 선택)
+    save_vector_index(store_dir)
     
     print(f"✅ 벡터스토어 생성 완료!")
-    print(f"  - 총 청크 수: {len(all_chunks):,}")
+    print(f"  - 총 청크 수: {writer.count:,}")
     print(f"  - 임베딩 차원: {vectorstore['embedding_dimension']}")
-    print(f"  - 파일 크기: {os.path.getsize(output_path) / (1024*1024):.1f} MB")
+    if write_pickle:
+        print(f"  - 파일 크기: {os.path.getsize(output_path) / (1024*1024):.1f} MB")
+    print(f"  - 컬럼형 저장소: {store_dir}")
     
     return vectorstore
 
@@ -0,0 +1,206 @@
+"""
+쿼리 임베딩 캐시 모듈
+(모델 이름, 인코더 백엔드, 정규화된 텍스트)를 키로 정규화 임베딩을 보관하는 스레드 안전 LRU 캐시입니다.
+같은 모델도 백엔드(torch, onnx int8 등)마다 임베딩 값이 조금씩 다르므로 백엔드별로 따로 보관합니다.
+모든 쿼리 인코딩은 cached_encode를 거치며, 캐시에 없는 텍스트만 한 번의 배치로 인코딩합니다.
+저장소의 쿼리 임베딩 뱅크(query_bank.py)는 제거되지 않는 고정 항목으로 등록됩니다.
+ORDINANCE_EMBEDDING_CACHE에 파일 경로를 지정하면 종료 시 저장하고 다음 실행에서 다시 읽습니다.
+"""
+
+import os
+import re
+import json
+import atexit
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+CACHE_PATH_ENV = 'ORDINANCE_EMBEDDING_CACHE'
+DEFAULT_MAX_ENTRIES = 8192
+DEFAULT_CACHE_BACKEND = 'torch'  # encoder_backend 속성이 없는 인코더 (SentenceTransformer)
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (NFC, 공백 정리)"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def canonical_model_name(name: str) -> str:
+    """'sentence-transformers/' 접두사 유무와 무관한 모델 이름"""
+    return name[len('sentence-transformers/'):] if name.startswith('sentence-transformers/') else name
+
+
+def model_key(model) -> str:
+    """SentenceTransformer 모델(또는 EmbeddingService) 식별 이름"""
+    getters = (
+        lambda m: m.model_name,  # EmbeddingService
+        lambda m: m.model_card_data.base_model,
+        lambda m: m[0].auto_model.config._name_or_path,
+        lambda m: m.name_or_path,
+    )
+    for getter in getters:
+        try:
+            name = getter(model)
+        except Exception:
+            continue
+        if name:
+            return canonical_model_name(str(name))
+    return f"{type(model).__name__}:{id(model)}"
+
+
+def encoder_backend(model) -> str:
+    """캐시 키용 인코더 백엔드 ('torch', 'onnx-int8', 'onnx-fp32')"""
+    return str(getattr(model, 'encoder_backend', None) or DEFAULT_CACHE_BACKEND)
+
+
+class EmbeddingCache:
+    """정규화 임베딩 LRU 캐시"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: 'OrderedDict[Tuple[str, str, str], np.ndarray]' = OrderedDict()
+        self._static: Dict[Tuple[str, str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.static_hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_static(self, model_name: str, texts: List[str], embeddings: np.ndarray,
+                   backend: str = DEFAULT_CACHE_BACKEND) -> None:
+        """미리 계산한 임베딩을 고정 항목으로 등록 (LRU 제거 대상 아님)"""
+        name = canonical_model_name(model_name)
+        with self._lock:
+            for text, vector in zip(texts, embeddings):
+                self._static[(name, backend, normalize_query(text))] = vector
+
+    def encode(self, model, texts: List[str], model_name: Optional[str] = None) -> np.ndarray:
+        """텍스트 목록의 정규화 임베딩 (N, D) - 캐시에 없는 텍스트만 배치 인코딩"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        name = canonical_model_name(model_name) if model_name else model_key(model)
+        backend = encoder_backend(model)
+        keys = [(name, backend, normalize_query(text)) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._static.get(key)
+                if vector is not None:
+                    found[i] = vector
+                    self.static_hits += 1
+                    continue
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[i] = vector
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        # 같은 호출 안의 중복 텍스트는 한 번만 인코딩
+        missing = list(dict.fromkeys(key for i, key in enumerate(keys) if i not in found))
+        if missing:
+            encoded = np.asarray(model.encode([text for _, _, text in missing], convert_to_numpy=True,
+                                              normalize_embeddings=True), dtype=np.float32)
+            new_vectors = dict(zip(missing, encoded))
+            with self._lock:
+                for key, vector in new_vectors.items():
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            for i, key in enumerate(keys):
+                if i not in found:
+                    found[i] = new_vectors[key]
+
+        return np.stack([found[i] for i in range(len(keys))])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'static_hits': self.static_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'static_entries': len(self._static),
+                'max_entries': self.max_entries,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """캐시를 npz 파일로 저장 (임베딩 차원별로 묶어 저장)"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            items = list(self._entries.items())
+
+        # 차원별로 행렬을 묶고, 키 목록 순서대로 각 차원 행렬에서 한 행씩 꺼내 복원
+        keys = [list(key) for key, _ in items]
+        key_dims = [int(vector.shape[0]) for _, vector in items]
+        arrays = {
+            f'dim_{dim}': np.stack([vector for _, vector in items if vector.shape[0] == dim])
+            for dim in set(key_dims)
+        }
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=np.array(json.dumps({'keys': keys, 'dims': key_dims}, ensure_ascii=False)), **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """저장된 캐시 읽기 (손상된 파일은 무시)"""
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data['keys']))
+                arrays = {dim: data[f'dim_{dim}'] for dim in set(meta['dims'])}
+        except Exception as e:
+            print(f"[WARNING] 임베딩 캐시 읽기 실패 ({path}): {e}")
+            return
+
+        # 백엔드가 키에 없던 이전 형식 항목은 어떤 인코더로 만들었는지 알 수 없어 버림
+        rows = {dim: 0 for dim in arrays}
+        skipped = 0
+        with self._lock:
+            for key, dim in zip(meta['keys'], meta['dims']):
+                if len(key) == 3:
+                    self._entries[tuple(key)] = arrays[dim][rows[dim]]
+                else:
+                    skipped += 1
+                rows[dim] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        print(f"[INFO] 임베딩 캐시 {len(self._entries)}개 로드: {path}"
+              + (f" (백엔드 없는 이전 형식 {skipped}개 제외)" if skipped else ""))
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """프로세스 전역 임베딩 캐시 (경로가 지정되면 종료 시 저장)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(path=os.environ.get(CACHE_PATH_ENV) or None)
+            if _cache.path:
+                atexit.register(_cache.save)
+        return _cache
+
+
+def cached_encode(model, texts: List[str]) -> np.ndarray:
+    """전역 캐시를 거친 정규화 임베딩"""
+    return get_embedding_cache().encode(model, texts)
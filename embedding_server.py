@@ -0,0 +1,314 @@
+"""
+로컬 임베딩 서버
+임베딩 모델은 데몬 한 프로세스만 로드하고 localhost HTTP로 encode 요청을 처리합니다.
+Streamlit 워커와 생성 스크립트는 RemoteEncoder로 연결하므로 torch를 불러오지 않고 바로 시작합니다.
+서버는 요청 안의 중복 텍스트를 합쳐 캐시에 없는 텍스트만 한 번의 배치로 인코딩하고,
+(모델, 텍스트 내용 해시)를 키로 정규화 전 임베딩을 LRU 캐시에 보관합니다.
+실행 중 서버가 중단되면 RemoteEncoder는 서버와 같은 백엔드의 로컬 인코더로 전환합니다.
+
+사용법:
+    python embedding_server.py [--host 127.0.0.1] [--port 8765] [--backend torch|onnx] [--preload 모델 ...]
+    ORDINANCE_ENCODER_BACKEND=remote streamlit run streamlit_app.py   # 워커는 서버로 인코딩
+    ORDINANCE_EMBEDDING_SERVER=http://127.0.0.1:8765                  # 서버 주소 (기본값)
+"""
+
+import os
+import json
+import base64
+import signal
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+from typing import List, Dict, Any, Optional
+
+from vector_store import DEFAULT_MODEL_NAME
+from embedding_cache import encoder_backend
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+SERVER_URL_ENV = 'ORDINANCE_EMBEDDING_SERVER'
+DEFAULT_CACHE_ENTRIES = 50000
+REQUEST_MAX_TEXTS = 256  # 클라이언트가 요청 하나에 담는 최대 텍스트 수
+REQUEST_TIMEOUT = 300
+
+
+def server_url() -> str:
+    """임베딩 서버 주소 (환경 변수, 없으면 localhost 기본 포트)"""
+    return (os.environ.get(SERVER_URL_ENV) or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}").rstrip('/')
+
+
+def content_key(model_name: str, text: str) -> bytes:
+    """캐시 키: 모델 이름과 텍스트 내용의 해시 (긴 청크도 20바이트)"""
+    return hashlib.sha1(f"{model_name}\0{text}".encode('utf-8')).digest()
+
+
+class ContentHashCache:
+    """내용 해시 -> 정규화 전 임베딩 LRU 캐시 (스레드 안전)"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            found = []
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                found.append(vector)
+            return found
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class EmbeddingServer:
+    """모델별 EmbeddingService와 내용 해시 캐시를 소유하는 서버 측 객체"""
+
+    def __init__(self, backend: Optional[str] = None, cache_entries: int = DEFAULT_CACHE_ENTRIES):
+        from embedding_service import resolve_encoder_backend, DEFAULT_ENCODER_BACKEND
+        backend = resolve_encoder_backend(backend)
+        # 서버 자신은 원격 백엔드를 쓸 수 없음 (환경 변수를 워커와 공유하는 경우)
+        self.backend = DEFAULT_ENCODER_BACKEND if backend == 'remote' else backend
+        self.cache = ContentHashCache(cache_entries)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.encoded_texts = 0
+
+    def service(self, model_name: str):
+        from embedding_service import get_embedding_service
+        return get_embedding_service(model_name, self.backend)
+
+    def encode(self, model_name: str, texts: List[str], normalize: bool = True,
+               batch_size: Optional[int] = None) -> np.ndarray:
+        """임베딩 (N, D) float32 - 캐시에 없는 고유 텍스트만 한 번의 배치로 인코딩"""
+        service = self.service(model_name)
+        keys = [content_key(service.model_name, text) for text in texts]
+        found = dict(zip(keys, self.cache.get_many(keys)))
+
+        missing = {key: text for key, text in zip(keys, texts) if found[key] is None}
+        if missing:
+            vectors = service.encode(list(missing.values()), normalize_embeddings=False, batch_size=batch_size)
+            self.cache.put_many(list(missing), vectors)
+            found.update(zip(missing, vectors))
+
+        embeddings = (np.stack([found[key] for key in keys]).astype(np.float32, copy=False) if keys
+                      else np.zeros((0, service.dimension), dtype=np.float32))
+        if normalize and len(embeddings):
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+        with self._stats_lock:
+            self.requests += 1
+            self.texts += len(texts)
+            self.encoded_texts += len(missing)
+        return embeddings
+
+    def info(self, model_name: str) -> Dict[str, Any]:
+        """모델 정보 (모델을 로드해 차원 확인)"""
+        service = self.service(model_name)
+        return {'model_name': service.model_name, 'dimension': service.dimension, 'backend': self.backend,
+                'encoder_backend': service.encoder_backend}
+
+    def stats(self) -> Dict[str, Any]:
+        from embedding_service import _services
+        return {
+            'backend': self.backend,
+            'requests': self.requests,
+            'texts': self.texts,
+            'encoded_texts': self.encoded_texts,
+            'cache': self.cache.stats(),
+            'models': [service.stats() for service in list(_services.values()) if service.loaded],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'OrdinanceEmbedding/1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == '/health':
+                self._send_json(self.server.embedding.stats())
+            elif url.path == '/info':
+                model_name = parse_qs(url.query).get('model', [DEFAULT_MODEL_NAME])[0]
+                self._send_json(self.server.embedding.info(model_name))
+            else:
+                self._send_json({'error': f"알 수 없는 경로: {url.path}"}, 404)
+        except Exception as e:
+            self._send_json({'error': str(e)}, 500)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/encode':
+            self._send_json({'error': f"알 수 없는 경로: {self.path}"}, 404)
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            embeddings = self.server.embedding.encode(
+                request.get('model', DEFAULT_MODEL_NAME), list(request['texts']),
+                bool(request.get('normalize', True)), request.get('batch_size'),
+            )
+        except Exception as e:
+            self._send_json({'error': str(e)}, 500)
+            return
+        self._send_json({
+            'shape': list(embeddings.shape),
+            'embeddings': base64.b64encode(np.ascontiguousarray(embeddings, dtype='<f4').tobytes()).decode('ascii'),
+        })
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 로그를 남기지 않음
+
+
+class RemoteEncoder:
+    """임베딩 서버 클라이언트 (SentenceTransformer.encode 호환)
+
+    실행 중 서버에 연결할 수 없게 되면 서버와 같은 백엔드의 로컬 인코더를 로드해 이후 요청을 처리합니다.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, url: Optional[str] = None,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.url = (url or server_url()).rstrip('/')
+        self.timeout = timeout
+        info = self._request(f"/info?model={quote(model_name)}")
+        self.model_name = info['model_name']
+        self.dimension = int(info['dimension'])
+        self.server_backend = info['backend']
+        self.server_encoder_backend = info.get('encoder_backend', self.server_backend)
+        self._local = None  # 서버가 중단되면 대신 쓰는 로컬 인코더
+
+    def __repr__(self) -> str:
+        return f"RemoteEncoder(model={self.model_name!r}, url={self.url!r})"
+
+    def _request(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"임베딩 서버 오류 ({e.code}): {e.read().decode('utf-8', 'replace')}") from e
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    @property
+    def encoder_backend(self) -> str:
+        """임베딩을 실제로 만드는 인코더의 백엔드 (서버 중단 후에는 로컬 인코더)"""
+        if self._local is not None:
+            return encoder_backend(self._local)
+        return self.server_encoder_backend
+
+    def encode(self, sentences: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """문장 임베딩 (N, D) float32 - REQUEST_MAX_TEXTS개씩 나눠 요청"""
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        parts = []
+        for start in range(0, len(texts), REQUEST_MAX_TEXTS):
+            batch = texts[start:start + REQUEST_MAX_TEXTS]
+            if self._local is None:
+                try:
+                    response = self._request('/encode', {
+                        'model': self.model_name,
+                        'texts': batch,
+                        'normalize': normalize_embeddings,
+                        'batch_size': batch_size,
+                    })
+                    parts.append(np.frombuffer(base64.b64decode(response['embeddings']), dtype='<f4')
+                                 .reshape(response['shape']))
+                    continue
+                except OSError as e:
+                    self._load_local(e)
+            parts.append(self._local.encode(batch, batch_size=batch_size, convert_to_numpy=True,
+                                            normalize_embeddings=normalize_embeddings))
+        if not parts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(parts).astype(np.float32, copy=False)
+
+    def _load_local(self, error: Exception) -> None:
+        """서버 연결이 끊겼을 때 서버와 같은 백엔드의 로컬 인코더로 전환"""
+        from embedding_service import load_encoder
+        print(f"[WARNING] 임베딩 서버 연결 끊김, 로컬 {self.server_backend} 인코더로 전환: {error}")
+        self._local = load_encoder(self.model_name, self.server_backend)
+
+    def stats(self) -> Dict[str, Any]:
+        """서버 통계 (/health)"""
+        return self._request('/health')
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, backend: Optional[str] = None,
+          cache_entries: int = DEFAULT_CACHE_ENTRIES, preload: Optional[List[str]] = None) -> None:
+    """임베딩 서버 실행 (종료 신호까지)"""
+    embedding = EmbeddingServer(backend, cache_entries)
+    for model_name in preload or []:
+        embedding.service(model_name).warm_up()
+
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.embedding = embedding
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[INFO] 임베딩 서버 실행 중: http://{host}:{port} (백엔드 {embedding.backend}, "
+          f"워커는 ORDINANCE_ENCODER_BACKEND=remote 로 연결)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] 임베딩 서버 종료")
+    finally:
+        httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 임베딩 서버")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--backend', default=None, help="서버 인코더 백엔드 (torch 또는 onnx)")
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES)
+    parser.add_argument('--preload', nargs='*', default=[DEFAULT_MODEL_NAME], help="시작 시 로드·예열할 모델")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.backend, args.cache_entries, args.preload)
+
+
+if __name__ == "__main__":
+    main()
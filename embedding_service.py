@@ -0,0 +1,314 @@
+"""
+임베딩 모델 서비스 모듈
+SentenceTransformer를 프로세스당 모델별로 한 번만 로드하고 스레드 안전하게 인코딩합니다.
+EmbeddingService는 SentenceTransformer.encode와 같은 형태로 호출할 수 있어
+검색 모듈(retrieval, embedding_cache)에 모델 대신 그대로 넘길 수 있습니다.
+앱 시작 시 warm_up(background=True)으로 로드와 첫 인코딩을 미리 끝내 둡니다.
+동시에 들어온 작은 encode 요청은 MicroBatcher가 최대 ORDINANCE_ENCODE_MAX_WAIT_MS(기본 5ms) 동안 모아
+ORDINANCE_ENCODE_MAX_BATCH(기본 64)개까지 한 배치로 인코딩합니다 (대기 시간 0이면 끔).
+검색은 embedding_service_for(store)로 저장소 매니페스트의 model_name에서 모델을 정하고,
+차원이 맞지 않는 모델은 로드 전에 거부합니다.
+인코더 백엔드는 'torch'(SentenceTransformer, 기본), 'onnx'(onnxruntime int8, onnx_encoder.py),
+'remote'(로컬 임베딩 서버, embedding_server.py) 중에서 backend 인자나 환경 변수 ORDINANCE_ENCODER_BACKEND로 고릅니다.
+"""
+
+import os
+import time
+import queue
+import threading
+import numpy as np
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+from vector_store import DEFAULT_MODEL_NAME
+from embedding_cache import canonical_model_name, cached_encode, encoder_backend
+
+DEFAULT_BATCH_SIZE = 32
+ENCODER_BACKENDS = ('torch', 'onnx', 'remote')
+DEFAULT_ENCODER_BACKEND = 'torch'
+ENCODER_BACKEND_ENV = 'ORDINANCE_ENCODER_BACKEND'
+ENCODE_MAX_BATCH_ENV = 'ORDINANCE_ENCODE_MAX_BATCH'
+ENCODE_MAX_WAIT_ENV = 'ORDINANCE_ENCODE_MAX_WAIT_MS'
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+DELAY_SAMPLES = 1000  # 대기 시간 통계에 남기는 최근 요청 수
+WARM_UP_TEXTS = ["조례 위법 판례", "기관위임사무 조례 제정 한계"]
+
+# 모델 레지스트리: 모델 이름 -> 임베딩 차원 (로드하지 않고 저장소와의 호환성 확인)
+MODEL_DIMENSIONS = {
+    'paraphrase-multilingual-MiniLM-L12-v2': 384,
+    'all-MiniLM-L6-v2': 384,
+    'all-mpnet-base-v2': 768,
+}
+
+
+class ModelMismatchError(ValueError):
+    """저장소 임베딩과 호환되지 않는 인코더"""
+
+
+def resolve_encoder_backend(backend: Optional[str] = None) -> str:
+    """인코더 백엔드 이름 (인자 > 환경 변수 > 기본 torch)"""
+    backend = (backend or os.environ.get(ENCODER_BACKEND_ENV) or DEFAULT_ENCODER_BACKEND).lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"알 수 없는 인코더 백엔드: {backend} (가능: {', '.join(ENCODER_BACKENDS)})")
+    return backend
+
+
+def load_encoder(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None, device: Optional[str] = None):
+    """백엔드별 인코더 로드 (onnx는 onnxruntime이나 내보낸 모델이 없으면, remote는 서버에 연결할 수 없으면 torch로 대체)"""
+    backend = resolve_encoder_backend(backend)
+    if backend == 'remote':
+        try:
+            from embedding_server import RemoteEncoder
+            return RemoteEncoder(model_name)
+        except OSError as e:
+            print(f"[WARNING] 임베딩 서버에 연결할 수 없어 로컬 torch 인코더 사용: {e}")
+    if backend == 'onnx':
+        try:
+            from onnx_encoder import OnnxEncoder
+            return OnnxEncoder.load(model_name)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"[WARNING] onnxruntime 인코더를 쓸 수 없어 torch 인코더 사용: {e}")
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+class MicroBatcher:
+    """동시 encode 요청을 잠깐 모아 한 배치로 인코딩하고 요청별로 결과를 나눠 돌려주는 큐"""
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._carry = None  # 앞 배치에 넣으면 max_batch를 넘어 다음 배치로 미룬 요청
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Counter()     # 배치당 텍스트 수 -> 배치 수
+        self.batch_requests = Counter()  # 배치당 요청 수 -> 배치 수
+        self.delays = deque(maxlen=DELAY_SAMPLES)  # 요청별 대기 시간 (초)
+
+    def submit(self, texts: List[str]) -> np.ndarray:
+        """요청을 큐에 넣고 배치 인코딩 결과 (N, D)를 기다림"""
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='embedding-micro-batch', daemon=True)
+                    self._worker.start()
+        future = Future()
+        self._queue.put((list(texts), time.perf_counter(), future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            # 첫 요청이 들어온 시점부터 최대 대기 시간까지, 또는 최대 배치 크기가 찰 때까지 모음
+            # (앞 배치를 인코딩하는 동안 쌓인 요청은 대기 시간이 지났어도 기다리지 않고 함께 가져감)
+            # 넣으면 max_batch를 넘는 요청은 다음 배치의 첫 요청으로 미룸 (첫 요청 하나가 max_batch보다 크면 단독 배치)
+            pending = [self._carry or self._queue.get()]
+            self._carry = None
+            total = len(pending[0][0])
+            deadline = pending[0][1] + self.max_wait
+            while total < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if total + len(item[0]) > self.max_batch:
+                    self._carry = item
+                    break
+                pending.append(item)
+                total += len(item[0])
+            self._dispatch(pending)
+
+    def _dispatch(self, pending: List[Tuple[List[str], float, Future]]) -> None:
+        start = time.perf_counter()
+        texts = [text for item_texts, _, _ in pending for text in item_texts]
+        unique = list(dict.fromkeys(texts))  # 세션 간 같은 쿼리는 한 번만 인코딩
+        try:
+            encoded = self.encode_batch(unique)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+
+        rows = {text: row for row, text in enumerate(unique)}
+        offset = 0
+        for item_texts, _, future in pending:
+            future.set_result(encoded[[rows[text] for text in texts[offset:offset + len(item_texts)]]])
+            offset += len(item_texts)
+
+        with self._stats_lock:
+            self.batch_sizes[len(unique)] += 1
+            self.batch_requests[len(pending)] += 1
+            self.delays.extend(start - enqueued for _, enqueued, _ in pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """배치 크기 분포와 대기 시간 (ms)"""
+        with self._stats_lock:
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+            batch_requests = dict(sorted(self.batch_requests.items()))
+            delays = np.array(self.delays, dtype=np.float64) * 1000
+        batches = sum(batch_sizes.values())
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': batches,
+            'mean_batch_size': sum(size * count for size, count in batch_sizes.items()) / batches if batches else 0.0,
+            'batch_size_histogram': batch_sizes,
+            'requests_per_batch': batch_requests,
+            'queue_delay_ms': {
+                'p50': float(np.percentile(delays, 50)) if len(delays) else 0.0,
+                'p95': float(np.percentile(delays, 95)) if len(delays) else 0.0,
+                'max': float(delays.max()) if len(delays) else 0.0,
+            },
+        }
+
+
+class EmbeddingService:
+    """문장 임베딩 모델 1개를 소유하는 서비스 (지연 로드, 인코딩 직렬화)"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, device: Optional[str] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, backend: Optional[str] = None,
+                 max_batch: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.model_name = canonical_model_name(model_name)
+        self.backend = resolve_encoder_backend(backend)
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._warm_up_thread = None
+        self.load_seconds = None
+        self.encode_calls = 0
+        self.encoded_texts = 0
+
+        # 작은 요청 마이크로 배치 (대기 시간 0이면 호출마다 바로 인코딩)
+        max_batch = int(max_batch or os.environ.get(ENCODE_MAX_BATCH_ENV) or DEFAULT_MAX_BATCH)
+        if max_wait_ms is None:
+            max_wait_ms = float(os.environ.get(ENCODE_MAX_WAIT_ENV) or DEFAULT_MAX_WAIT_MS)
+        self._batcher = MicroBatcher(self._encode_padded_batch, max_batch, max_wait_ms) if max_wait_ms > 0 else None
+
+    def __repr__(self) -> str:
+        return f"EmbeddingService(model={self.model_name!r}, backend={self.backend!r}, loaded={self.loaded})"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        """백엔드 인코더 인스턴스 (최초 접근 시 한 번만 로드)"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    model = load_encoder(self.model_name, self.backend, self.device)
+                    self.load_seconds = time.perf_counter() - start
+                    self._model = model
+                    print(f"[INFO] 임베딩 모델 로드 완료: {self.model_name} ({self.backend}, {self.load_seconds:.1f}초)")
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return int(self.model.get_sentence_embedding_dimension())
+
+    @property
+    def encoder_backend(self) -> str:
+        """실제로 로드된 인코더의 백엔드 (대체 로드 반영, 임베딩 캐시 키에 사용)"""
+        return encoder_backend(self.model)
+
+    @property
+    def expected_dimension(self) -> Optional[int]:
+        """로드 없이 알 수 있는 임베딩 차원 (로드됐으면 실제 값, 아니면 레지스트리 값, 모르면 None)"""
+        if self.loaded:
+            return self.dimension
+        return MODEL_DIMENSIONS.get(self.model_name)
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, normalize_embeddings: bool = True,
+               batch_size: Optional[int] = None, **kwargs) -> np.ndarray:
+        """정규화 임베딩 (N, D) - 작은 요청은 동시 요청과 한 배치로, 큰 요청은 바로 인코딩 (모델 1개 공유)"""
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        self.model  # 로드 실패는 호출한 쪽에서 발생
+        if self._batcher is not None and 0 < len(texts) < self._batcher.max_batch:
+            embeddings = self._batcher.submit(texts)
+            if normalize_embeddings:
+                embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            return embeddings
+        return self._encode_batch(texts, batch_size, normalize_embeddings)
+
+    def _encode_padded_batch(self, texts: List[str]) -> np.ndarray:
+        """마이크로 배치 전체를 한 번의 패딩 배치로 인코딩 (정규화 전)"""
+        return self._encode_batch(texts, batch_size=len(texts))
+
+    def _encode_batch(self, texts: List[str], batch_size: Optional[int] = None,
+                      normalize_embeddings: bool = False) -> np.ndarray:
+        """모델 호출 1회 (잠금으로 직렬화)"""
+        with self._encode_lock:
+            embeddings = self.model.encode(texts, batch_size=batch_size or self.batch_size,
+                                           convert_to_numpy=True, normalize_embeddings=normalize_embeddings,
+                                           show_progress_bar=False)
+            self.encode_calls += 1
+            self.encoded_texts += len(texts)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """쿼리 임베딩 캐시를 거친 정규화 임베딩"""
+        return cached_encode(self, texts)
+
+    def warm_up(self, background: bool = False) -> None:
+        """모델 로드와 첫 인코딩(초기화 비용)을 미리 수행 (background=True이면 데몬 스레드에서)"""
+        if background:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=self._warm_up_safe, name='embedding-warm-up', daemon=True)
+                self._warm_up_thread.start()
+            return
+        self.encode(WARM_UP_TEXTS)
+
+    def _warm_up_safe(self) -> None:
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"[WARNING] 임베딩 모델 예열 실패 ({self.model_name}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'model_name': self.model_name,
+            'backend': self.backend,
+            'loaded': self.loaded,
+            'load_seconds': self.load_seconds,
+            'encode_calls': self.encode_calls,
+            'encoded_texts': self.encoded_texts,
+            'micro_batch': self._batcher.stats() if self._batcher else None,
+        }
+
+
+_services: Dict[Tuple[str, str], EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> EmbeddingService:
+    """프로세스 전역 임베딩 서비스 (모델 이름·백엔드별 1개, 'sentence-transformers/' 접두사 무시)"""
+    name = canonical_model_name(model_name)
+    key = (name, resolve_encoder_backend(backend))
+    with _services_lock:
+        if key not in _services:
+            _services[key] = EmbeddingService(name, backend=key[1])
+        return _services[key]
+
+
+def embedding_service_for(store, backend: Optional[str] = None) -> EmbeddingService:
+    """저장소를 만든 모델의 임베딩 서비스 (같은 모델의 저장소끼리 공유, 차원이 다르면 ModelMismatchError)"""
+    service = get_embedding_service(store.model_name, backend)
+    dimension = service.expected_dimension
+    if dimension is None:
+        # 레지스트리에 없는 모델은 로드해서 확인 (어차피 쿼리 인코딩에 필요)
+        dimension = service.dimension
+    if dimension != store.dimension:
+        raise ModelMismatchError(
+            f"모델 {service.model_name}의 임베딩 차원 {dimension}이 저장소 차원 {store.dimension}과 다릅니다"
+        )
+    return service
@@ -3,57 +3,64 @@
 벡터스토어에서 더 정교한 검색을 수행합니다.
 """
 
-import pickle
-import numpy as np
-from sentence_transformers import SentenceTransformer
 import os
 from typing import List, Dict, Any, Tuple
+from vector_store import get_vectorstore_registry, vectorstore_exists
+from korean_tokenizer import get_tokenizer
+from reranker import reranker_for, RERANK_CANDIDATES
+from embedding_service import embedding_service_for, ModelMismatchError
+from retrieval import search_many, encode_queries
 
 def enhanced_vector_search(
     query: str,
     pkl_paths: List[str],
     top_k: int = 5,
-    similarity_threshold: float = 0.3
+    similarity_threshold: float = 0.3,
+    rerank: bool = False
 ) -> List[Dict[str, Any]]:
-    """향상된 벡터 검색"""
+    """향상된 벡터 검색 (rerank=True이면 상위 후보를 크로스 인코더로 재순위)"""
     
     try:
-        model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-        query_embedding = model.encode([query])
-        
         all_results = []
         
         for pkl_path in pkl_paths:
-            if not os.path.exists(pkl_path):
+            if not vectorstore_exists(pkl_path):
                 continue
             
-            with open(pkl_path, 'rb') as f:
-                vectorstore = pickle.load(f)
-            
-            embeddings = vectorstore.get('embeddings', np.array([]))
-            chunks = vectorstore.get('chunks', [])
+            vectorstore = get_vectorstore_registry().get(pkl_path)
             
-            if len(embeddings) == 0:
+            if len(vectorstore) == 0:
                 continue
             
-            # 유사도 계산
-            similarities = np.dot(query_embedding, embeddings.T).flatten()
+            # 저장소를 만든 모델로 쿼리 임베딩 (같은 모델의 저장소는 캐시로 재사용)
+            try:
+                model = embedding_service_for(vectorstore)
+            except ModelMismatchError as e:
+                print(f"[WARNING] {pkl_path} 건너뜀: {e}")
+                continue
             
-            # 임계값 이상의 결과만 선택
-            valid_indices = np.where(similarities >= similarity_threshold)[0]
+            # 저장소 색인으로 임계값 이상 중 상위 k개만 텍스트 디코딩
+            reranker = reranker_for(vectorstore) if rerank else None
+            if reranker:
+                # 상위 후보를 한 번의 배치로 재순위
+                candidates = search_many(model, vectorstore, [query], max(top_k, RERANK_CANDIDATES), min_score=similarity_threshold)
+                ranked = reranker.rerank(query, candidates, top_k)
+            else:
+                ranked = [(record, None) for record in search_many(model, vectorstore, [query], top_k, min_score=similarity_threshold)]
             
-            for idx in valid_indices:
-                chunk = chunks[idx]
+            for record, rerank_score in ranked:
                 result = {
-                    'text': chunk['text'],
-                    'source': chunk.get('source', ''),
-                    'similarity': float(similarities[idx]),
+                    'text': record.text,
+                    'source': record.source,
+                    'similarity': record.score,
                     'source_store': os.path.basename(pkl_path)
                 }
+                if rerank_score is not None:
+                    result['rerank_score'] = rerank_score
                 all_results.append(result)
         
-        # 유사도 순으로 정렬하고 상위 k개 반환
-        all_results.sort(key=lambda x: x['similarity'], reverse=True)
+        # 재순위 점수(없으면 유사도) 순으로 정렬하고 상위 k개 반환
+        all_results.sort(key=lambda x: (x.get('rerank_score', float('-inf')), x['similarity']), reverse=True)
         return all_results[:top_k]
         
     except Exception as e:
@@ -65,7 +72,21 @@ def multi_query_search(
     pkl_paths: List[str],
     top_k: int = 3
 ) -> Dict[str, List[Dict[str, Any]]]:
-    """다중 쿼리 검색"""
+    """다중 쿼리 검색 (저장소 모델별로 모든 쿼리를 한 번에 임베딩해 두고 쿼리별 검색은 캐시 재사용)"""
+    
+    models = {}
+    for pkl_path in pkl_paths:
+        if vectorstore_exists(pkl_path):
+            try:
+                model = embedding_service_for(get_vectorstore_registry().get(pkl_path))
+                models[model.model_name] = model
+            except Exception as e:
+                print(f"[WARNING] {pkl_path} 쿼리 임베딩 준비 실패: {e}")
+    for model in models.values():
+        try:
+            encode_queries(model, queries)
+        except Exception as e:
+            print(f"[WARNING] {model.model_name} 쿼리 임베딩 실패: {e}")
     
     results = {}
     for query in queries:
@@ -83,16 +104,12 @@ def contextual_search(
     # 메인 쿼리 결과
     main_results = enhanced_vector_search(main_query, pkl_paths, top_k=10)
     
-    # 컨텍스트 쿼리로 필터링
+    # 컨텍스트 쿼리로 필터링 (정규화된 토큰 집합 조회)
+    tokenizer = get_tokenizer()
     filtered_results = []
     
     for result in main_results:
-        context_score = 0
-        text_lower = result['text'].lower()
-        
-        for context_query in context_queries:
-            if context_query.lower() in text_lower:
-                context_score += 1
+        context_score = tokenizer.count_matches(result['text'], context_queries)
         
         if context_score > 0:
             result['context_score'] = context_score
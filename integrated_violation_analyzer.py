@@ -5,6 +5,7 @@
 
 import streamlit as st
 from law_name_deduplicator import SimpleLawNameDeduplicator
+from korean_tokenizer import get_tokenizer
 import re
 from typing import List, Dict, Any
 import json
@@ -44,24 +45,31 @@ class IntegratedViolationAnalyzer:
 
         return " ".join(text_parts)
 
+    # (선행 검사 용어, 법령명 패턴) - 용어가 없으면 정규식을 실행하지 않음
+    LAW_PATTERNS = [
+        (None, re.compile(r'([가-힣\s]*?법률?)[.\s,)]', re.IGNORECASE)),
+        ('시행령', re.compile(r'([가-힣\s]*?시행령)[.\s,)]', re.IGNORECASE)),
+        ('시행규칙', re.compile(r'([가-힣\s]*?시행규칙)[.\s,)]', re.IGNORECASE)),
+        ('조례', re.compile(r'([가-힣\s]*?조례)[.\s,)]', re.IGNORECASE)),
+        ('규정', re.compile(r'([가-힣\s]*?규정)[.\s,)]', re.IGNORECASE)),
+        ('지방자치법', re.compile(r'(지방자치법)', re.IGNORECASE)),
+        ('공공기관', re.compile(r'(공공기관의\s*운영에\s*관한\s*법률?)', re.IGNORECASE)),
+        ('행정절차법', re.compile(r'(행정절차법)', re.IGNORECASE)),
+        ('국가재정법', re.compile(r'(국가재정법)', re.IGNORECASE)),
+        ('헌법', re.compile(r'(헌법)', re.IGNORECASE)),
+    ]
+
     def _find_law_patterns(self, text: str) -> List[str]:
         """텍스트에서 법령명 패턴 찾기"""
-        patterns = [
-            r'([가-힣\s]*?법률?)[.\s,)]',
-            r'([가-힣\s]*?시행령)[.\s,)]',
-            r'([가-힣\s]*?시행규칙)[.\s,)]',
-            r'([가-힣\s]*?조례)[.\s,)]',
-            r'([가-힣\s]*?규정)[.\s,)]',
-            r'(지방자치법)',
-            r'(공공기관의\s*운영에\s*관한\s*법률?)',
-            r'(행정절차법)',
-            r'(국가재정법)',
-            r'(헌법)',
-        ]
+        # 음절 2-gram 집합으로 선행 검사 (부분 문자열이면 2-gram이 모두 포함되므로 누락 없음)
+        tokenizer = get_tokenizer('bigram')
+        text_terms = tokenizer.term_set(text)
 
         found_laws = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for anchor, pattern in self.LAW_PATTERNS:
+            if anchor and not tokenizer.contains(text_terms, anchor):
+                continue
+            matches = pattern.findall(text)
             for match in matches:
                 clean_name = re.sub(r'\s+', ' ', match).strip()
                 if len(clean_name) >= 3 and clean_name not in found_laws:
@@ -0,0 +1,227 @@
+"""
+BM25 키워드 역색인 모듈
+청크 텍스트를 korean_tokenizer로 토큰화해 용어별 포스팅 목록(CSR 배열)을 만들고 컬럼형 저장소 디렉터리에 함께 저장합니다.
+검색은 쿼리 용어의 포스팅 목록만 읽으므로 말뭉치 크기와 무관하게 후보 수에 비례합니다.
+"""
+
+import os
+import json
+import heapq
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Tuple, Optional, Callable, Sequence
+
+from korean_tokenizer import Tokenizer, get_tokenizer
+
+INDEX_VERSION = 1
+INDEX_MANIFEST_FILE = 'keyword_index.json'
+POSTING_OFFSETS_FILE = 'bm25_offsets.npy'
+POSTING_DOCS_FILE = 'bm25_docs.npy'
+POSTING_TFS_FILE = 'bm25_tfs.npy'
+DOC_LENGTHS_FILE = 'bm25_doc_lengths.npy'
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+class KeywordIndex:
+    """BM25 역색인 (용어 -> 포스팅 구간 offsets[t]:offsets[t + 1])"""
+
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, docs: np.ndarray,
+                 tfs: np.ndarray, doc_lengths: np.ndarray, tokenizer: Optional[Tokenizer] = None,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.vocab = vocab
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __repr__(self) -> str:
+        return (f"KeywordIndex(docs={len(self)}, terms={len(self.vocab)}, postings={len(self.docs)}, "
+                f"tokenizer='{self.tokenizer.name}')")
+
+    @classmethod
+    def build(cls, texts: Sequence[str], tokenizer: Optional[Tokenizer] = None) -> 'KeywordIndex':
+        """청크 텍스트 목록으로부터 색인 생성"""
+        return KeywordIndexBuilder(tokenizer).add(texts).finish()
+
+    def save(self, store_dir: str) -> None:
+        """저장소 디렉터리에 색인 파일 작성 (임시 파일에 쓴 뒤 교체, 매니페스트를 마지막에 써서 완료 표시)"""
+        for name, array in ((POSTING_OFFSETS_FILE, self.offsets), (POSTING_DOCS_FILE, self.docs),
+                            (POSTING_TFS_FILE, self.tfs), (DOC_LENGTHS_FILE, self.doc_lengths)):
+            path = os.path.join(store_dir, name)
+            tmp_path = f'{path}.tmp-{os.getpid()}'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+
+        manifest_path = os.path.join(store_dir, INDEX_MANIFEST_FILE)
+        tmp_path = f'{manifest_path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'index_version': INDEX_VERSION,
+                'count': len(self),
+                'tokenizer': self.tokenizer.name,
+                'k1': self.k1,
+                'b': self.b,
+                'terms': sorted(self.vocab, key=self.vocab.get),
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+
+    @classmethod
+    def open(cls, store_dir: str, expected_count: Optional[int] = None,
+             tokenizer: Optional[Tokenizer] = None) -> Optional['KeywordIndex']:
+        """저장된 색인 열기 (없거나 버전/청크 수/토크나이저가 다르면 None)"""
+        tokenizer = tokenizer or get_tokenizer()
+        manifest_path = os.path.join(store_dir, INDEX_MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('index_version') != INDEX_VERSION:
+            return None
+        if expected_count is not None and manifest.get('count') != expected_count:
+            return None
+        if manifest.get('tokenizer', 'word') != tokenizer.name:
+            return None
+
+        return cls(
+            {term: i for i, term in enumerate(manifest['terms'])},
+            np.load(os.path.join(store_dir, POSTING_OFFSETS_FILE), mmap_mode='r'),
+            np.load(os.path.join(store_dir, POSTING_DOCS_FILE), mmap_mode='r'),
+            np.load(os.path.join(store_dir, POSTING_TFS_FILE), mmap_mode='r'),
+            np.load(os.path.join(store_dir, DOC_LENGTHS_FILE)),
+            tokenizer,
+            manifest.get('k1', BM25_K1),
+            manifest.get('b', BM25_B),
+        )
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """용어의 (문서 번호, 출현 빈도) 포스팅 목록"""
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            return self.docs[:0], self.tfs[:0]
+        start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.docs[start:stop], self.tfs[start:stop]
+
+    def phrase_docs(self, phrase: str) -> np.ndarray:
+        """구절의 모든 토큰을 포함하는 문서 (포스팅 목록 교집합)"""
+        terms = sorted(set(self.tokenizer.tokenize(phrase)), key=lambda t: len(self.postings(t)[0]))
+        if not terms:
+            return np.zeros(0, dtype=np.int32)
+        docs = np.asarray(self.postings(terms[0])[0])
+        for term in terms[1:]:
+            if len(docs) == 0:
+                break
+            docs = np.intersect1d(docs, self.postings(term)[0], assume_unique=True)
+        return docs
+
+    def score(self, query_terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """쿼리 용어가 하나 이상 포함된 문서와 BM25 점수 (포스팅 목록만 사용)"""
+        doc_parts, score_parts = [], []
+        for term in dict.fromkeys(query_terms):
+            docs, tfs = self.postings(term)
+            if len(docs) == 0:
+                continue
+            idf = np.log1p((len(self) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not doc_parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        return docs, np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+
+    def search(self, query: str, k: int,
+               predicate: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """BM25 상위 k개 (문서 번호, 점수) (predicate로 후보를 거를 수 있음)"""
+        docs, scores = self.score(self.tokenizer.tokenize(query))
+        candidates = zip(docs.tolist(), scores.tolist())
+        if predicate is not None:
+            candidates = ((doc, score) for doc, score in candidates if predicate(doc))
+        return heapq.nlargest(k, candidates, key=lambda x: x[1])
+
+
+class KeywordIndexBuilder:
+    """배치 단위로 청크를 추가하며 색인 생성 (포스팅을 배치별 numpy 배열로 누적해 마지막에 CSR로 정렬)"""
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None):
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.count = 0
+        self._term_ids = {}  # 용어 -> 처음 나온 순서 번호
+        self._term_parts = [np.zeros(0, dtype=np.int64)]
+        self._doc_parts = [np.zeros(0, dtype=np.int32)]
+        self._tf_parts = [np.zeros(0, dtype=np.float32)]
+        self._length_parts = [np.zeros(0, dtype=np.int32)]
+
+    def add(self, texts: Sequence[str]) -> 'KeywordIndexBuilder':
+        """청크 텍스트 배치 추가 (문서 번호는 추가한 순서대로 이어짐)"""
+        term_ids, docs, tfs = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        for i, text in enumerate(texts):
+            counts = Counter(self.tokenizer.tokenize(text))
+            doc_lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self._term_ids.setdefault(term, len(self._term_ids)))
+                docs.append(self.count + i)
+                tfs.append(tf)
+
+        self._term_parts.append(np.array(term_ids, dtype=np.int64))
+        self._doc_parts.append(np.array(docs, dtype=np.int32))
+        self._tf_parts.append(np.array(tfs, dtype=np.float32))
+        self._length_parts.append(doc_lengths)
+        self.count += len(texts)
+        return self
+
+    def finish(self) -> KeywordIndex:
+        """누적한 포스팅을 용어 순으로 정렬해 색인 생성 (용어 안에서는 문서 번호 순)"""
+        terms = sorted(self._term_ids)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[[self._term_ids[term] for term in terms]] = np.arange(len(terms))
+        term_ids = rank[np.concatenate(self._term_parts)]
+        order = np.argsort(term_ids, kind='stable')
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        return KeywordIndex(
+            {term: i for i, term in enumerate(terms)},
+            offsets,
+            np.concatenate(self._doc_parts)[order],
+            np.concatenate(self._tf_parts)[order],
+            np.concatenate(self._length_parts),
+            self.tokenizer,
+        )
+
+
+def keyword_index_for(store) -> KeywordIndex:
+    """저장소의 키워드 색인 (저장된 색인을 열고, 없으면 만들어 저장소 디렉터리에 저장)"""
+    index = getattr(store, '_keyword_index', None)
+    if index is not None:
+        return index
+
+    store_dir = store.store_dir
+    if store_dir:
+        index = KeywordIndex.open(store_dir, expected_count=len(store))
+
+    if index is None:
+        index = KeywordIndex.build(store.texts)
+        # 다른 토크나이저/버전의 색인이 이미 있으면 다른 프로세스가 mmap 중일 수 있으므로 덮어쓰지 않고 메모리에만 유지
+        if store_dir and os.path.exists(os.path.join(store_dir, INDEX_MANIFEST_FILE)):
+            print(f"[INFO] 저장된 키워드 색인이 현재 설정과 달라 메모리에서만 사용합니다 ({store_dir}, 토크나이저: {index.tokenizer.name})")
+        elif store_dir:
+            try:
+                index.save(store_dir)
+            except OSError as e:
+                print(f"[WARNING] 키워드 색인 저장 실패 ({store_dir}): {e}")
+
+    store._keyword_index = index
+    return index
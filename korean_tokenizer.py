@@ -0,0 +1,124 @@
+"""
+한국어 토크나이저 모듈
+키워드 색인과 쿼리가 같은 토크나이저를 쓰도록 토큰화 방식을 교체 가능하게 제공합니다.
+
+- bigram: 한글 연속 구간을 음절 2-gram으로 나눔 (기본값, 순수 파이썬)
+- word: 공백 단위 단어에서 끝의 조사를 떼어 냄
+- morpheme: kiwipiepy 형태소 분석기로 체언/용언 어근만 사용 (설치된 경우)
+
+환경 변수 ORDINANCE_TOKENIZER로 기본 토크나이저를 바꿀 수 있습니다.
+"""
+
+import os
+import re
+import unicodedata
+from typing import List, Set, Dict, Iterable
+
+DEFAULT_TOKENIZER = 'bigram'
+TOKENIZER_ENV = 'ORDINANCE_TOKENIZER'
+
+_RUN_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+')
+
+# 명사 뒤에 붙는 조사 (긴 것부터 검사)
+_PARTICLES = (
+    '에서는', '으로는', '에서', '으로', '에게', '까지', '부터', '에는', '이나', '이며',
+    '을', '를', '이', '가', '은', '는', '의', '에', '로', '와', '과', '도', '만',
+)
+
+
+def normalize_text(text: str) -> str:
+    """NFC 정규화 + 소문자화 (자모가 분리된 PDF 추출 텍스트 대응)"""
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def _is_hangul(token: str) -> bool:
+    return '가' <= token[0] <= '힣'
+
+
+class Tokenizer:
+    """토크나이저 기본 클래스 (tokenize만 구현하면 됨)"""
+
+    name = ''
+
+    def tokenize(self, text: str) -> List[str]:
+        raise NotImplementedError
+
+    def term_set(self, text: str) -> Set[str]:
+        """텍스트의 토큰 집합 (반복 포함 검사용)"""
+        return set(self.tokenize(text))
+
+    def contains(self, text_terms: Set[str], phrase: str) -> bool:
+        """구절의 모든 토큰이 텍스트 토큰 집합에 있는지 (부분 문자열 검사 대체)"""
+        phrase_terms = self.tokenize(phrase)
+        return bool(phrase_terms) and all(term in text_terms for term in phrase_terms)
+
+    def count_matches(self, text: str, phrases: Iterable[str]) -> int:
+        """텍스트에 포함된 구절 수"""
+        text_terms = self.term_set(text)
+        return sum(1 for phrase in phrases if self.contains(text_terms, phrase))
+
+
+class BigramTokenizer(Tokenizer):
+    """한글은 음절 2-gram, 영문/숫자는 단어 단위 (조사가 붙어도 명사 부분의 2-gram은 그대로 일치)"""
+
+    name = 'bigram'
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = []
+        for run in _RUN_PATTERN.findall(normalize_text(text)):
+            if _is_hangul(run) and len(run) > 1:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                tokens.append(run)
+        return tokens
+
+
+class WordTokenizer(Tokenizer):
+    """단어 단위 (한글 단어는 끝의 조사를 떼어 냄)"""
+
+    name = 'word'
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = []
+        for token in _RUN_PATTERN.findall(normalize_text(text)):
+            if _is_hangul(token):
+                for particle in _PARTICLES:
+                    if len(token) > len(particle) + 1 and token.endswith(particle):
+                        token = token[:-len(particle)]
+                        break
+            if len(token) > 1:
+                tokens.append(token)
+        return tokens
+
+
+class MorphemeTokenizer(Tokenizer):
+    """kiwipiepy 형태소 분석 기반 (명사, 동사/형용사 어근, 외국어, 숫자)"""
+
+    name = 'morpheme'
+    KEEP_TAGS = ('NNG', 'NNP', 'NNB', 'NR', 'XR', 'VV', 'VA', 'SL', 'SN', 'SH')
+
+    def __init__(self):
+        from kiwipiepy import Kiwi  # 선택 의존성
+        self.kiwi = Kiwi()
+
+    def tokenize(self, text: str) -> List[str]:
+        return [token.form.lower() for token in self.kiwi.tokenize(unicodedata.normalize('NFC', text))
+                if token.tag in self.KEEP_TAGS]
+
+
+_TOKENIZER_CLASSES = {cls.name: cls for cls in (BigramTokenizer, WordTokenizer, MorphemeTokenizer)}
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(name: str = None) -> Tokenizer:
+    """이름으로 토크나이저 조회 (형태소 분석기가 없으면 bigram으로 대체)"""
+    name = name or os.environ.get(TOKENIZER_ENV, DEFAULT_TOKENIZER)
+    if name not in _tokenizers:
+        if name not in _TOKENIZER_CLASSES:
+            raise ValueError(f"지원하지 않는 토크나이저: {name} (가능: {', '.join(_TOKENIZER_CLASSES)})")
+        try:
+            _tokenizers[name] = _TOKENIZER_CLASSES[name]()
+        except ImportError as e:
+            print(f"[WARNING] {name} 토크나이저 사용 불가, {DEFAULT_TOKENIZER}로 대체: {e}")
+            return get_tokenizer(DEFAULT_TOKENIZER)
+    return _tokenizers[name]
@@ -0,0 +1,192 @@
+"""
+ONNX Runtime 문장 인코더 모듈
+SentenceTransformer 모델(기본 paraphrase-multilingual-MiniLM-L12-v2)의 트랜스포머를 ONNX로 내보내고
+동적 int8 양자화를 적용해 GPU 없는 서버에서 onnxruntime으로 인코딩합니다.
+OnnxEncoder는 SentenceTransformer.encode와 같은 형태로 호출할 수 있어
+EmbeddingService와 생성 스크립트에 그대로 넘길 수 있습니다 (평균 풀링은 numpy로 수행).
+내보내기는 torch/sentence-transformers가 필요하지만, 내보낸 뒤 인코딩에는 onnxruntime과 tokenizers만 필요합니다.
+OnnxEncoder.load는 내보낸 파일만 열며, 내보내기는 이 스크립트(CLI)로만 수행합니다.
+
+사용법:
+    python onnx_encoder.py [--model paraphrase-multilingual-MiniLM-L12-v2] [--out onnx_models/<모델>]
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+from vector_store import DEFAULT_MODEL_NAME
+from embedding_cache import canonical_model_name
+
+ONNX_MODEL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_models')
+ONNX_CONFIG_FILE = 'encoder.json'
+ONNX_FP32_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model_int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+ONNX_OPSET = 14
+
+
+def onnx_model_dir(model_name: str = DEFAULT_MODEL_NAME) -> str:
+    """모델별 ONNX 파일 디렉터리 (onnx_models/<모델 이름>)"""
+    return os.path.join(ONNX_MODEL_ROOT, canonical_model_name(model_name))
+
+
+def export_onnx_model(model_name: str = DEFAULT_MODEL_NAME, out_dir: Optional[str] = None,
+                      quantize: bool = True) -> str:
+    """SentenceTransformer 트랜스포머를 ONNX(float32)로 내보내고 int8 양자화본과 토크나이저를 저장"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = out_dir or onnx_model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    pooling = st_model[1].get_pooling_mode_str() if len(st_model) > 1 else 'mean'
+    if pooling not in ('mean', 'cls'):
+        raise ValueError(f"지원하지 않는 풀링 방식: {pooling}")
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = tokenizer(["조례 위법 판례"], return_tensors='pt')
+    fp32_path = os.path.join(out_dir, ONNX_FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(transformer), (sample['input_ids'], sample['attention_mask']), fp32_path,
+            input_names=['input_ids', 'attention_mask'], output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'},
+            },
+            opset_version=ONNX_OPSET, do_constant_folding=True,
+        )
+    tokenizer.save_pretrained(out_dir)
+
+    config = {
+        'model_name': canonical_model_name(model_name),
+        'dimension': int(st_model.get_sentence_embedding_dimension()),
+        'max_seq_length': int(st_model.max_seq_length),
+        'pooling': pooling,
+        'pad_token': tokenizer.pad_token,
+        'pad_token_id': int(tokenizer.pad_token_id),
+    }
+    with open(os.path.join(out_dir, ONNX_CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    print(f"[INFO] ONNX 내보내기 완료: {fp32_path}")
+
+    if quantize:
+        quantize_onnx_model(out_dir)
+    return out_dir
+
+
+def quantize_onnx_model(model_dir: str) -> str:
+    """float32 ONNX 모델에 동적 int8 양자화 적용 (가중치 int8, 활성값은 실행 시 양자화)"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    fp32_path = os.path.join(model_dir, ONNX_FP32_FILE)
+    int8_path = os.path.join(model_dir, ONNX_INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"[INFO] int8 양자화 완료: {int8_path} ({os.path.getsize(fp32_path) / 2**20:.0f}MB -> "
+          f"{os.path.getsize(int8_path) / 2**20:.0f}MB)")
+    return int8_path
+
+
+class OnnxEncoder:
+    """onnxruntime 문장 인코더 (SentenceTransformer.encode 호환, 평균 풀링)"""
+
+    def __init__(self, model_dir: str, quantized: bool = True, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.config: Dict[str, Any] = json.load(f)
+        self.model_name = self.config['model_name']
+        self.quantized = quantized
+        self.model_path = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        # 배치 안 최장 문장 길이까지만 패딩, 모델 최대 길이에서 절단 (SentenceTransformer와 동일)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config['max_seq_length'])
+        self.tokenizer.enable_padding(pad_id=self.config['pad_token_id'], pad_token=self.config['pad_token'])
+
+    @classmethod
+    def load(cls, model_name: str = DEFAULT_MODEL_NAME, quantized: bool = True) -> 'OnnxEncoder':
+        """내보낸 모델을 열기 (내보내기는 하지 않음 - 파일이 없으면 FileNotFoundError)"""
+        model_dir = onnx_model_dir(model_name)
+        model_file = ONNX_INT8_FILE if quantized else ONNX_FP32_FILE
+        missing = [name for name in (model_file, ONNX_CONFIG_FILE, TOKENIZER_FILE)
+                   if not os.path.exists(os.path.join(model_dir, name))]
+        if missing:
+            raise FileNotFoundError(
+                f"ONNX 모델 파일 없음 ({model_dir}: {', '.join(missing)}) - "
+                f"먼저 'python onnx_encoder.py --model {model_name}'로 내보내세요 (torch 필요)")
+        return cls(model_dir, quantized=quantized)
+
+    def __repr__(self) -> str:
+        return f"OnnxEncoder(model={self.model_name!r}, quantized={self.quantized})"
+
+    @property
+    def encoder_backend(self) -> str:
+        return 'onnx-int8' if self.quantized else 'onnx-fp32'
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.config['dimension'])
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config.get('pooling') == 'cls':
+            return hidden[:, 0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """문장 임베딩 (N, D) float32"""
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        embeddings = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # 길이순으로 묶어 배치 안 패딩을 줄이고 원래 순서로 되돌림
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in rows])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feeds)[0]
+            embeddings[rows] = self._pool(hidden, attention_mask)
+
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SentenceTransformer 모델 ONNX 내보내기 + int8 양자화")
+    parser.add_argument('--model', default=DEFAULT_MODEL_NAME)
+    parser.add_argument('--out', default=None, help="출력 디렉터리 (기본 onnx_models/<모델>)")
+    parser.add_argument('--no-quantize', action='store_true', help="float32 모델만 내보내기")
+    args = parser.parse_args()
+    export_onnx_model(args.model, args.out, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+쿼리 임베딩 뱅크 모듈
+search_queries.static_query_vocabulary()의 고정 쿼리를 저장소 모델로 한 번 임베딩해
+컬럼형 저장소 디렉터리에 저장합니다. 저장소를 불러올 때 임베딩 캐시의 고정 항목으로 등록되므로
+고정 쿼리는 검색 시 인코더를 호출하지 않습니다.
+
+사용법:
+    python query_bank.py <PKL 또는 .vstore> [...]
+"""
+
+import os
+import sys
+import json
+import numpy as np
+from typing import List, Optional
+
+from vector_store import VectorStore, load_vectorstore, read_manifest, DEFAULT_MODEL_NAME
+from search_queries import static_query_vocabulary
+from embedding_cache import get_embedding_cache, canonical_model_name, encoder_backend, DEFAULT_CACHE_BACKEND
+from embedding_service import get_embedding_service
+
+QUERY_BANK_FILE = 'query_bank.npy'
+QUERY_BANK_MANIFEST_FILE = 'query_bank.json'
+
+
+def build_query_bank(store_dir: str, model=None, queries: Optional[List[str]] = None,
+                     backend: Optional[str] = None) -> int:
+    """고정 쿼리 임베딩을 저장소 디렉터리에 저장하고 쿼리 수 반환 (model이 없으면 backend 인코더 사용)"""
+    model_name = read_manifest(store_dir).get('model_name') or DEFAULT_MODEL_NAME
+    if model is None:
+        model = get_embedding_service(model_name, backend)
+
+    queries = queries or static_query_vocabulary()
+    embeddings = np.asarray(model.encode(queries, convert_to_numpy=True, normalize_embeddings=True),
+                            dtype=np.float32)
+
+    np.save(os.path.join(store_dir, QUERY_BANK_FILE), embeddings)
+    with open(os.path.join(store_dir, QUERY_BANK_MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'model_name': model_name, 'encoder_backend': encoder_backend(model), 'queries': queries},
+                  f, ensure_ascii=False, indent=2)
+    print(f"[INFO] 쿼리 임베딩 뱅크 저장: {len(queries)}개 ({store_dir})")
+    return len(queries)
+
+
+def load_query_bank(store: VectorStore) -> int:
+    """저장소의 쿼리 뱅크를 임베딩 캐시 고정 항목으로 등록하고 쿼리 수 반환 (없으면 0)"""
+    store_dir = store.store_dir
+    if not store_dir:
+        return 0
+    manifest_path = os.path.join(store_dir, QUERY_BANK_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return 0
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if canonical_model_name(manifest['model_name']) != canonical_model_name(store.model_name):
+        print(f"[WARNING] 쿼리 뱅크 모델 불일치, 무시: {manifest['model_name']} != {store.model_name}")
+        return 0
+
+    embeddings = np.load(os.path.join(store_dir, QUERY_BANK_FILE))
+    get_embedding_cache().add_static(manifest['model_name'], manifest['queries'], embeddings,
+                                     manifest.get('encoder_backend', DEFAULT_CACHE_BACKEND))
+    return len(manifest['queries'])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("사용법: python query_bank.py <PKL 또는 .vstore> [...]")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        store = load_vectorstore(path, auto_convert=True)
+        if not store.store_dir:
+            print(f"❌ 컬럼형 저장소 디렉터리가 없습니다: {path}")
+            continue
+        build_query_bank(store.store_dir)
@@ -0,0 +1,117 @@
+"""
+크로스 인코더 재순위 모듈
+1차 검색 상위 후보(기본 50개)의 (쿼리, 청크) 쌍을 한 번의 배치 predict로 점수화하고,
+(쿼리 해시, 저장소, 청크 번호) 단위로 점수를 캐시합니다.
+저장소 생성 시 기록된 reranker_model_name(create_enhanced_vectorstore.py)을 사용합니다.
+"""
+
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from vector_store import VectorStore, ChunkRecord
+
+RERANK_CANDIDATES = 50
+DEFAULT_RERANKER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-12-v2'
+CACHE_SIZE = 20000
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha1(query.strip().encode('utf-8')).hexdigest()[:16]
+
+
+class Reranker:
+    """CrossEncoder 재순위기 (점수 LRU 캐시 포함, 스레드 안전)"""
+
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL, cache_size: int = CACHE_SIZE,
+                 batch_size: int = 32, model=None):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._model = model
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name)
+            print(f"[INFO] 리랭커 모델 로드 완료: {self.model_name}")
+        return self._model
+
+    def score(self, query: str, records: List[ChunkRecord]) -> np.ndarray:
+        """(쿼리, 청크) 쌍 점수 (캐시에 없는 쌍만 한 번의 배치로 예측)"""
+        qhash = query_hash(query)
+        keys = [(qhash, record.store.path or id(record.store), record.index) for record in records]
+        scores = np.empty(len(records), dtype=np.float32)
+
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+            self.hits += len(records) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            pairs = [(query, records[i].text) for i in missing]
+            predicted = np.asarray(self.model.predict(pairs, batch_size=self.batch_size,
+                                                      show_progress_bar=False), dtype=np.float32)
+            scores[missing] = predicted
+            with self._lock:
+                for i, value in zip(missing, predicted.tolist()):
+                    self._cache[keys[i]] = value
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores
+
+    def rerank(self, query: str, records: List[ChunkRecord], top_k: int) -> List[Tuple[ChunkRecord, float]]:
+        """재순위 상위 top_k개 (레코드, 재순위 점수)"""
+        if not records:
+            return []
+        scores = self.score(query, records)
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        return [(records[i], float(scores[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'model_name': self.model_name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'cached': len(self._cache),
+        }
+
+
+_rerankers: Dict[str, Optional[Reranker]] = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model_name: str = DEFAULT_RERANKER_MODEL) -> Optional[Reranker]:
+    """프로세스 전역 재순위기 (모델 로드에 실패하면 None)"""
+    with _rerankers_lock:
+        if model_name not in _rerankers:
+            reranker = Reranker(model_name)
+            try:
+                reranker.model
+            except Exception as e:
+                print(f"[WARNING] 리랭커 모델 로드 실패 ({model_name}): {e}")
+                reranker = None
+            _rerankers[model_name] = reranker
+        return _rerankers[model_name]
+
+
+def reranker_for(store: VectorStore) -> Optional[Reranker]:
+    """저장소 메타데이터에 기록된 리랭커 (없으면 기본 모델)"""
+    return get_reranker(store.meta.get('reranker_model_name') or DEFAULT_RERANKER_MODEL)
@@ -0,0 +1,324 @@
+"""
+다중 쿼리 밀집 검색 모듈
+여러 쿼리를 한 번에 임베딩하고 (Q, N) 점수 행렬을 한 번의 행렬곱으로 계산한 뒤,
+쿼리 축 최댓값과 argpartition으로 상위 k개 청크를 고릅니다.
+조문별 쿼리 묶음은 ArticleQueryBatch로 조례 전체를 한 번에 처리하고,
+HybridRetriever는 밀집 검색과 BM25 키워드 검색 결과를 순위 융합합니다 (ORDINANCE_HYBRID_SEARCH=1 또는 hybrid=True일 때만 사용).
+저장소에 근사 색인(vector_index.py)이 있으면 밀집 점수는 전체 청크 대신 색인 후보에 대해서만 계산합니다.
+검색 함수의 backend 옵션(예: 'pca' 2단계 검색)으로 저장된 기본 색인 대신 다른 백엔드를 고를 수 있습니다.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from vector_store import VectorStore, ChunkRecord
+from keyword_index import keyword_index_for
+from vector_index import vector_index_for, merge_max
+from embedding_cache import cached_encode
+
+FUSION_METHODS = ('rrf', 'weighted')
+RRF_K = 60
+HYBRID_SEARCH_ENV = 'ORDINANCE_HYBRID_SEARCH'
+
+
+def hybrid_search_enabled(hybrid: Optional[bool] = None) -> bool:
+    """검색 경로가 하이브리드 융합을 쓸지 (인자가 없으면 환경 변수, 기본은 기존 단일 신호 검색)"""
+    if hybrid is not None:
+        return hybrid
+    return os.environ.get(HYBRID_SEARCH_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def encode_queries(model, queries: List[str]) -> np.ndarray:
+    """쿼리 목록의 정규화 임베딩 (Q, D) - 임베딩 캐시에 없는 쿼리만 한 번의 배치로 인코딩"""
+    return cached_encode(model, queries)
+
+
+def max_query_scores(store: VectorStore, query_embeddings: np.ndarray) -> np.ndarray:
+    """각 청크의 쿼리별 유사도 중 최댓값 (N,)"""
+    if len(query_embeddings) == 0:
+        return np.zeros(len(store), dtype=np.float32)
+    return store.scores(query_embeddings).max(axis=0)
+
+
+def dense_search(store: VectorStore, query_embeddings: np.ndarray, k: int,
+                 min_score: Optional[float] = None, backend: Optional[str] = None) -> List[ChunkRecord]:
+    """쿼리 임베딩 (Q, D)로 저장소 색인을 검색하여 청크별 최고 점수 기준 상위 k개 반환"""
+    if len(store) == 0 or len(query_embeddings) == 0:
+        return []
+    docs, scores = vector_index_for(store, backend).search_max(query_embeddings, k)
+    return [ChunkRecord(store, doc, score) for doc, score in zip(docs.tolist(), scores.tolist())
+            if min_score is None or score >= min_score]
+
+
+def search_many(model, store: VectorStore, queries: List[str], k: int,
+                min_score: Optional[float] = None, backend: Optional[str] = None) -> List[ChunkRecord]:
+    """여러 쿼리로 검색하여 청크별 최고 점수 기준 상위 k개 반환 (쿼리는 캐시를 거쳐 한 번에 임베딩)"""
+    if len(store) == 0 or not queries:
+        return []
+    return dense_search(store, encode_queries(model, queries), k, min_score, backend)
+
+
+class ArticleQueryBatch:
+    """조문별 쿼리 목록을 한 번에 처리하는 배치 검색
+
+    전체 조문의 쿼리를 중복 없이 모아 한 번만 임베딩하고, 저장소마다 (U, N) 점수를 한 번 계산한 뒤
+    조문별 쿼리 인덱스 구간에 대해 np.maximum.reduceat으로 (A, N) 최고 점수를 구합니다.
+    """
+
+    def __init__(self, model, article_queries: List[List[str]]):
+        self.article_queries = article_queries
+        self.unique_queries = list(dict.fromkeys(q for queries in article_queries for q in queries))
+        positions = {query: i for i, query in enumerate(self.unique_queries)}
+
+        # 조문 a의 쿼리 인덱스는 query_index[starts[a]:starts[a + 1]]
+        self.query_index = np.array([positions[q] for queries in article_queries for q in queries], dtype=np.intp)
+        self.lengths = np.array([len(queries) for queries in article_queries], dtype=np.intp)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).astype(np.intp)
+        self.has_queries = self.lengths > 0
+        self.query_embeddings = encode_queries(model, self.unique_queries)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def article_scores(self, store: VectorStore) -> np.ndarray:
+        """조문별 청크 최고 점수 (A, N) (쿼리가 없는 조문은 -inf)"""
+        out = np.full((len(self), len(store)), -np.inf, dtype=np.float32)
+        if len(self.query_index) == 0 or len(store) == 0:
+            return out
+        scores = store.scores(self.query_embeddings)[self.query_index]
+        starts = self.starts[self.has_queries]
+        out[self.has_queries] = np.maximum.reduceat(scores, starts, axis=0)
+        return out
+
+    def article_query_rows(self, a: int) -> np.ndarray:
+        """조문 a의 쿼리 번호 (unique_queries 기준)"""
+        return self.query_index[self.starts[a]:self.starts[a] + self.lengths[a]]
+
+    def article_candidates(self, store: VectorStore, limit: int,
+                           backend: Optional[str] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """근사 색인으로 조문별 상위 limit개 (청크 번호, 최고 점수) - 고유 쿼리당 한 번만 검색"""
+        ids, scores = vector_index_for(store, backend).search(self.query_embeddings, limit)
+        return [merge_max(ids[self.article_query_rows(a)], scores[self.article_query_rows(a)], limit)
+                for a in range(len(self))]
+
+    def search(self, store: VectorStore, k: int, backend: Optional[str] = None) -> List[List[ChunkRecord]]:
+        """조문별 상위 k개 레코드"""
+        if len(store) == 0:
+            return [[] for _ in range(len(self))]
+        if not vector_index_for(store, backend).exact:
+            return [
+                [ChunkRecord(store, doc, score) for doc, score in zip(docs.tolist(), scores.tolist())]
+                for docs, scores in self.article_candidates(store, k, backend)
+            ]
+        scores = self.article_scores(store)
+        k = min(k, scores.shape[1])
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(part, order, axis=1)
+        return [
+            [ChunkRecord(store, idx, scores[a, idx]) for idx in top[a]] if self.has_queries[a] else []
+            for a in range(len(self))
+        ]
+
+    def hybrid_search(self, retriever: 'HybridRetriever', k: int,
+                      min_dense_score: Optional[float] = None) -> List[List['HybridRecord']]:
+        """조문별 밀집 점수와 조문 쿼리의 BM25 점수를 융합한 상위 k개 레코드 (min_dense_score는 융합 전 밀집 후보에 적용)"""
+        if not vector_index_for(retriever.store, retriever.backend).exact:
+            candidates = self.article_candidates(retriever.store, retriever.num_candidates, retriever.backend)
+            return [
+                retriever.search(k, query_embeddings=self.query_embeddings[self.article_query_rows(a)],
+                                 keyword_query=' '.join(queries), dense_candidates=candidates[a],
+                                 min_dense_score=min_dense_score)
+                if self.has_queries[a] else []
+                for a, queries in enumerate(self.article_queries)
+            ]
+        scores = self.article_scores(retriever.store)
+        return [
+            retriever.search(k, keyword_query=' '.join(queries), dense=scores[a], min_dense_score=min_dense_score)
+            if self.has_queries[a] else []
+            for a, queries in enumerate(self.article_queries)
+        ]
+
+
+class HybridRecord(ChunkRecord):
+    """융합 검색 결과 한 건 (신호별 점수와 순위 포함, 후보에 없던 신호의 순위는 None)"""
+
+    __slots__ = ('dense_score', 'sparse_score', 'dense_rank', 'sparse_rank')
+
+    def __init__(self, store: VectorStore, index: int, score: float, dense_score: float, sparse_score: float,
+                 dense_rank: Optional[int], sparse_rank: Optional[int]):
+        super().__init__(store, index, score)
+        self.dense_score = float(dense_score)
+        self.sparse_score = float(sparse_score)
+        self.dense_rank = dense_rank
+        self.sparse_rank = sparse_rank
+
+    def __repr__(self) -> str:
+        return (f"HybridRecord(index={self.index}, score={self.score:.4f}, dense={self.dense_score:.4f}#{self.dense_rank}, "
+                f"sparse={self.sparse_score:.4f}#{self.sparse_rank})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = super().to_dict()
+        result.update({
+            'dense_score': self.dense_score,
+            'sparse_score': self.sparse_score,
+            'dense_rank': self.dense_rank,
+            'sparse_rank': self.sparse_rank,
+        })
+        return result
+
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hybrid')
+    return _executor
+
+
+def _candidate_ranks(docs: np.ndarray, scores: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """점수 상위 limit개 후보 (문서 번호, 점수) 내림차순"""
+    if len(docs) > limit:
+        part = np.argpartition(-scores, limit - 1)[:limit]
+        docs, scores = docs[part], scores[part]
+    order = np.argsort(-scores, kind='stable')
+    return docs[order], scores[order]
+
+
+class HybridRetriever:
+    """밀집(임베딩) + 희소(BM25) 하이브리드 검색
+
+    두 신호를 병렬로 계산해 각각 상위 num_candidates개 후보를 뽑고,
+    fusion='rrf'이면 순위 역수 합(1 / (rrf_k + rank)), 'weighted'이면 정규화 점수의 가중합으로 융합합니다.
+    backend를 지정하면 밀집 후보를 그 색인 백엔드(vector_index.py)로 구합니다.
+    """
+
+    def __init__(self, store: VectorStore, fusion: str = 'rrf', dense_weight: float = 0.5,
+                 rrf_k: int = RRF_K, num_candidates: int = 100, backend: Optional[str] = None):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"지원하지 않는 융합 방식: {fusion} (가능: {', '.join(FUSION_METHODS)})")
+        self.store = store
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        self.rrf_k = rrf_k
+        self.num_candidates = num_candidates
+        self.backend = backend
+
+    def sparse_scores(self, keyword_query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 점수가 있는 (문서 번호, 점수)"""
+        index = keyword_index_for(self.store)
+        return index.score(index.tokenizer.tokenize(keyword_query))
+
+    def search(self, k: int, query_embeddings: Optional[np.ndarray] = None, keyword_query: Optional[str] = None,
+               dense: Optional[np.ndarray] = None, sparse: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+               mask: Optional[np.ndarray] = None,
+               dense_candidates: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+               min_dense_score: Optional[float] = None) -> List[HybridRecord]:
+        """융합 상위 k개
+
+        Args:
+            k: 반환할 결과 수
+            query_embeddings: 밀집 검색 쿼리 임베딩 (Q, D) - 쿼리별 최고 점수 사용
+            keyword_query: BM25 검색 문자열
+            dense: 미리 계산한 청크별 밀집 점수 (N,) (query_embeddings 대신)
+            sparse: 미리 계산한 (문서 번호, 점수) (keyword_query 대신)
+            mask: 후보로 허용할 청크 (N,) bool
+            dense_candidates: 근사 색인에서 미리 구한 밀집 후보 (문서 번호, 점수) (dense 대신)
+            min_dense_score: 이 점수 이하인 밀집 후보는 융합 전에 제외 (키워드 후보는 그대로 유지)
+        """
+        if len(self.store) == 0:
+            return []
+
+        # 두 신호 모두 계산해야 하면 병렬로 실행 (행렬곱은 GIL을 놓음)
+        need_dense = (dense is None and dense_candidates is None
+                      and query_embeddings is not None and len(query_embeddings) > 0)
+        sparse_future = None
+        if sparse is None and keyword_query:
+            if need_dense:
+                sparse_future = _get_executor().submit(self.sparse_scores, keyword_query)
+            else:
+                sparse = self.sparse_scores(keyword_query)
+        if need_dense:
+            index = vector_index_for(self.store, self.backend)
+            if index.exact:
+                dense = max_query_scores(self.store, query_embeddings)
+            else:
+                # 근사 색인은 마스크로 걸러질 후보를 감안해 두 배수로 검색
+                limit = self.num_candidates if mask is None else 2 * self.num_candidates
+                dense_candidates = index.search_max(query_embeddings, limit)
+        if sparse_future is not None:
+            sparse = sparse_future.result()
+
+        signals = {}
+        if dense is not None:
+            docs = np.flatnonzero(mask) if mask is not None else np.arange(len(self.store))
+            scores = np.asarray(dense)[docs]
+            if min_dense_score is not None:
+                keep = scores > min_dense_score
+                docs, scores = docs[keep], scores[keep]
+            signals['dense'] = _candidate_ranks(docs, scores, self.num_candidates)
+        elif dense_candidates is not None:
+            docs, scores = dense_candidates
+            keep = np.ones(len(docs), dtype=bool)
+            if mask is not None:
+                keep &= np.asarray(mask)[docs]
+            if min_dense_score is not None:
+                keep &= scores > min_dense_score
+            signals['dense'] = _candidate_ranks(docs[keep], scores[keep], self.num_candidates)
+        if sparse is not None:
+            docs, scores = sparse
+            if mask is not None:
+                keep = np.asarray(mask)[docs]
+                docs, scores = docs[keep], scores[keep]
+            signals['sparse'] = _candidate_ranks(docs, scores, self.num_candidates)
+        if not signals:
+            return []
+
+        # 신호별 순위/점수를 후보 합집합 위에 펼침
+        candidates = np.unique(np.concatenate([docs for docs, _ in signals.values()]))
+        ranks, scores = {}, {}
+        for name, (docs, values) in signals.items():
+            pos = np.searchsorted(candidates, docs)
+            ranks[name] = np.zeros(len(candidates), dtype=np.int64)
+            ranks[name][pos] = np.arange(1, len(docs) + 1)
+            scores[name] = np.zeros(len(candidates), dtype=np.float32)
+            scores[name][pos] = values
+
+        fused = np.zeros(len(candidates), dtype=np.float64)
+        weights = {'dense': self.dense_weight, 'sparse': 1.0 - self.dense_weight}
+        for name in signals:
+            present = ranks[name] > 0
+            if not present.any():
+                continue
+            if self.fusion == 'rrf':
+                fused[present] += weights[name] / (self.rrf_k + ranks[name][present])
+            else:
+                values = scores[name][present]
+                low, high = float(values.min()), float(values.max())
+                fused[present] += weights[name] * ((values - low) / (high - low) if high > low else 1.0)
+
+        top = candidates[np.argsort(-fused, kind='stable')[:k]]
+        order = np.searchsorted(candidates, top)
+        if dense is not None:
+            dense_top = np.asarray(dense)[top]
+        elif query_embeddings is not None and len(query_embeddings) and len(top):
+            # 근사 후보에 없던 키워드 결과도 밀집 점수를 갖도록 상위 k개만 정확히 계산
+            dense_top = self.store.row_scores(query_embeddings, top).max(axis=0)
+        elif 'dense' in scores:
+            dense_top = scores['dense'][order]
+        else:
+            dense_top = np.zeros(len(top), dtype=np.float32)
+        return [
+            HybridRecord(
+                self.store, doc, fused[pos],
+                dense_top[i],
+                scores['sparse'][pos] if 'sparse' in scores else 0.0,
+                int(ranks['dense'][pos]) or None if 'dense' in ranks else None,
+                int(ranks['sparse'][pos]) or None if 'sparse' in ranks else None,
+            )
+            for i, (doc, pos) in enumerate(zip(top.tolist(), order.tolist()))
+        ]
@@ -0,0 +1,111 @@
+"""
+위법성 검색 쿼리 생성 모듈
+조문 내용과 제목, 문제 키워드로부터 벡터 검색에 사용할 쿼리 목록을 만듭니다.
+코드에 고정된 쿼리(static_query_vocabulary)는 저장소별 쿼리 임베딩 뱅크로 미리 임베딩됩니다.
+"""
+
+from typing import List, Dict
+
+# 조문 유형과 무관하게 항상 사용하는 쿼리
+GENERIC_ARTICLE_QUERIES = [
+    "조례 제정권한 한계 위반",
+    "상위법령 위반 조례",
+]
+
+# 조문 내용 단어 -> 추가 키워드 (사무, 권한, 법령 순)
+CONTENT_KEYWORD_RULES = [
+    (['허가', '승인', '신고', '인허가', '지정'], ['기관위임사무', '허가사무', '인허가']),
+    (['권한', '지시', '명령', '처분'], ['권한위임', '처분권한']),
+    (['법률', '시행령', '시행규칙'], ['상위법령위반', '법령충돌']),
+]
+
+# 조문 제목 단어 -> (분야, 추가 키워드)
+TITLE_FIELD_RULES = [
+    (['건축', '건설', '개발'], '건축', ['건축허가', '개발행위허가']),
+    (['환경', '대기', '수질'], '환경', ['환경영향평가', '환경허가']),
+    (['도시', '계획', '용도'], '도시계획', ['도시계획', '용도지역']),
+]
+
+# 이론적 배경 검색: 문제 키워드별 확장 쿼리
+THEORY_KEYWORD_QUERIES = {
+    "기관위임사무": ["기관위임사무", "조례 제정 금지", "지방자치법 제22조",
+                "국가사무 위임", "시장 군수 구청장", "위임사무 조례", "기관위임 금지"],
+    "상위법령": ["상위법령", "법령우위", "조례 무효", "법령 충돌", "상위법 위반", "조례 위법"],
+    "권한": ["권한 위임", "권한배분", "법률유보", "조례 권한", "지방자치단체 권한"],
+    "위법": ["조례 위법", "무효 조례", "법령 위반", "조례 위반"],
+    "헌법위반": ["헌법위반", "기본권침해", "헌법재판소", "위헌조례", "헌법적 한계"],
+    "기본권": ["기본권침해", "재산권", "영업의자유", "평등권", "기본권 제한"],
+    "평등원칙": ["평등원칙", "평등원칙 위반", "헌법원칙", "조례 한계"],
+    "비례원칙": ["비례원칙", "비례원칙 위반", "헌법원칙", "조례 한계"],
+}
+for _keyword in ["조세", "벌금", "과태료"]:
+    THEORY_KEYWORD_QUERIES[_keyword] = ["조세법률주의", "벌금 부과", "과태료", "법률유보", "조례 벌칙"]
+
+# 이론적 배경 검색: 문맥 단어 -> 추가 쿼리
+CONTEXT_KEYWORD_QUERIES = {
+    '허가': '허가권한',
+    '승인': '승인권한',
+    '처분': '행정처분',
+    '위임': '권한위임',
+}
+
+
+def _field_query(title_field: str) -> str:
+    return f"{title_field} 기관위임사무 조례 위법" if title_field else "기관위임사무 조례 위법"
+
+
+def _keyword_query(keyword: str) -> str:
+    return f"{keyword} 조례 위법"
+
+
+def build_article_search_queries(article: Dict[str, str]) -> List[str]:
+    """조문별 위법 사례 검색 쿼리 생성"""
+    content = article.get('content', '')
+    title = article.get('article_title', '')
+
+    # 조문에서 핵심 키워드 추출
+    content_keywords = []
+    for words, keywords in CONTENT_KEYWORD_RULES:
+        if any(word in content for word in words):
+            content_keywords.extend(keywords)
+
+    # 조문 제목에서 핵심 분야 추출
+    title_field = ""
+    for words, field, keywords in TITLE_FIELD_RULES:
+        if any(word in title for word in words):
+            title_field = field
+            content_keywords.extend(keywords)
+            break
+
+    search_queries = [
+        _field_query(title_field),
+        f"{title} 위법 판례",
+    ] + GENERIC_ARTICLE_QUERIES
+
+    # 키워드가 있으면 추가 쿼리 생성 (상위 3개만)
+    for keyword in content_keywords[:3]:
+        search_queries.append(_keyword_query(keyword))
+
+    return search_queries
+
+
+def build_theory_keyword_queries(keyword: str) -> List[str]:
+    """문제 키워드별 이론적 배경 검색 쿼리"""
+    if keyword in THEORY_KEYWORD_QUERIES:
+        return list(THEORY_KEYWORD_QUERIES[keyword])
+    return [keyword, f"{keyword} 조례", f"{keyword} 위법", f"{keyword} 판례"]
+
+
+def static_query_vocabulary() -> List[str]:
+    """코드에 고정된 검색 쿼리 전체 (조문 제목 등 동적 문자열 제외)"""
+    queries = list(GENERIC_ARTICLE_QUERIES)
+    queries.append(_field_query(""))
+    for _, field, keywords in TITLE_FIELD_RULES:
+        queries.append(_field_query(field))
+        queries.extend(_keyword_query(keyword) for keyword in keywords)
+    for _, keywords in CONTENT_KEYWORD_RULES:
+        queries.extend(_keyword_query(keyword) for keyword in keywords)
+    for expansions in THEORY_KEYWORD_QUERIES.values():
+        queries.extend(expansions)
+    queries.extend(CONTEXT_KEYWORD_QUERIES.values())
+    return list(dict.fromkeys(queries))
@@ -0,0 +1,224 @@
+"""
+공유 메모리 벡터스토어 호스팅
+로더 데몬이 임베딩 행렬과 텍스트 블롭을 multiprocessing.shared_memory 세그먼트로 게시하고,
+각 Streamlit 워커는 복사 없이 세그먼트에 연결하여 호스트당 한 벌의 메모리만 사용합니다.
+
+사용법:
+    python shared_store.py serve <PKL 또는 .vstore> [...]   # 데몬 실행
+    ORDINANCE_SHARED_STORES=1 streamlit run streamlit_app.py # 워커는 레지스트리를 통해 자동 연결
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import signal
+import numpy as np
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Optional
+
+from vector_store import VectorStore, TextBlob, load_vectorstore, _resolve_store_path
+
+SEGMENT_PREFIX = 'ordvs_'
+ENV_FLAG = 'ORDINANCE_SHARED_STORES'
+POLL_INTERVAL = 10  # 데몬이 파일 변경을 확인하는 주기 (초)
+
+# 세그먼트로 게시하는 컬럼 (VectorStore 속성명 -> 세그먼트 접미사)
+_COLUMNS = {
+    'embeddings': 'emb',
+    'scales': 'scl',
+    'offsets': 'off',
+    'blob': 'txt',
+    'source_ids': 'src',
+    'pages': 'pg',
+}
+
+
+def shared_stores_enabled() -> bool:
+    """환경 변수로 공유 메모리 연결이 켜져 있는지 확인"""
+    return os.environ.get(ENV_FLAG, '').lower() in ('1', 'true', 'yes')
+
+
+def segment_prefix(path: str) -> str:
+    """저장소 경로로부터 세그먼트 이름 접두사 생성 (데몬과 워커가 같은 규칙 사용)"""
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    return SEGMENT_PREFIX + digest
+
+
+def _file_key(path: str) -> List[Any]:
+    resolved = _resolve_store_path(path)
+    stat = os.stat(resolved)
+    return [os.path.abspath(resolved), stat.st_mtime_ns, stat.st_size]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """기존 세그먼트에 연결 (워커 종료 시 세그먼트가 삭제되지 않도록 추적 해제)"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return shm
+
+
+def _store_columns(store: VectorStore) -> Dict[str, Optional[np.ndarray]]:
+    return {
+        'embeddings': store.embeddings,
+        'scales': store.scales,
+        'offsets': store.texts.offsets,
+        'blob': store.texts.blob,
+        'source_ids': store.source_ids,
+        'pages': store.pages,
+    }
+
+
+class SharedStorePublisher:
+    """저장소를 공유 메모리 세그먼트로 게시하는 데몬 측 객체"""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.segments = {}  # 경로 -> [SharedMemory, ...]
+        self.keys = {}      # 경로 -> 게시한 파일 키
+        self.generation = 0
+
+    def publish(self, path: str) -> None:
+        """저장소 하나를 (재)게시"""
+        store = load_vectorstore(path)
+        key = _file_key(path)
+        prefix = segment_prefix(path)
+        self.generation += 1
+
+        created = []
+        columns = {}
+        for attr, array in _store_columns(store).items():
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            name = f"{prefix}_{self.generation}_{_COLUMNS[attr]}"
+            shm = shared_memory.SharedMemory(name=name, create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            created.append(shm)
+            columns[attr] = {'name': name, 'shape': list(array.shape), 'dtype': array.dtype.str}
+
+        manifest = json.dumps({
+            'key': key,
+            'columns': columns,
+            'sources': list(store.sources),
+            'meta': store.meta,
+        }, ensure_ascii=False).encode('utf-8')
+
+        # 매니페스트 세그먼트를 교체하면 이후 연결하는 워커는 새 세대를 봄
+        self._unlink_names([prefix])
+        meta_shm = shared_memory.SharedMemory(name=prefix, create=True, size=len(manifest) + 1)
+        meta_shm.buf[:len(manifest)] = manifest
+        meta_shm.buf[len(manifest)] = 0
+        created.append(meta_shm)
+
+        # 이전 세대 해제 (이미 연결된 워커의 매핑은 유지됨)
+        for shm in self.segments.get(path, []):
+            if shm.name != prefix:
+                self._release(shm)
+        self.segments[path] = created
+        self.keys[path] = key
+        print(f"[INFO] 게시 완료: {path} ({len(store)}개 청크, 세대 {self.generation})")
+
+    def refresh(self) -> None:
+        """파일이 바뀐 저장소만 다시 게시"""
+        for path in self.paths:
+            try:
+                if self.keys.get(path) != _file_key(path):
+                    self.publish(path)
+            except Exception as e:
+                print(f"[ERROR] 게시 실패 ({path}): {e}")
+
+    def close(self) -> None:
+        """모든 세그먼트 해제"""
+        for segments in self.segments.values():
+            for shm in segments:
+                self._release(shm)
+        self.segments.clear()
+
+    @staticmethod
+    def _release(shm: shared_memory.SharedMemory) -> None:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _unlink_names(names: List[str]) -> None:
+        for name in names:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                continue
+            SharedStorePublisher._release(shm)
+
+
+def attach_shared_store(path: str) -> Optional[VectorStore]:
+    """데몬이 게시한 저장소에 복사 없이 연결 (없거나 파일과 버전이 다르면 None)"""
+    try:
+        meta_shm = _attach(segment_prefix(path))
+    except FileNotFoundError:
+        return None
+
+    try:
+        raw = bytes(meta_shm.buf).split(b'\0', 1)[0]
+        manifest = json.loads(raw.decode('utf-8'))
+    finally:
+        meta_shm.close()
+
+    if manifest['key'] != _file_key(path):
+        return None
+
+    segments = []
+    arrays = {}
+    for attr, info in manifest['columns'].items():
+        shm = _attach(info['name'])
+        segments.append(shm)
+        arrays[attr] = np.ndarray(tuple(info['shape']), dtype=np.dtype(info['dtype']), buffer=shm.buf)
+
+    store = VectorStore(
+        arrays['embeddings'],
+        TextBlob(arrays['blob'], arrays['offsets']),
+        arrays['source_ids'],
+        arrays['pages'],
+        manifest['sources'],
+        manifest['meta'],
+        path,
+        arrays.get('scales'),
+    )
+    store._shared_segments = segments  # 저장소가 살아 있는 동안 매핑 유지
+    return store
+
+
+def serve(paths: List[str]) -> None:
+    """저장소를 게시하고 종료 신호가 올 때까지 파일 변경을 감시"""
+    publisher = SharedStorePublisher(paths)
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        publisher.refresh()
+        print(f"[INFO] 공유 메모리 데몬 실행 중 (워커는 {ENV_FLAG}=1 로 연결)")
+        while True:
+            time.sleep(POLL_INTERVAL)
+            publisher.refresh()
+    except KeyboardInterrupt:
+        print("[INFO] 데몬 종료, 세그먼트 해제")
+    finally:
+        publisher.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != 'serve':
+        print("사용법: python shared_store.py serve <PKL 또는 .vstore> [...]")
+        sys.exit(1)
+    serve(sys.argv[2:])
@@ -8,7 +8,6 @@ from docx.enum.section import WD_ORIENT
 import PyPDF2
 import google.generativeai as genai
 import openai
-import os
 import tempfile
 import re
 from docx.shared import RGBColor
@@ -153,8 +152,10 @@ if 'rag_loaded' not in st.session_state:
     st.session_state.rag_loaded = False
 
 def load_rag_vectorstores():
-    """PKL 파일에서 RAG 벡터스토어 로드"""
-    import pickle
+    """RAG 벡터스토어 로드 (프로세스 전역 레지스트리 경유, 세션 간 공유)"""
+    from vector_store import get_vectorstore_registry, vectorstore_exists
+
+    registry = get_vectorstore_registry()
 
     if st.session_state.rag_loaded:
         return st.session_state.rag_vectorstores
@@ -163,20 +164,18 @@ def load_rag_vectorstores():
 
     # 자치법규 매뉴얼 벡터스토어
     manual_path = "enhanced_vectorstore_20250914_101739.pkl"
-    if os.path.exists(manual_path):
+    if vectorstore_exists(manual_path):
         try:
-            with open(manual_path, 'rb') as f:
-                vectorstores['manual'] = pickle.load(f)
+            vectorstores['manual'] = registry.get(manual_path)
             st.success(f"✅ 자치법규 매뉴얼 로드 완료")
         except Exception as e:
             st.warning(f"⚠️ 자치법규 매뉴얼 로드 실패: {e}")
 
     # 재의·제소 조례 모음집 벡터스토어
     cases_path = "3. 지방자치단체의 재의·제소 조례 모음집(Ⅸ) (1)_new_vectorstore.pkl"
-    if os.path.exists(cases_path):
+    if vectorstore_exists(cases_path):
         try:
-            with open(cases_path, 'rb') as f:
-                vectorstores['cases'] = pickle.load(f)
+            vectorstores['cases'] = registry.get(cases_path)
             st.success(f"✅ 재의·제소 판례 모음집 로드 완료")
         except Exception as e:
             st.warning(f"⚠️ 재의·제소 판례 모음집 로드 실패: {e}")
@@ -185,148 +184,63 @@ def load_rag_vectorstores():
     st.session_state.rag_loaded = True
     return vectorstores
 
-def search_rag_context(query, vectorstores, top_k=5):
-    """RAG 벡터스토어에서 관련 문서 검색"""
-    results = []
-
-    # 품질 필터 함수: 목차/제목만 있는 청크 제외
-    def is_quality_content(text):
-        """유용한 내용인지 판단"""
-        # 최소 길이 체크 (100자 미만은 목차일 가능성 높음)
-        if len(text) < 100:
-            return False
-
-        # 목차/제목 패턴 감지
-        toc_patterns = [
-            r'^제\d+장\s+',  # 제1장
-            r'^제\d+절\s+',  # 제1절
-            r'^\d+\.\s+\w+\s*$',  # 1. 제목
-            r'^[가-힣]+\s+\d+$',  # 목차 번호
-            r'^\s*목\s*차\s*$',  # 목차
-            r'^\s*차\s*례\s*$',  # 차례
-        ]
-
-        for pattern in toc_patterns:
-            if re.search(pattern, text.strip(), re.MULTILINE):
-                # 패턴이 있어도 내용이 충분히 있으면 허용
-                if len(text) > 300:
-                    return True
-                return False
-
-        # 문장 완성도 체크: 마침표가 3개 이상 있어야 함 (설명이 있는 텍스트)
-        sentence_count = text.count('.') + text.count('다.') + text.count('함.')
-        if sentence_count < 2:
-            return False
+def search_rag_context(query, vectorstores, top_k=5, query_embedding=None, hybrid=None):
+    """RAG 벡터스토어에서 관련 문서 검색 (기본은 키워드 검색, 임베딩 모델을 부르지 않음)
 
-        # 실제 법률 용어나 설명이 포함되어 있는지
-        useful_keywords = ['판단', '해석', '따라서', '경우', '규정', '위반', '적법', '위법', '검토', '사례', '판례']
-        has_useful_content = any(kw in text for kw in useful_keywords)
+    query_embedding(정규화된 쿼리 임베딩)을 주거나 hybrid=True(또는 ORDINANCE_HYBRID_SEARCH=1)이면
+    키워드 점수와 임베딩 유사도를 순위 융합합니다. 임베딩이 없으면 저장소를 만든 모델의 공유 임베딩 서비스로
+    쿼리를 임베딩하고(캐시 사용), 실패하면 키워드 점수만 사용합니다.
+    """
+    from keyword_index import keyword_index_for
+    from chunk_features import chunk_features_for
+    from retrieval import HybridRetriever, hybrid_search_enabled
 
-        return has_useful_content or len(text) > 500
+    use_hybrid = query_embedding is not None or hybrid_search_enabled(hybrid)
+    results = []
 
-    for store_name, store_data in vectorstores.items():
+    for store_name, store in vectorstores.items():
         try:
-            # 벡터스토어 형식에 따라 검색 수행
-            if isinstance(store_data, dict):
-                # chunks 키가 있는 경우 (우선 사용)
-                if 'chunks' in store_data:
-                    chunks = store_data['chunks']
-                    query_keywords = [kw.lower() for kw in query.split() if len(kw) > 1]
-
-                    scored_chunks = []
-                    for chunk in chunks:
-                        if isinstance(chunk, dict) and 'text' in chunk:
-                            text = chunk['text']
-                        elif isinstance(chunk, str):
-                            text = chunk
-                        else:
-                            continue
-
-                        # 품질 필터: 유용한 내용인지 체크
-                        if not is_quality_content(text):
-                            continue
-
-                        # 키워드 매칭 점수 계산
-                        text_lower = text.lower()
-                        keyword_score = sum(1 for kw in query_keywords if kw in text_lower)
-
-                        # 내용 밀도 보너스: 긴 텍스트에 보너스 점수
-                        length_bonus = min(len(text) / 500, 3.0)  # 최대 3점 보너스
+            store_embedding = query_embedding
+            if use_hybrid and store_embedding is None:
+                from embedding_cache import cached_encode
+                from embedding_service import embedding_service_for
+                try:
+                    store_embedding = cached_encode(embedding_service_for(store), [query])
+                except Exception as e:
+                    st.write(f"[DEBUG] {store_name} 쿼리 임베딩 실패, 키워드 검색만 사용: {e}")
 
-                        # 법률 분석 키워드 보너스
-                        analysis_keywords = ['판단', '검토', '위법', '적법', '사례', '판례', '해석', '기준']
-                        analysis_bonus = sum(0.5 for kw in analysis_keywords if kw in text)
+            # 역색인에서 쿼리 용어가 포함된 청크만 BM25 점수와 함께 조회
+            index = keyword_index_for(store)
+            docs, bm25_scores = index.score(index.tokenizer.tokenize(query))
 
-                        total_score = keyword_score + length_bonus + analysis_bonus
+            # 품질 필터: 목차/제목만 있는 청크 제외 (저장소 생성 시 계산된 품질 플래그)
+            features = chunk_features_for(store)
+            quality = features.is_quality[docs]
+            docs, bm25_scores = docs[quality], bm25_scores[quality]
 
-                        if keyword_score > 0:
-                            scored_chunks.append((text, total_score))
+            # 내용 밀도 보너스: 긴 텍스트에 보너스 점수 (최대 3점)
+            length_bonus = np.minimum(features.text_length[docs] / 500, 3.0)
 
-                    # 상위 결과 선택
-                    scored_chunks.sort(key=lambda x: x[1], reverse=True)
-                    for text, score in scored_chunks[:top_k]:
-                        results.append({
-                            'source': store_name,
-                            'text': text[:2000],  # 최대 2000자
-                            'score': score
-                        })
+            # 법률 분석 키워드 보너스 (키워드당 0.5점)
+            analysis_bonus = 0.5 * features.keyword_counts('analysis', docs)
 
-                # texts 키가 있는 경우
-                elif 'texts' in store_data:
-                    texts = store_data['texts']
-                    query_keywords = [kw.lower() for kw in query.split() if len(kw) > 1]
-
-                    scored_texts = []
-                    for text in texts:
-                        if isinstance(text, str):
-                            text_lower = text.lower()
-                            score = sum(1 for kw in query_keywords if kw in text_lower)
-                            if score > 0:
-                                scored_texts.append((text, score))
-
-                    scored_texts.sort(key=lambda x: x[1], reverse=True)
-                    for text, score in scored_texts[:top_k]:
-                        results.append({
-                            'source': store_name,
-                            'text': text[:2000],
-                            'score': score
-                        })
+            keyword_scores = (bm25_scores + length_bonus + analysis_bonus).astype(np.float32)
 
-                # documents 키가 있는 경우
-                elif 'documents' in store_data:
-                    docs = store_data['documents']
-                    query_keywords = [kw.lower() for kw in query.split() if len(kw) > 1]
-
-                    scored_docs = []
-                    for doc in docs:
-                        if isinstance(doc, dict):
-                            text = doc.get('text', doc.get('content', ''))
-                        elif isinstance(doc, str):
-                            text = doc
-                        else:
-                            continue
-
-                        text_lower = text.lower()
-                        score = sum(1 for kw in query_keywords if kw in text_lower)
-                        if score > 0:
-                            scored_docs.append((text, score))
-
-                    scored_docs.sort(key=lambda x: x[1], reverse=True)
-                    for text, score in scored_docs[:top_k]:
-                        results.append({
-                            'source': store_name,
-                            'text': text[:2000],
-                            'score': score
-                        })
-            elif hasattr(store_data, 'similarity_search'):
-                # LangChain 스타일 벡터스토어
-                docs = store_data.similarity_search(query, k=top_k)
-                for doc in docs:
-                    results.append({
-                        'source': store_name,
-                        'text': doc.page_content[:2000],
-                        'score': 1.0
-                    })
+            # 상위 결과 선택 (하이브리드이면 임베딩 순위와 융합, 텍스트는 선택된 청크만 디코딩)
+            records = HybridRetriever(store).search(
+                top_k,
+                query_embeddings=store_embedding,
+                sparse=(docs, keyword_scores),
+                mask=features.is_quality if store_embedding is not None else None,
+            )
+            for record in records:
+                results.append({
+                    'source': store_name,
+                    'text': record.text[:2000],  # 최대 2000자
+                    'score': record.score if store_embedding is not None else record.sparse_score,
+                    'keyword_score': record.sparse_score,
+                    'similarity': record.dense_score,
+                })
         except Exception as e:
             st.warning(f"⚠️ {store_name} 검색 중 오류: {e}")
 
@@ -2202,6 +2116,10 @@ def send_error_report(subject, body, attachment_data=None, attachment_name=None)
         return False
 
 def main():
+    # 임베딩 모델은 백그라운드에서 미리 로드 (프로세스당 1회, 이후 rerun에서는 아무 일도 하지 않음)
+    from embedding_service import get_embedding_service
+    get_embedding_service().warm_up(background=True)
+
     # 헤더
     st.markdown("""
     <div class="main-header">
@@ -2280,6 +2198,33 @@ def main():
                 else:
                     st.warning("⚠️ Gemini API 키를 먼저 입력해주세요")
 
+            st.markdown("---")
+            st.subheader("📚 RAG 벡터스토어 캐시")
+            from vector_store import get_vectorstore_registry
+            registry_stats = get_vectorstore_registry().stats()
+            st.caption(f"로드된 저장소 {len(registry_stats['loaded'])}개 · 적중 {registry_stats['hits']}회 · 로드 {registry_stats['misses']}회")
+            if st.button("캐시 비우기", key="evict_rag_cache"):
+                get_vectorstore_registry().evict()
+                st.session_state.rag_vectorstores = None
+                st.session_state.rag_loaded = False
+                st.success("✅ 벡터스토어 캐시를 비웠습니다")
+
+            from embedding_cache import get_embedding_cache
+            embedding_stats = get_embedding_cache().stats()
+            st.caption(f"쿼리 임베딩 캐시 {embedding_stats['entries']}개 · 적중률 {embedding_stats['hit_rate']:.1%} "
+                       f"({embedding_stats['hits']}/{embedding_stats['hits'] + embedding_stats['misses']}) · "
+                       f"고정 쿼리 {embedding_stats['static_entries']}개")
+            service_stats = get_embedding_service().stats()
+            if service_stats['loaded']:
+                st.caption(f"임베딩 모델 {service_stats['model_name']} ({service_stats['backend']}) · 로드 {service_stats['load_seconds']:.1f}초 · "
+                           f"인코딩 {service_stats['encode_calls']}회")
+                micro_batch = service_stats.get('micro_batch')
+                if micro_batch and micro_batch['batches']:
+                    st.caption(f"마이크로 배치 평균 {micro_batch['mean_batch_size']:.1f}개 · "
+                               f"대기 p50 {micro_batch['queue_delay_ms']['p50']:.1f}ms / p95 {micro_batch['queue_delay_ms']['p95']:.1f}ms")
+            else:
+                st.caption(f"임베딩 모델 {service_stats['model_name']} 로드 중...")
+
         # 기본값 설정 (expander 외부)
         if 'gemini_api_key' not in dir():
             gemini_api_key = ""
@@ -0,0 +1,62 @@
+"""
+청크 특징 컬럼 테스트
+"""
+
+import numpy as np
+import pytest
+
+from chunk_features import (ChunkFeatures, VOCABULARIES, THEORY_INDICATORS, keyword_mask, popcount,
+                            is_quality_content)
+
+TEXTS = [
+    "대법원 판례에 따르면 법령에 위반되는 조례는 무효이다. 헌법재판소도 같은 법리를 밝혔다.",
+    "제1장 총칙",
+    "도로 관리에 관한 사항",
+]
+
+
+def test_keyword_mask_sets_bit_per_vocabulary_term():
+    """어휘의 i번째 용어가 텍스트에 있으면 i번째 비트"""
+    mask = keyword_mask("원칙과 학설", THEORY_INDICATORS)
+    assert mask == (1 << THEORY_INDICATORS.index('원칙')) | (1 << THEORY_INDICATORS.index('학설'))
+    assert keyword_mask("관계없는 문장", THEORY_INDICATORS) == 0
+
+
+@pytest.mark.parametrize('native', [True, False])
+def test_popcount_counts_set_bits_for_each_dtype(native, monkeypatch):
+    """부호 없는 정수 폭마다 설정된 비트 수 (np.bitwise_count가 없는 numpy의 unpackbits 경로 포함)"""
+    if not native:
+        monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        masks = np.array([0, 1, 0b1011, np.iinfo(dtype).max], dtype=dtype)
+        assert popcount(masks).tolist() == [0, 1, 3, np.dtype(dtype).itemsize * 8]
+
+
+def test_mask_popcount_equals_keyword_count():
+    """마스크 popcount가 텍스트에 포함된 어휘 용어 수와 같음"""
+    features = ChunkFeatures.build(TEXTS)
+    for name, vocabulary in VOCABULARIES.items():
+        expected = [sum(1 for term in vocabulary if term in text) for text in TEXTS]
+        assert features.keyword_counts(name).tolist() == expected
+        assert features.keyword_counts(name, np.array([2, 0])).tolist() == [expected[2], expected[0]]
+
+
+def test_build_matches_text_predicates():
+    """품질/목차 컬럼이 텍스트 판정 함수와 같은 결과"""
+    features = ChunkFeatures.build(TEXTS)
+    assert features.text_length.tolist() == [len(text) for text in TEXTS]
+    assert features.is_quality.tolist() == [is_quality_content(text) for text in TEXTS]
+    assert features.is_toc.tolist() == [False, True, False]
+
+
+def test_save_open_and_concatenate(tmp_path):
+    """저장 후 다시 연 컬럼과 배치별로 계산해 이은 컬럼이 한 번에 계산한 결과와 같음"""
+    features = ChunkFeatures.build(TEXTS)
+    features.save(str(tmp_path))
+    reopened = ChunkFeatures.open(str(tmp_path), expected_count=len(TEXTS))
+    concatenated = ChunkFeatures.concatenate([ChunkFeatures.build(TEXTS[:1]), ChunkFeatures.build(TEXTS[1:])])
+    for name, column in features.columns.items():
+        assert np.array_equal(reopened.columns[name], column)
+        assert np.array_equal(concatenated.columns[name], column)
+        assert concatenated.columns[name].dtype == column.dtype
+    assert ChunkFeatures.open(str(tmp_path), expected_count=len(TEXTS) + 1) is None
@@ -0,0 +1,56 @@
+"""
+쿼리 임베딩 캐시 테스트
+"""
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+class _FakeEncoder:
+    """텍스트마다 고정 벡터를 돌려주는 인코더 (백엔드마다 값이 다름)"""
+
+    model_name = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+    def __init__(self, backend, offset):
+        self.encoder_backend = backend
+        self.offset = offset
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.calls += 1
+        return np.array([[len(text) + self.offset, 1.0] for text in texts], dtype=np.float32)
+
+
+def test_embedding_cache_keys_by_encoder_backend(tmp_path):
+    """같은 모델·텍스트라도 백엔드가 다르면 캐시를 공유하지 않음 (저장 후 다시 읽어도 유지)"""
+    torch_encoder, onnx_encoder = _FakeEncoder('torch', 0.0), _FakeEncoder('onnx-int8', 5.0)
+    cache = EmbeddingCache()
+    torch_vector = cache.encode(torch_encoder, ['조례 위법'])
+    onnx_vector = cache.encode(onnx_encoder, ['조례 위법'])
+    assert not np.allclose(torch_vector, onnx_vector)
+    assert onnx_encoder.calls == 1
+
+    path = str(tmp_path / 'cache.npz')
+    cache.save(path)
+    reloaded = EmbeddingCache(path=path)
+    assert np.allclose(reloaded.encode(torch_encoder, ['조례 위법']), torch_vector)
+    assert np.allclose(reloaded.encode(onnx_encoder, ['조례 위법']), onnx_vector)
+    assert (torch_encoder.calls, onnx_encoder.calls) == (1, 1)
+
+
+def test_lru_evicts_oldest_and_encodes_duplicates_once():
+    """중복 텍스트는 한 번만 인코딩하고 max_entries를 넘으면 가장 오래 쓰지 않은 항목부터 제거"""
+    encoder = _FakeEncoder('torch', 0.0)
+    cache = EmbeddingCache(max_entries=2)
+    cache.encode(encoder, ['가', '나나', '가'])
+    assert encoder.calls == 1
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    cache.encode(encoder, ['가'])       # '가'를 최근 사용으로 갱신
+    cache.encode(encoder, ['다다다'])   # 가장 오래된 '나나'가 제거됨
+    assert cache.stats()['entries'] == 2
+    cache.encode(encoder, ['가', '다다다'])
+    assert encoder.calls == 2
+    cache.encode(encoder, ['나나'])
+    assert encoder.calls == 3
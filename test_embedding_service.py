@@ -0,0 +1,77 @@
+"""
+임베딩 서비스 마이크로 배치 테스트
+"""
+
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from embedding_service import MicroBatcher
+
+
+def _encode_recorder(batches):
+    """배치마다 텍스트 목록을 기록하고 텍스트 길이와 첫 글자 코드를 행으로 돌려주는 encode_batch"""
+    def encode_batch(texts):
+        batches.append(list(texts))
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+    return encode_batch
+
+
+def _enqueue(batcher, requests):
+    """워커를 띄우기 전에 요청을 큐에 넣어 둠 (도착 순서를 고정)"""
+    futures = []
+    for texts in requests:
+        future = Future()
+        batcher._queue.put((list(texts), time.perf_counter(), future))
+        futures.append(future)
+    return futures
+
+
+def test_batches_stay_within_max_batch_and_carry_over():
+    """넣으면 max_batch를 넘는 요청은 다음 배치의 첫 요청이 되고, 첫 요청 하나가 크면 단독 배치"""
+    batches = []
+    batcher = MicroBatcher(_encode_recorder(batches), max_batch=4, max_wait_ms=50)
+    requests = [["a", "b"], ["c"], ["d", "e", "f"], ["g"], [f"h{i}" for i in range(6)]]
+    futures = _enqueue(batcher, requests)
+    batcher.submit(["z"])
+
+    assert batches[:3] == [["a", "b", "c"], ["d", "e", "f", "g"], [f"h{i}" for i in range(6)]]
+    assert batches[3] == ["z"]
+    for texts, future in zip(requests, futures):
+        assert future.result(timeout=1).tolist() == [[len(text), ord(text[0])] for text in texts]
+
+    # 통계는 결과를 돌려준 뒤 기록하므로 마지막 배치 기록을 잠깐 기다림
+    deadline = time.perf_counter() + 1
+    while batcher.stats()['batches'] < 4 and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    stats = batcher.stats()
+    assert stats['batches'] == 4
+    assert stats['requests_per_batch'] == {1: 2, 2: 2}
+
+
+def test_duplicate_texts_encoded_once_and_split_per_request():
+    """한 배치 안의 같은 텍스트는 한 번만 인코딩하고 요청별 행 순서대로 나눠 줌"""
+    batches = []
+    batcher = MicroBatcher(_encode_recorder(batches), max_batch=8, max_wait_ms=50)
+    requests = [["조례", "위법"], ["위법", "권한", "조례"]]
+    futures = _enqueue(batcher, requests)
+    batcher.submit(["권한"])
+
+    assert batches[0] == ["조례", "위법", "권한"]
+    for texts, future in zip(requests, futures):
+        assert future.result(timeout=1).tolist() == [[len(text), ord(text[0])] for text in texts]
+
+
+def test_encode_error_is_raised_in_every_request():
+    """배치 인코딩이 실패하면 배치의 모든 요청에 같은 예외"""
+    def encode_batch(texts):
+        raise RuntimeError("encode failed")
+
+    batcher = MicroBatcher(encode_batch, max_batch=8, max_wait_ms=50)
+    futures = _enqueue(batcher, [["a"], ["b"]])
+    with pytest.raises(RuntimeError):
+        batcher.submit(["c"])
+    for future in futures:
+        assert isinstance(future.exception(timeout=1), RuntimeError)
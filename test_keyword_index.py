@@ -0,0 +1,109 @@
+"""
+BM25 키워드 역색인 테스트
+"""
+
+import os
+import math
+
+import numpy as np
+
+from korean_tokenizer import get_tokenizer
+from keyword_index import KeywordIndex, KeywordIndexBuilder, keyword_index_for, INDEX_MANIFEST_FILE, POSTING_DOCS_FILE
+from vector_store import VectorStore
+
+TEXTS = [
+    "조례 위법 판례",
+    "조례 조례 제정 권한",
+    "기관위임사무 조례 위법",
+    "도로 관리 규칙",
+]
+
+
+def _bm25(texts, query_terms, tokenizer, k1=1.5, b=0.75):
+    """정의대로 계산한 문서별 BM25 점수"""
+    docs = [tokenizer.tokenize(text) for text in texts]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    scores = {}
+    for term in dict.fromkeys(query_terms):
+        containing = [i for i, doc in enumerate(docs) if term in doc]
+        idf = math.log1p((len(docs) - len(containing) + 0.5) / (len(containing) + 0.5))
+        for i in containing:
+            tf = docs[i].count(term)
+            norm = k1 * (1 - b + b * len(docs[i]) / avg_length)
+            scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_bm25_scores_match_definition():
+    """포스팅 목록만으로 계산한 점수가 BM25 정의와 같고 쿼리 용어가 없는 문서는 제외"""
+    tokenizer = get_tokenizer('word')
+    index = KeywordIndex.build(TEXTS, tokenizer)
+    query_terms = tokenizer.tokenize("조례 위법")
+
+    docs, scores = index.score(query_terms)
+    expected = _bm25(TEXTS, query_terms, tokenizer)
+    assert docs.tolist() == sorted(expected)
+    assert np.allclose(scores, [expected[doc] for doc in docs.tolist()], rtol=1e-5)
+    assert 3 not in docs.tolist()
+
+
+def test_search_ranks_by_score_and_applies_predicate():
+    """상위 k개를 점수 내림차순으로 반환하고 predicate로 후보를 거름"""
+    index = KeywordIndex.build(TEXTS, get_tokenizer('word'))
+    results = index.search("조례 위법", k=2)
+    assert [doc for doc, _ in results] == [0, 2]
+    assert results[0][1] >= results[1][1]
+    assert [doc for doc, _ in index.search("조례 위법", k=3, predicate=lambda doc: doc != 0)] == [2, 1]
+
+
+def test_phrase_docs_intersects_postings():
+    """구절의 모든 토큰을 포함하는 문서만 반환"""
+    index = KeywordIndex.build(TEXTS, get_tokenizer('word'))
+    assert index.phrase_docs("조례 위법").tolist() == [0, 2]
+    assert index.phrase_docs("없는 용어").tolist() == []
+
+
+def test_csr_round_trip(tmp_path):
+    """저장 후 다시 연 색인의 CSR 배열과 검색 결과가 같음"""
+    tokenizer = get_tokenizer('bigram')
+    index = KeywordIndex.build(TEXTS, tokenizer)
+    index.save(str(tmp_path))
+    assert not [name for name in os.listdir(tmp_path) if '.tmp-' in name]
+
+    reopened = KeywordIndex.open(str(tmp_path), expected_count=len(TEXTS), tokenizer=tokenizer)
+    assert reopened.vocab == index.vocab
+    for name in ('offsets', 'docs', 'tfs', 'doc_lengths'):
+        assert np.array_equal(getattr(reopened, name), getattr(index, name))
+    assert reopened.search("조례 위법", k=3) == index.search("조례 위법", k=3)
+
+    # 청크 수나 토크나이저가 다르면 열지 않음
+    assert KeywordIndex.open(str(tmp_path), expected_count=len(TEXTS) + 1, tokenizer=tokenizer) is None
+    assert KeywordIndex.open(str(tmp_path), tokenizer=get_tokenizer('word')) is None
+
+
+def test_builder_batches_match_single_build():
+    """배치로 나눠 추가해도 한 번에 만든 색인과 같은 CSR 배열"""
+    tokenizer = get_tokenizer('bigram')
+    whole = KeywordIndex.build(TEXTS, tokenizer)
+    batched = KeywordIndexBuilder(tokenizer).add(TEXTS[:1]).add([]).add(TEXTS[1:]).finish()
+    assert batched.vocab == whole.vocab
+    for name in ('offsets', 'docs', 'tfs', 'doc_lengths'):
+        assert np.array_equal(getattr(batched, name), getattr(whole, name))
+
+
+def test_mismatched_index_is_not_overwritten(tmp_path, monkeypatch):
+    """다른 토크나이저로 저장된 색인은 메모리에서만 다시 만들고 파일은 그대로 둠"""
+    monkeypatch.setenv('ORDINANCE_TOKENIZER', 'bigram')
+    store_dir = VectorStore.from_columns(np.eye(len(TEXTS), dtype=np.float32), TEXTS).save(str(tmp_path / 'a.vstore'))
+    docs_path = os.path.join(store_dir, POSTING_DOCS_FILE)
+    saved_docs = np.load(docs_path).copy()
+
+    monkeypatch.setenv('ORDINANCE_TOKENIZER', 'word')
+    index = keyword_index_for(VectorStore.open(store_dir))
+    assert index.tokenizer.name == 'word'
+    assert np.array_equal(np.load(docs_path), saved_docs)
+
+    # 색인이 없던 저장소에는 저장
+    os.remove(os.path.join(store_dir, INDEX_MANIFEST_FILE))
+    keyword_index_for(VectorStore.open(store_dir))
+    assert KeywordIndex.open(store_dir, tokenizer=get_tokenizer('word')) is not None
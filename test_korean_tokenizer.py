@@ -0,0 +1,65 @@
+"""
+한국어 토크나이저 테스트
+"""
+
+import sys
+import unicodedata
+
+import pytest
+
+import korean_tokenizer
+from korean_tokenizer import BigramTokenizer, WordTokenizer, get_tokenizer
+
+
+def test_bigram_splits_hangul_runs_and_keeps_ascii_words():
+    """한글 구간은 음절 2-gram, 한 글자 구간과 영문/숫자는 그대로"""
+    assert BigramTokenizer().tokenize("조례안을 제 3조 ABC") == ['조례', '례안', '안을', '제', '3', '조', 'abc']
+
+
+def test_bigram_normalizes_decomposed_jamo():
+    """자모가 분리된 PDF 추출 텍스트도 같은 토큰으로 정규화"""
+    decomposed = unicodedata.normalize('NFD', "위법")
+    assert BigramTokenizer().tokenize(decomposed) == ['위법']
+
+
+def test_word_strips_trailing_particles():
+    """한글 단어 끝의 조사를 떼고 한 글자 토큰은 버림"""
+    tokens = WordTokenizer().tokenize("지방자치단체에서는 조례를 제정할 수 있다")
+    assert tokens == ['지방자치단체', '조례', '제정할', '있다']
+
+
+def test_word_keeps_short_words_that_end_like_particles():
+    """조사를 떼면 한 글자만 남는 단어는 그대로 둠"""
+    assert WordTokenizer().tokenize("사이 과정") == ['사이', '과정']
+
+
+def test_contains_matches_phrase_with_particle_in_text():
+    """구절 토큰이 모두 텍스트에 있으면 조사가 붙어 있어도 포함으로 판단"""
+    tokenizer = BigramTokenizer()
+    terms = tokenizer.term_set("상위법령에 위반되는 조례는 무효이다")
+    assert tokenizer.contains(terms, "상위법령 위반")
+    assert not tokenizer.contains(terms, "기관위임사무")
+    assert tokenizer.count_matches("상위법령에 위반되는 조례", ["위반", "조례", "판례"]) == 2
+
+
+def test_morpheme_keeps_nouns_and_stems():
+    """형태소 토크나이저는 체언과 용언 어근만 남김 (kiwipiepy가 있을 때)"""
+    pytest.importorskip('kiwipiepy')
+    tokens = korean_tokenizer.MorphemeTokenizer().tokenize("지방자치단체는 조례를 제정한다")
+    assert '조례' in tokens
+    assert '는' not in tokens and '를' not in tokens
+
+
+def test_morpheme_falls_back_to_bigram_without_kiwipiepy(monkeypatch):
+    """형태소 분석기가 없으면 bigram 토크나이저로 대체"""
+    monkeypatch.setitem(sys.modules, 'kiwipiepy', None)
+    monkeypatch.setattr(korean_tokenizer, '_tokenizers', {})
+    assert get_tokenizer('morpheme').name == 'bigram'
+
+
+def test_get_tokenizer_reads_environment(monkeypatch):
+    """이름을 주지 않으면 ORDINANCE_TOKENIZER 환경 변수의 토크나이저 사용"""
+    monkeypatch.setenv(korean_tokenizer.TOKENIZER_ENV, 'word')
+    assert get_tokenizer().name == 'word'
+    with pytest.raises(ValueError):
+        get_tokenizer('unknown')
@@ -0,0 +1,68 @@
+"""
+크로스 인코더 재순위 캐시 테스트
+"""
+
+import numpy as np
+
+from reranker import Reranker
+from vector_store import VectorStore, ChunkRecord
+
+TEXTS = ["조례", "위법 판례", "기관위임사무 조례", "상위법령 위반 여부 검토"]
+
+
+class _FakeCrossEncoder:
+    """predict 호출마다 쌍 목록을 기록하고 청크 길이를 점수로 돌려주는 모델"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(pairs))
+        return [float(len(text)) for _, text in pairs]
+
+
+def _records(store, indices):
+    return [ChunkRecord(store, i) for i in indices]
+
+
+def test_cached_pairs_are_not_predicted_again():
+    """이미 점수를 낸 (쿼리, 청크) 쌍은 캐시에서 읽고 새 쌍만 한 번의 배치로 예측"""
+    store = VectorStore.from_columns(np.eye(len(TEXTS), dtype=np.float32), TEXTS)
+    model = _FakeCrossEncoder()
+    reranker = Reranker(model=model)
+
+    first = reranker.score("조례 위법", _records(store, [0, 1]))
+    second = reranker.score("조례 위법 ", _records(store, [1, 2, 0]))
+    assert first.tolist() == [len(TEXTS[0]), len(TEXTS[1])]
+    assert second.tolist() == [len(TEXTS[1]), len(TEXTS[2]), len(TEXTS[0])]
+    assert model.calls == [[("조례 위법", TEXTS[0]), ("조례 위법", TEXTS[1])], [("조례 위법 ", TEXTS[2])]]
+    assert (reranker.hits, reranker.misses) == (2, 3)
+
+    # 다른 쿼리는 같은 청크라도 다시 예측
+    reranker.score("권한", _records(store, [0]))
+    assert len(model.calls) == 3
+
+
+def test_lru_evicts_least_recently_used_pair():
+    """캐시가 가득 차면 가장 오래 쓰지 않은 쌍부터 제거"""
+    store = VectorStore.from_columns(np.eye(len(TEXTS), dtype=np.float32), TEXTS)
+    model = _FakeCrossEncoder()
+    reranker = Reranker(model=model, cache_size=2)
+
+    reranker.score("조례", _records(store, [0, 1]))
+    reranker.score("조례", _records(store, [0]))  # 0을 최근 사용으로 갱신
+    reranker.score("조례", _records(store, [2]))  # 가장 오래된 1이 제거됨
+    assert reranker.stats()['cached'] == 2
+
+    model.calls.clear()
+    reranker.score("조례", _records(store, [0, 2, 1]))
+    assert model.calls == [[("조례", TEXTS[1])]]
+
+
+def test_rerank_orders_by_cross_encoder_score():
+    """재순위 점수 내림차순 상위 top_k개"""
+    store = VectorStore.from_columns(np.eye(len(TEXTS), dtype=np.float32), TEXTS)
+    reranker = Reranker(model=_FakeCrossEncoder())
+    ranked = reranker.rerank("조례", _records(store, range(len(TEXTS))), top_k=2)
+    assert [(record.index, score) for record, score in ranked] == [(3, len(TEXTS[3])), (2, len(TEXTS[2]))]
+    assert reranker.rerank("조례", [], top_k=2) == []
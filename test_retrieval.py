@@ -0,0 +1,103 @@
+"""
+다중 쿼리 검색과 하이브리드 융합 테스트
+"""
+
+import numpy as np
+import pytest
+
+import retrieval
+from retrieval import ArticleQueryBatch, HybridRetriever, RRF_K
+from vector_store import VectorStore
+
+TEXTS = [f"청크 {i}" for i in range(6)]
+DENSE = np.array([0.9, 0.2, 0.7, 0.1, 0.5, 0.3], dtype=np.float32)
+SPARSE = (np.array([1, 3, 4]), np.array([2.0, 6.0, 4.0], dtype=np.float32))
+
+
+def _store(dimension=4, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(len(TEXTS), dimension)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return VectorStore.from_columns(embeddings, TEXTS)
+
+
+def _ranks(docs, scores):
+    """점수 내림차순 순위 (1부터)"""
+    return {int(doc): rank for rank, doc in enumerate(np.asarray(docs)[np.argsort(-scores, kind='stable')], 1)}
+
+
+def test_rrf_orders_by_weighted_reciprocal_rank():
+    """RRF 점수가 신호별 weight / (rrf_k + rank)의 합이고 그 내림차순으로 정렬"""
+    retriever = HybridRetriever(_store(), fusion='rrf', dense_weight=0.5)
+    records = retriever.search(k=len(TEXTS), dense=DENSE, sparse=SPARSE)
+
+    dense_ranks = _ranks(np.arange(len(TEXTS)), DENSE)
+    sparse_ranks = _ranks(*SPARSE)
+    expected = {doc: 0.5 / (RRF_K + dense_ranks[doc]) + (0.5 / (RRF_K + sparse_ranks[doc]) if doc in sparse_ranks else 0.0)
+                for doc in dense_ranks}
+    assert [record.index for record in records] == sorted(expected, key=lambda doc: -expected[doc])
+    for record in records:
+        assert record.score == pytest.approx(expected[record.index])
+        assert record.dense_rank == dense_ranks[record.index]
+        assert record.sparse_rank == sparse_ranks.get(record.index)
+
+
+def test_weighted_fusion_uses_min_max_normalized_scores():
+    """weighted 융합은 신호별 min-max 정규화 점수의 가중합"""
+    retriever = HybridRetriever(_store(), fusion='weighted', dense_weight=0.25)
+    records = retriever.search(k=3, dense=DENSE, sparse=SPARSE)
+
+    dense_norm = (DENSE - DENSE.min()) / (DENSE.max() - DENSE.min())
+    sparse_docs, sparse_scores = SPARSE
+    sparse_norm = dict(zip(sparse_docs.tolist(), (sparse_scores - sparse_scores.min()) / (sparse_scores.max() - sparse_scores.min())))
+    expected = {doc: 0.25 * dense_norm[doc] + 0.75 * sparse_norm.get(doc, 0.0) for doc in range(len(TEXTS))}
+    assert [record.index for record in records] == sorted(expected, key=lambda doc: -expected[doc])[:3]
+    assert [record.score for record in records] == pytest.approx(sorted(expected.values(), reverse=True)[:3])
+
+
+def test_min_dense_score_keeps_keyword_candidates():
+    """min_dense_score 이하의 밀집 후보는 빼고 키워드 후보는 남김"""
+    retriever = HybridRetriever(_store(), fusion='rrf')
+    records = retriever.search(k=len(TEXTS), dense=DENSE, sparse=SPARSE, min_dense_score=0.6)
+    by_doc = {record.index: record for record in records}
+    assert set(by_doc) == {0, 2, 1, 3, 4}
+    assert by_doc[3].dense_rank is None and by_doc[3].sparse_rank == 1
+    assert by_doc[0].sparse_rank is None and by_doc[0].dense_rank == 1
+
+
+def test_mask_limits_candidates():
+    """mask로 허용한 청크만 후보"""
+    mask = np.array([False, True, True, False, True, True])
+    records = HybridRetriever(_store()).search(k=len(TEXTS), dense=DENSE, sparse=SPARSE, mask=mask)
+    assert {record.index for record in records} == {1, 2, 4, 5}
+
+
+def test_article_scores_take_max_over_each_articles_queries(monkeypatch):
+    """조문별 점수가 그 조문 쿼리들의 청크별 최고 점수 (쿼리 없는 조문은 -inf, 중복 쿼리는 한 번만 임베딩)"""
+    store = _store()
+    rng = np.random.default_rng(1)
+    vectors = {}
+
+    def fake_encode(model, queries):
+        for query in queries:
+            vectors.setdefault(query, rng.normal(size=store.dimension).astype(np.float32))
+        return np.stack([vectors[query] for query in queries])
+
+    monkeypatch.setattr(retrieval, 'encode_queries', fake_encode)
+    article_queries = [["위법", "권한"], [], ["권한"], ["사무", "위법", "조례"]]
+    batch = ArticleQueryBatch(None, article_queries)
+    assert batch.unique_queries == ["위법", "권한", "사무", "조례"]
+
+    scores = batch.article_scores(store)
+    assert scores.shape == (len(article_queries), len(store))
+    for a, queries in enumerate(article_queries):
+        if not queries:
+            assert np.all(np.isneginf(scores[a]))
+            continue
+        expected = store.scores(np.stack([vectors[q] for q in queries])).max(axis=0)
+        assert np.allclose(scores[a], expected)
+
+    results = batch.search(store, k=2)
+    assert results[1] == []
+    for a in (0, 2, 3):
+        assert [record.index for record in results[a]] == np.argsort(-scores[a], kind='stable')[:2].tolist()
@@ -0,0 +1,69 @@
+"""
+벡터 색인 백엔드 재현율 테스트
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+from vector_index import ExactIndex, build_vector_index
+from vector_store import VectorStore
+
+K = 10
+
+# 백엔드 -> (선택 의존성, 색인 파라미터, 전수 내적 대비 최소 recall@K)
+BACKENDS = {
+    'hnsw': ('hnswlib', {}, 0.95),
+    'faiss_flat': ('faiss', {}, 1.0),
+    'faiss_ivfpq': ('faiss', {}, 0.95),
+    'pca': (None, {'dims': 16}, 0.9),
+}
+
+
+def _unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def clustered():
+    """군집 구조가 있는 정규화 임베딩 저장소와 저장소 근처의 쿼리"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    embeddings = _unit(centers[rng.integers(0, len(centers), 3000)] + 0.5 * rng.normal(size=(3000, 32)))
+    queries = _unit(embeddings[rng.choice(len(embeddings), 30, replace=False)] + 0.3 * rng.normal(size=(30, 32)))
+    store = VectorStore.from_columns(embeddings, [f"청크 {i}" for i in range(len(embeddings))])
+    return store, queries
+
+
+def _recall(expected_ids, ids):
+    return float(np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(expected_ids.tolist(), ids.tolist())]))
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_recall_against_exact(backend, clustered):
+    """근사 색인의 상위 K개가 전수 내적 상위 K개를 충분히 포함하고 점수는 원본 내적과 같음"""
+    module, params, min_recall = BACKENDS[backend]
+    if module:
+        pytest.importorskip(module)
+    store, queries = clustered
+    index = build_vector_index(store, backend, **params)
+    assert index.backend == backend
+
+    exact_ids, _ = ExactIndex.build(store).search(queries, K)
+    ids, scores = index.search(queries, K)
+    assert ids.shape == (len(queries), K)
+    assert _recall(exact_ids, ids) >= min_recall
+    assert np.allclose(scores, np.einsum('qd,qkd->qk', queries, store.embeddings[ids]), atol=1e-4)
+
+    # 여러 쿼리의 최고 점수 기준 검색도 전수 내적과 비교
+    exact_max, _ = ExactIndex.build(store).search_max(queries[:3], K)
+    max_ids, _ = index.search_max(queries[:3], K)
+    assert _recall(exact_max[None], max_ids[None]) >= min_recall
+
+
+def test_missing_optional_dependency_falls_back_to_exact(clustered, monkeypatch):
+    """선택 의존성이 없으면 작은 저장소는 전수 내적 색인으로 대체"""
+    monkeypatch.setitem(sys.modules, 'hnswlib', None)
+    store, _ = clustered
+    assert isinstance(build_vector_index(store, 'hnsw'), ExactIndex)
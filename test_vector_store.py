@@ -0,0 +1,52 @@
+"""
+벡터스토어 레지스트리 테스트
+"""
+
+import os
+import pickle
+import numpy as np
+
+from vector_store import (VectorStore, VectorStoreRegistry, _load_and_cache, load_vectorstore,
+                          store_dir_for, is_store_dir)
+
+
+def _write_pickle(path, count=8, dimension=16):
+    rng = np.random.default_rng(0)
+    data = {
+        'chunks': [{'text': f"조례 제{i}조 위법 판례", 'source': 'test.pdf', 'page': i} for i in range(count)],
+        'embeddings': rng.normal(size=(count, dimension)).astype(np.float32),
+        'model_name': 'paraphrase-multilingual-MiniLM-L12-v2',
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(data, f)
+
+
+def test_registry_returns_same_store_after_auto_convert(tmp_path):
+    """새 PKL을 처음 조회해 컬럼형 저장소로 변환한 뒤에도 같은 객체를 반환"""
+    pkl_path = str(tmp_path / 'sample_vectorstore.pkl')
+    _write_pickle(pkl_path)
+    registry = VectorStoreRegistry(loader=_load_and_cache)
+
+    first = registry.get(pkl_path)
+    assert is_store_dir(store_dir_for(pkl_path))
+    second = registry.get(pkl_path)
+
+    assert first is second
+    assert registry.stats()['misses'] == 1
+    assert registry.stats()['hits'] == 1
+
+
+def test_store_dir_stale_when_pickle_replaced_with_older_mtime(tmp_path):
+    """변환 후 더 오래된 수정시각의 PKL로 교체되면 컬럼형 저장소를 다시 만듦"""
+    pkl_path = str(tmp_path / 'sample_vectorstore.pkl')
+    _write_pickle(pkl_path, count=8)
+    assert len(load_vectorstore(pkl_path, auto_convert=True)) == 8
+
+    stat = os.stat(pkl_path)
+    _write_pickle(pkl_path, count=5)
+    os.utime(pkl_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    assert len(load_vectorstore(pkl_path)) == 5
+    assert len(load_vectorstore(pkl_path, auto_convert=True)) == 5
+    assert len(VectorStore.open(store_dir_for(pkl_path))) == 5
+
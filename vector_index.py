@@ -0,0 +1,547 @@
+"""
+밀집 벡터 색인 모듈
+VectorIndex 인터페이스 뒤에 전수 내적(exact), HNSW 그래프(hnsw, hnswlib),
+FAISS 평면 내적(faiss_flat)과 IVF-PQ 압축 색인(faiss_ivfpq, faiss-cpu), PCA 축소 2단계 검색(pca) 백엔드를 둡니다.
+생성 스크립트가 저장소 매니페스트의 vector_index_backend(없으면 저장소 크기)로 백엔드를 골라
+컬럼형 저장소 디렉터리에 함께 저장하고(vector_index.json), 검색 시 vector_index_for(store)가 저장된 색인을 엽니다.
+색인이 없거나 열 수 없으면 전수 내적으로 대체합니다.
+
+사용법:
+    python vector_index.py <PKL 또는 .vstore> [...] [--backend hnsw] [--M 16] [--ef-construction 200] [--ef 64]
+    python vector_index.py <PKL 또는 .vstore> [...] --backend faiss_ivfpq [--nlist 4096] [--pq-m 48] [--nprobe 16]
+    python vector_index.py <PKL 또는 .vstore> [...] --backend pca [--dims 96] [--candidates 256]
+"""
+
+import os
+import sys
+import json
+import math
+import argparse
+import threading
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from vector_store import VectorStore, SCORE_BLOCK_ROWS, load_vectorstore
+
+INDEX_VERSION = 1
+VECTOR_INDEX_FILE = 'vector_index.json'
+HNSW_INDEX_FILE = 'hnsw_index.bin'
+
+VECTOR_INDEX_ENV = 'ORDINANCE_VECTOR_INDEX'  # 백엔드 이름을 지정하면 저장된 기본 색인 대신 사용
+HNSW_EF_ENV = 'ORDINANCE_HNSW_EF'
+FAISS_NPROBE_ENV = 'ORDINANCE_FAISS_NPROBE'
+FAISS_INDEX_FILE = 'faiss_index.bin'
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF = 64
+HNSW_MIN_CHUNKS = 20000  # 이보다 작은 저장소는 전수 내적이 더 빠르고 정확함
+
+IVFPQ_M = 48  # 부분 양자화기 수 (차원의 약수로 조정, 384차원이면 8차원씩)
+IVFPQ_NBITS = 8
+IVFPQ_NPROBE = 16
+IVFPQ_REFINE = 16  # PQ 근사 점수로 k * refine개를 뽑아 원본 임베딩으로 재계산
+IVFPQ_TRAIN_SAMPLE = 100000
+IVFPQ_MIN_CHUNKS = 1000000  # 임베딩 행렬이 작업자 메모리를 넘기 시작하는 규모
+
+PCA_PROJECTION_FILE = 'pca_projection.npy'
+PCA_EMBEDDINGS_FILE = 'pca_embeddings.npy'
+PCA_DIMS = 64
+PCA_CANDIDATES = 256  # 원본 임베딩으로 다시 계산할 1단계 후보 수
+PCA_TRAIN_SAMPLE = 100000
+
+
+def merge_max(ids: np.ndarray, scores: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """여러 쿼리의 (청크 번호, 점수) 결과를 청크별 최고 점수로 합쳐 상위 limit개 (내림차순)"""
+    ids, scores = np.ravel(ids), np.ravel(scores)
+    valid = ids >= 0
+    ids, scores = ids[valid], scores[valid]
+    order = np.argsort(-scores, kind='stable')
+    ids, scores = ids[order], scores[order]
+    _, first = np.unique(ids, return_index=True)  # 점수순 첫 등장이 청크별 최고 점수
+    first = np.sort(first)[:limit]
+    return ids[first].astype(np.int64), scores[first].astype(np.float32)
+
+
+class VectorIndex:
+    """밀집 검색 색인 인터페이스 (정규화 임베딩 내적 기준)"""
+
+    backend = ''
+    exact = False
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(chunks={len(self)}, {self.params()})"
+
+    def params(self) -> Dict[str, Any]:
+        """매니페스트에 기록할 색인 파라미터"""
+        return {}
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """쿼리별 상위 k개 (청크 번호 (Q, k), 점수 (Q, k)) - 결과가 모자란 칸의 번호는 -1"""
+        raise NotImplementedError
+
+    def search_max(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """여러 쿼리 중 청크별 최고 점수 기준 상위 k개 (청크 번호, 점수)"""
+        ids, scores = self.search(queries, k)
+        return merge_max(ids, scores, k)
+
+    def save(self, store_dir: str) -> None:
+        """색인 매니페스트 작성 (백엔드 파일을 먼저 쓰고 매니페스트를 마지막에 써서 완료 표시)"""
+        with open(os.path.join(store_dir, VECTOR_INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'index_version': INDEX_VERSION,
+                'backend': self.backend,
+                'count': len(self),
+                'dimension': self.store.dimension,
+                **self.params(),
+            }, f, ensure_ascii=False, indent=2)
+
+
+class ExactIndex(VectorIndex):
+    """전수 내적 (저장소 행렬곱, 기존 동작)"""
+
+    backend = 'exact'
+    exact = True
+
+    @classmethod
+    def build(cls, store: VectorStore, **params) -> 'ExactIndex':
+        return cls(store)
+
+    @classmethod
+    def open(cls, store: VectorStore, manifest: Dict[str, Any]) -> 'ExactIndex':
+        return cls(store)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.store.scores(queries)
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0), dtype=np.float32)
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+        ids = np.take_along_axis(part, order, axis=1)
+        return ids.astype(np.int64), np.take_along_axis(scores, ids, axis=1)
+
+    def search_max(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # 쿼리별 top-k를 합치지 않고 (Q, N) 최댓값에서 바로 선택
+        scores = self.store.scores(queries).max(axis=0)
+        ids = np.arange(len(scores))
+        if len(ids) > k:
+            ids = np.argpartition(-scores, k - 1)[:k]
+        ids = ids[np.argsort(-scores[ids], kind='stable')]
+        return ids.astype(np.int64), scores[ids].astype(np.float32)
+
+
+class HNSWIndex(VectorIndex):
+    """hnswlib HNSW 그래프 (내적 공간, M/ef_construction은 생성 시, ef는 검색 시 조정)"""
+
+    backend = 'hnsw'
+
+    def __init__(self, store: VectorStore, graph, M: int = HNSW_M,
+                 ef_construction: int = HNSW_EF_CONSTRUCTION, ef: int = HNSW_EF):
+        super().__init__(store)
+        self.graph = graph
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._lock = threading.Lock()  # set_ef와 검색을 함께 보호
+
+    def params(self) -> Dict[str, Any]:
+        return {'M': self.M, 'ef_construction': self.ef_construction, 'ef': self.ef}
+
+    @classmethod
+    def build(cls, store: VectorStore, M: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION,
+              ef: int = HNSW_EF, **params) -> 'HNSWIndex':
+        """저장소 임베딩으로 그래프 생성 (양자화 저장소는 블록 단위로 복원하며 추가, 다른 백엔드 파라미터는 무시)"""
+        import hnswlib  # 선택 의존성
+        graph = hnswlib.Index(space='ip', dim=store.dimension)
+        graph.init_index(max_elements=max(len(store), 1), M=M, ef_construction=ef_construction, random_seed=0)
+        for start in range(0, len(store), SCORE_BLOCK_ROWS):
+            block = store.dense_embeddings(start, start + SCORE_BLOCK_ROWS)
+            graph.add_items(block, np.arange(start, start + len(block)))
+        return cls(store, graph, M, ef_construction, ef)
+
+    @classmethod
+    def open(cls, store: VectorStore, manifest: Dict[str, Any]) -> 'HNSWIndex':
+        import hnswlib  # 선택 의존성
+        graph = hnswlib.Index(space='ip', dim=store.dimension)
+        graph.load_index(os.path.join(store.store_dir, HNSW_INDEX_FILE), max_elements=max(len(store), 1))
+        ef = int(os.environ.get(HNSW_EF_ENV) or manifest.get('ef', HNSW_EF))
+        return cls(store, graph, manifest.get('M', HNSW_M), manifest.get('ef_construction', HNSW_EF_CONSTRUCTION), ef)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        with self._lock:
+            # ef가 k보다 작으면 k개를 채우지 못하므로 검색 시에만 올림
+            self.graph.set_ef(max(self.ef, k))
+            labels, distances = self.graph.knn_query(queries, k=k)
+        # 'ip' 공간의 거리는 1 - 내적
+        return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+    def save(self, store_dir: str) -> None:
+        self.graph.save_index(os.path.join(store_dir, HNSW_INDEX_FILE))
+        super().save(store_dir)
+
+
+def rescore(store: VectorStore, queries: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """쿼리별 후보 (Q, C)를 원본 임베딩 점수로 다시 계산해 상위 k개 (번호 -1은 빈 칸)"""
+    candidates = np.unique(ids[ids >= 0])
+    exact = store.row_scores(queries, candidates)
+    scores = np.take_along_axis(exact, np.searchsorted(candidates, np.maximum(ids, 0)), axis=1)
+    scores[ids < 0] = -np.inf
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    ids = np.take_along_axis(ids, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    ids[~np.isfinite(scores)] = -1
+    return ids.astype(np.int64), scores.astype(np.float32)
+
+
+def _add_in_blocks(index, store: VectorStore) -> None:
+    """저장소 임베딩을 블록 단위로 복원하며 FAISS 색인에 추가 (청크 번호 순서 유지)"""
+    for start in range(0, len(store), SCORE_BLOCK_ROWS):
+        index.add(np.ascontiguousarray(store.dense_embeddings(start, start + SCORE_BLOCK_ROWS)))
+
+
+def _read_faiss_index(path: str):
+    """FAISS 색인을 mmap으로 읽기 (지원하지 않는 형식이면 메모리로 읽음)"""
+    import faiss  # 선택 의존성
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+class FaissFlatIndex(VectorIndex):
+    """faiss IndexFlatIP (전수 내적과 같은 결과, 파일은 mmap으로 열기)"""
+
+    backend = 'faiss_flat'
+
+    def __init__(self, store: VectorStore, index):
+        super().__init__(store)
+        self.index = index
+
+    @classmethod
+    def build(cls, store: VectorStore, **params) -> 'FaissFlatIndex':
+        import faiss  # 선택 의존성
+        index = faiss.IndexFlatIP(store.dimension)
+        _add_in_blocks(index, store)
+        return cls(store, index)
+
+    @classmethod
+    def open(cls, store: VectorStore, manifest: Dict[str, Any]) -> 'FaissFlatIndex':
+        return cls(store, _read_faiss_index(os.path.join(store.store_dir, FAISS_INDEX_FILE)))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        scores, ids = self.index.search(queries, k)
+        return ids.astype(np.int64), scores.astype(np.float32)
+
+    def save(self, store_dir: str) -> None:
+        import faiss  # 선택 의존성
+        faiss.write_index(self.index, os.path.join(store_dir, FAISS_INDEX_FILE))
+        super().save(store_dir)
+
+
+class FaissIVFPQIndex(FaissFlatIndex):
+    """faiss IndexIVFPQ (역파일 nlist개 + 부분 양자화 코드, 검색은 nprobe개 목록만 탐색)
+
+    청크당 pq_m * nbits / 8바이트만 메모리에 두고, 상위 k * refine개 후보는 mmap 임베딩에서 정확히 재계산합니다.
+    """
+
+    backend = 'faiss_ivfpq'
+
+    def __init__(self, store: VectorStore, index, nlist: int, pq_m: int, nbits: int = IVFPQ_NBITS,
+                 nprobe: int = IVFPQ_NPROBE, refine: int = IVFPQ_REFINE):
+        super().__init__(store, index)
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nbits = nbits
+        self.nprobe = nprobe
+        self.refine = refine
+
+    def params(self) -> Dict[str, Any]:
+        return {'nlist': self.nlist, 'pq_m': self.pq_m, 'nbits': self.nbits,
+                'nprobe': self.nprobe, 'refine': self.refine}
+
+    @classmethod
+    def build(cls, store: VectorStore, nlist: Optional[int] = None, pq_m: int = IVFPQ_M,
+              nbits: int = IVFPQ_NBITS, nprobe: int = IVFPQ_NPROBE, refine: int = IVFPQ_REFINE,
+              train_sample: int = IVFPQ_TRAIN_SAMPLE, **params) -> 'FaissIVFPQIndex':
+        """기존 임베딩 표본으로 역파일/PQ 양자화기를 학습한 뒤 블록 단위로 추가 (다른 백엔드 파라미터는 무시)"""
+        import faiss  # 선택 의존성
+        count, dimension = len(store), store.dimension
+        # k-means는 중심점당 39개 이상의 학습 표본이 필요하므로 작은 저장소에서는 nlist/nbits를 줄임
+        sample_size = min(count, train_sample)
+        nlist = max(1, min(nlist or int(4 * math.sqrt(count)), sample_size // 39))
+        nbits = max(4, min(nbits, int(math.log2(max(sample_size // 39, 16)))))
+        pq_m = math.gcd(dimension, pq_m)
+
+        sample = _train_sample(store, sample_size)
+
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+        index.train(np.ascontiguousarray(sample))
+        _add_in_blocks(index, store)
+        return cls(store, index, nlist, pq_m, nbits, nprobe, refine)
+
+    @classmethod
+    def open(cls, store: VectorStore, manifest: Dict[str, Any]) -> 'FaissIVFPQIndex':
+        index = _read_faiss_index(os.path.join(store.store_dir, FAISS_INDEX_FILE))
+        nprobe = int(os.environ.get(FAISS_NPROBE_ENV) or manifest.get('nprobe', IVFPQ_NPROBE))
+        return cls(store, index, manifest['nlist'], manifest['pq_m'], manifest.get('nbits', IVFPQ_NBITS),
+                   nprobe, manifest.get('refine', IVFPQ_REFINE))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        import faiss  # 선택 의존성
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        # nprobe는 호출별 파라미터로 넘겨 스레드 간 공유 상태를 바꾸지 않음
+        params = faiss.SearchParametersIVF(nprobe=self.nprobe)
+        pq_scores, ids = self.index.search(queries, k * max(self.refine, 1), params=params)
+        if self.refine <= 1:
+            return ids[:, :k].astype(np.int64), pq_scores[:, :k].astype(np.float32)
+
+        return rescore(self.store, queries, ids, k)
+
+
+def _train_sample(store: VectorStore, size: int) -> np.ndarray:
+    """양자화기/투영 학습용 무작위 행 표본 (float32로 복원)"""
+    rows = np.sort(np.random.default_rng(0).choice(len(store), size=min(len(store), size), replace=False))
+    sample = np.asarray(store.embeddings[rows], dtype=np.float32)
+    return sample * store.scales if store.scales is not None else sample
+
+
+class PCAIndex(VectorIndex):
+    """PCA 축소 임베딩 2단계 검색
+
+    1단계는 (N, dims) 축소 행렬과 내적해 상위 candidates개를 고르고(캐시에 들어가는 크기),
+    2단계는 후보만 원본 임베딩으로 다시 계산합니다. 투영은 중심화하지 않은 주성분이라 내적을 보존합니다.
+    """
+
+    backend = 'pca'
+
+    def __init__(self, store: VectorStore, projection: np.ndarray, reduced: np.ndarray,
+                 candidates: int = PCA_CANDIDATES):
+        super().__init__(store)
+        self.projection = projection
+        self.reduced = reduced
+        self.candidates = candidates
+
+    def params(self) -> Dict[str, Any]:
+        return {'dims': int(self.projection.shape[1]), 'candidates': self.candidates}
+
+    @classmethod
+    def build(cls, store: VectorStore, dims: int = PCA_DIMS, candidates: int = PCA_CANDIDATES,
+              train_sample: int = PCA_TRAIN_SAMPLE, **params) -> 'PCAIndex':
+        """표본의 주성분으로 투영 행렬을 만들고 저장소 임베딩을 블록 단위로 축소 (다른 백엔드 파라미터는 무시)"""
+        dims = min(dims, store.dimension)
+        _, _, vt = np.linalg.svd(_train_sample(store, train_sample), full_matrices=False)
+        projection = np.ascontiguousarray(vt[:dims].T, dtype=np.float32)
+        reduced = np.empty((len(store), dims), dtype=np.float32)
+        for start in range(0, len(store), SCORE_BLOCK_ROWS):
+            block = store.dense_embeddings(start, start + SCORE_BLOCK_ROWS)
+            reduced[start:start + len(block)] = block @ projection
+        return cls(store, projection, reduced, candidates)
+
+    @classmethod
+    def open(cls, store: VectorStore, manifest: Dict[str, Any]) -> 'PCAIndex':
+        return cls(store, np.load(os.path.join(store.store_dir, PCA_PROJECTION_FILE)),
+                   np.load(os.path.join(store.store_dir, PCA_EMBEDDINGS_FILE), mmap_mode='r'),
+                   int(manifest.get('candidates', PCA_CANDIDATES)))
+
+    def _first_stage(self, queries: np.ndarray) -> np.ndarray:
+        return (queries @ self.projection) @ self.reduced.T
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        limit = min(max(k, self.candidates), len(self))
+        if limit == 0 or len(queries) == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        ids = np.argpartition(-self._first_stage(queries), limit - 1, axis=1)[:, :limit]
+        return rescore(self.store, queries, ids, min(k, limit))
+
+    def search_max(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # 쿼리별 최고 축소 점수로 후보를 한 번에 고른 뒤 원본 점수의 쿼리 최댓값으로 재정렬
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        limit = min(max(k, self.candidates), len(self))
+        if limit == 0 or len(queries) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        approx = self._first_stage(queries).max(axis=0)
+        ids = np.argpartition(-approx, limit - 1)[:limit]
+        scores = self.store.row_scores(queries, ids).max(axis=0)
+        order = np.argsort(-scores, kind='stable')[:k]
+        return ids[order].astype(np.int64), scores[order].astype(np.float32)
+
+    def save_arrays(self, store_dir: str) -> None:
+        """투영/축소 행렬만 저장 (다른 기본 색인과 함께 두는 2단계 검색 옵션용)"""
+        np.save(os.path.join(store_dir, PCA_PROJECTION_FILE), self.projection)
+        np.save(os.path.join(store_dir, PCA_EMBEDDINGS_FILE), self.reduced)
+
+    def save(self, store_dir: str) -> None:
+        self.save_arrays(store_dir)
+        super().save(store_dir)
+
+
+INDEX_BACKENDS = {cls.backend: cls for cls in (ExactIndex, HNSWIndex, FaissFlatIndex, FaissIVFPQIndex, PCAIndex)}
+
+
+def default_backend(store: VectorStore) -> str:
+    """저장소 매니페스트의 vector_index_backend, 없으면 저장소 크기로 정한 백엔드"""
+    if store.meta.get('vector_index_backend'):
+        return store.meta['vector_index_backend']
+    if len(store) >= IVFPQ_MIN_CHUNKS:
+        return 'faiss_ivfpq'
+    return 'hnsw' if len(store) >= HNSW_MIN_CHUNKS else 'exact'
+
+
+def build_vector_index(store: VectorStore, backend: Optional[str] = None, **params) -> VectorIndex:
+    """백엔드 색인 생성 (backend가 없으면 default_backend, 선택 의존성이 없으면 PCA 또는 전수 내적)"""
+    backend = backend or default_backend(store)
+    # 매니페스트에 기록된 색인 파라미터는 매니페스트의 백엔드에만 기본값으로 사용
+    if backend == store.meta.get('vector_index_backend'):
+        params = {**store.meta.get('vector_index_params', {}), **params}
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"지원하지 않는 색인 백엔드: {backend} (가능: {', '.join(INDEX_BACKENDS)})")
+    try:
+        return INDEX_BACKENDS[backend].build(store, **params)
+    except ImportError as e:
+        # 선택 의존성 없이 쓸 수 있는 대안: 대형 저장소는 PCA 2단계 검색
+        fallback = 'pca' if len(store) >= HNSW_MIN_CHUNKS else 'exact'
+        print(f"[WARNING] {backend} 색인 사용 불가, {fallback}로 대체: {e}")
+        return INDEX_BACKENDS[fallback].build(store)
+
+
+def save_vector_index(store_dir: str, backend: Optional[str] = None, **params) -> VectorIndex:
+    """저장소 디렉터리의 색인을 생성해 함께 저장 (생성 스크립트용)"""
+    store = VectorStore.open(store_dir)
+    index = build_vector_index(store, backend, **params)
+    index.save(store_dir)
+    print(f"[INFO] 벡터 색인 저장: {index}")
+
+    if index.backend != 'pca' and len(store) >= HNSW_MIN_CHUNKS:
+        # 대형 저장소는 2단계 검색 옵션(backend='pca')용 축소 행렬도 함께 저장
+        PCAIndex.build(store).save_arrays(store_dir)
+        print(f"[INFO] PCA {PCA_DIMS}차원 축소 행렬 저장")
+    return index
+
+
+def read_index_manifest(store_dir: str) -> Dict[str, Any]:
+    """저장된 색인 매니페스트 (없으면 빈 dict)"""
+    manifest_path = os.path.join(store_dir, VECTOR_INDEX_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def rebuild_saved_index(old_dir: str, new_dir: str) -> Optional[VectorIndex]:
+    """old_dir에 저장돼 있던 색인을 같은 백엔드/파라미터로 new_dir 저장소에 다시 생성 (저장소 재저장용)"""
+    manifest = read_index_manifest(old_dir)
+    backend = manifest.get('backend')
+    if backend not in INDEX_BACKENDS:
+        return None
+    params = {key: value for key, value in manifest.items()
+              if key not in ('index_version', 'backend', 'count', 'dimension')}
+    try:
+        return save_vector_index(new_dir, backend, **params)
+    except Exception as e:
+        print(f"[WARNING] 기존 {backend} 색인 재생성 실패, 새 저장소는 전수 내적으로 검색합니다: {e}")
+        return None
+
+
+def _open_saved_pca(store: VectorStore) -> Optional[PCAIndex]:
+    """기본 색인과 별도로 저장된 PCA 축소 행렬 열기 (없거나 청크 수가 다르면 None)"""
+    if not os.path.exists(os.path.join(store.store_dir, PCA_EMBEDDINGS_FILE)):
+        return None
+    index = PCAIndex.open(store, {})
+    return index if len(index.reduced) == len(store) else None
+
+
+def open_vector_index(store: VectorStore, backend: Optional[str] = None) -> Optional[VectorIndex]:
+    """저장된 색인 열기 (없거나 버전/청크 수/차원이 다르거나 backend와 다르면 None, pca는 별도 저장분도 사용)"""
+    store_dir = store.store_dir
+    if not store_dir:
+        return None
+    manifest = read_index_manifest(store_dir)
+    if backend and manifest.get('backend') != backend:
+        return _open_saved_pca(store) if backend == 'pca' else None
+    if manifest.get('index_version') != INDEX_VERSION:
+        return None
+    if manifest.get('count') != len(store) or manifest.get('dimension') != store.dimension:
+        print(f"[WARNING] 벡터 색인이 저장소와 맞지 않아 무시합니다: {store_dir}")
+        return None
+    backend = INDEX_BACKENDS.get(manifest.get('backend'))
+    if backend is None:
+        print(f"[WARNING] 알 수 없는 색인 백엔드, 무시: {manifest.get('backend')}")
+        return None
+    return backend.open(store, manifest)
+
+
+def vector_index_for(store: VectorStore, backend: Optional[str] = None) -> VectorIndex:
+    """저장소의 밀집 검색 색인
+
+    backend(또는 ORDINANCE_VECTOR_INDEX)를 지정하면 그 백엔드를, 아니면 저장된 기본 색인을 사용합니다.
+    지정한 백엔드가 저장되어 있지 않으면 메모리에서 만들고, 열거나 만들 수 없으면 전수 내적으로 대체합니다.
+    """
+    key = backend or os.environ.get(VECTOR_INDEX_ENV) or ''
+    indexes = getattr(store, '_vector_indexes', None)
+    if indexes is None:
+        indexes = store._vector_indexes = {}
+    if key in indexes:
+        return indexes[key]
+
+    index = None
+    if key != 'exact':
+        try:
+            index = open_vector_index(store, key or None)
+            if index is None and key:
+                print(f"[INFO] 저장된 {key} 색인이 없어 메모리에서 생성합니다 ({len(store)}개 청크)")
+                index = build_vector_index(store, key)
+        except ImportError as e:
+            print(f"[WARNING] 벡터 색인 백엔드 사용 불가, exact로 대체: {e}")
+        except Exception as e:
+            print(f"[WARNING] 벡터 색인 열기 실패, exact로 대체: {e}")
+
+    index = index or ExactIndex(store)
+    indexes[key] = index
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="저장소 밀집 검색 색인 생성")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--backend', choices=list(INDEX_BACKENDS), help="지정하지 않으면 매니페스트 또는 저장소 크기로 결정")
+    parser.add_argument('--M', type=int, help=f"HNSW 연결 수 (기본 {HNSW_M})")
+    parser.add_argument('--ef-construction', type=int, help=f"HNSW 생성 탐색 폭 (기본 {HNSW_EF_CONSTRUCTION})")
+    parser.add_argument('--ef', type=int, help=f"HNSW 검색 탐색 폭 (기본 {HNSW_EF})")
+    parser.add_argument('--nlist', type=int, help="IVF 역파일 수 (기본 4 * sqrt(N))")
+    parser.add_argument('--pq-m', type=int, help=f"PQ 부분 양자화기 수 (기본 {IVFPQ_M})")
+    parser.add_argument('--nprobe', type=int, help=f"IVF 검색 목록 수 (기본 {IVFPQ_NPROBE})")
+    parser.add_argument('--refine', type=int, help=f"PQ 후보 재계산 배수 (기본 {IVFPQ_REFINE})")
+    parser.add_argument('--dims', type=int, help=f"PCA 축소 차원 (기본 {PCA_DIMS})")
+    parser.add_argument('--candidates', type=int, help=f"PCA 1단계 후보 수 (기본 {PCA_CANDIDATES})")
+    args = parser.parse_args()
+
+    # 지정한 파라미터만 백엔드에 전달
+    params = {name: getattr(args, name) for name in ('M', 'ef_construction', 'ef', 'nlist', 'pq_m', 'nprobe', 'refine',
+                                                     'dims', 'candidates')
+              if getattr(args, name) is not None}
+    for path in args.paths:
+        store_dir = load_vectorstore(path, auto_convert=True).store_dir
+        if not store_dir:
+            print(f"❌ 컬럼형 저장소 디렉터리가 없습니다: {path}")
+            sys.exit(1)
+        save_vector_index(store_dir, args.backend, **params)
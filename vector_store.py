@@ -0,0 +1,913 @@
+"""
+컬럼형 벡터스토어 저장 포맷
+PKL 전체를 역직렬화하지 않고 필요한 페이지만 읽도록 디렉터리 기반 포맷을 제공합니다.
+- embeddings.npy: 임베딩 행렬 (기본 float32, 선택적으로 float16/int8 양자화, mmap_mode='r'로 열기)
+  int8은 크기가 1/4이지만 순위가 바뀌므로(배포 저장소 same_ranking@10 약 0.7) check_quantization.py로 확인 후 선택
+- texts.bin / text_offsets.npy: UTF-8 텍스트 블롭과 오프셋 색인
+- manifest.json: 모델명, 차원, 소스 목록 등 메타 정보
+"""
+
+import os
+import json
+import pickle
+import uuid
+import shutil
+import tempfile
+import threading
+import numpy as np
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Tuple
+
+FORMAT_VERSION = 1
+STORE_DIR_SUFFIX = '.vstore'
+
+MANIFEST_FILE = 'manifest.json'
+EMBEDDINGS_FILE = 'embeddings.npy'
+TEXTS_FILE = 'texts.bin'
+OFFSETS_FILE = 'text_offsets.npy'
+SOURCE_IDS_FILE = 'source_ids.npy'
+PAGES_FILE = 'pages.npy'
+SCALES_FILE = 'embedding_scales.npy'
+SOURCE_PICKLE_KEY = 'source_pickle'  # 매니페스트에 기록하는 변환 원본 PKL의 크기/수정시각
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+SCORE_BLOCK_ROWS = 8192  # 양자화 행렬을 복원하며 내적할 때의 블록 크기
+DENSE_VIEW_MAX_BYTES = 64 * 1024 * 1024  # 이보다 작은 양자화 저장소는 float32 사본을 한 번 만들어 재사용
+
+DEFAULT_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+# 매니페스트로 옮기지 않는 대용량 키
+_BULK_KEYS = {'embeddings', 'chunks', 'documents', 'texts', 'metadatas'}
+
+
+class TextBlob(Sequence):
+    """UTF-8 블롭 + 오프셋 배열로 표현한 텍스트 목록 (접근 시에만 디코딩)"""
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> 'TextBlob':
+        encoded = [text.encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+    def nbytes(self) -> int:
+        return int(self.blob.nbytes + self.offsets.nbytes)
+
+
+class ChunkRecord:
+    """검색 결과 한 건: 텍스트와 소스는 접근할 때만 저장소에서 읽음"""
+
+    __slots__ = ('store', 'index', 'score')
+
+    def __init__(self, store: 'VectorStore', index: int, score: float = 0.0):
+        self.store = store
+        self.index = int(index)
+        self.score = float(score)
+
+    def __repr__(self) -> str:
+        return f"ChunkRecord(index={self.index}, score={self.score:.4f})"
+
+    @property
+    def text(self) -> str:
+        return self.store.texts[self.index]
+
+    @property
+    def source(self) -> str:
+        return self.store.source(self.index)
+
+    @property
+    def page(self) -> int:
+        return int(self.store.pages[self.index])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'chunk_id': self.index,
+            'text': self.text,
+            'source': self.source,
+            'page': self.page,
+            'similarity': self.score
+        }
+
+
+def store_dir_for(pkl_path: str) -> str:
+    """PKL 경로에 대응하는 컬럼형 저장소 디렉터리 경로"""
+    base, ext = os.path.splitext(pkl_path)
+    return base + STORE_DIR_SUFFIX if ext.lower() == '.pkl' else pkl_path + STORE_DIR_SUFFIX
+
+
+def pickle_signature(pkl_path: str) -> Dict[str, int]:
+    """PKL 파일의 크기와 수정시각(ns) - 컬럼형 저장소가 어떤 PKL에서 변환됐는지 식별"""
+    stat = os.stat(pkl_path)
+    return {'size': int(stat.st_size), 'mtime_ns': int(stat.st_mtime_ns)}
+
+
+def is_store_dir(path: str) -> bool:
+    """컬럼형 저장소 디렉터리인지 확인"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (제자리 연산, 영벡터는 그대로 둠)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def quantize_embeddings(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """임베딩 양자화: float16은 단순 변환, int8은 차원별 스케일(최대 절댓값/127) 사용"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == 'float32':
+        return np.ascontiguousarray(embeddings), None
+    if dtype == 'float16':
+        return embeddings.astype(np.float16), None
+    if dtype == 'int8':
+        scales = np.abs(embeddings).max(axis=0) / 127.0 if len(embeddings) else np.ones(embeddings.shape[1])
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        quantized = np.clip(np.rint(embeddings / scales), -127, 127).astype(np.int8)
+        return quantized, scales
+    raise ValueError(f"지원하지 않는 임베딩 타입: {dtype} ({', '.join(EMBEDDING_DTYPES)})")
+
+
+def _chunk_text(chunk: Any) -> str:
+    if isinstance(chunk, dict):
+        return chunk.get('text', chunk.get('content', '')) or ''
+    return str(chunk)
+
+
+def _chunk_columns(item: Any, meta: Dict[str, Any]) -> Tuple[str, str, int]:
+    """PKL 청크 항목과 메타데이터에서 (텍스트, 소스 이름, 페이지) 추출"""
+    chunk = item if isinstance(item, dict) else {}
+    source = chunk.get('source') or meta.get('source') or chunk.get('title') or ''
+    page = chunk.get('page', meta.get('page_number', meta.get('page', -1)))
+    return _chunk_text(item), source, int(page) if isinstance(page, (int, np.integer)) else -1
+
+
+def _manifest_meta(data: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON으로 직렬화 가능한 메타 정보만 추출"""
+    meta = {}
+    for key, value in data.items():
+        if key in _BULK_KEYS:
+            continue
+        if isinstance(value, np.generic):
+            value = value.item()
+        try:
+            json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            continue
+        meta[key] = value
+    return meta
+
+
+class VectorStore:
+    """스키마가 정규화된 컬럼형 벡터스토어
+
+    빌더마다 다른 PKL 구조(chunks/documents/texts/metadatas)를 로드 시 한 번만 변환하여
+    검색 경로에서는 형태 분기 없이 아래 컬럼만 사용합니다.
+    임베딩은 로드 시 L2 정규화되어(meta['normalized']) 내적이 곧 코사인 유사도이므로,
+    정규화된 쿼리 벡터와 GEMV 한 번으로 점수를 구하고 저장소 간 점수를 그대로 비교할 수 있습니다.
+
+    Attributes:
+        embeddings: (N, D) 연속 float32 행렬
+        texts: 길이 N 텍스트 시퀀스 (UTF-8 블롭, 접근 시 디코딩)
+        source_ids: (N,) int32, sources 목록의 인덱스
+        pages: (N,) int32 페이지 번호 (없으면 -1)
+        sources: 소스 이름 목록
+        meta: 모델명, 생성일시 등 메타 정보
+        scales: int8 양자화 시 차원별 스케일 (그 외에는 None)
+    """
+
+    def __init__(self, embeddings: np.ndarray, texts: Sequence,
+                 source_ids: Optional[np.ndarray] = None, pages: Optional[np.ndarray] = None,
+                 sources: Optional[List[str]] = None, meta: Optional[Dict[str, Any]] = None,
+                 path: Optional[str] = None, scales: Optional[np.ndarray] = None):
+        count = len(texts)
+        self.embeddings = embeddings
+        self.scales = scales
+        self.texts = texts
+        self.source_ids = source_ids if source_ids is not None else np.zeros(count, dtype=np.int32)
+        self.pages = pages if pages is not None else np.full(count, -1, dtype=np.int32)
+        self.sources = sources if sources is not None else ['']
+        self.meta = meta or {}
+        self.path = path
+        self._dense = None  # 작은 양자화 저장소의 float32 사본 (_dense_view)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __repr__(self) -> str:
+        return f"VectorStore(chunks={len(self)}, dimension={self.dimension}, model={self.model_name!r})"
+
+    @property
+    def dimension(self) -> int:
+        return int(self.embeddings.shape[1]) if self.embeddings.ndim == 2 else 0
+
+    @property
+    def model_name(self) -> str:
+        return self.meta.get('model_name', DEFAULT_MODEL_NAME)
+
+    @property
+    def embedding_dtype(self) -> str:
+        return 'int8' if self.scales is not None else str(self.embeddings.dtype)
+
+    @property
+    def store_dir(self) -> Optional[str]:
+        """색인 등 부가 파일을 둘 컬럼형 저장소 디렉터리 (없으면 None)"""
+        if not self.path:
+            return None
+        store_dir = self.path if is_store_dir(self.path) else store_dir_for(self.path)
+        return store_dir if is_store_dir(store_dir) else None
+
+    def source(self, idx: int) -> str:
+        """청크의 소스 이름"""
+        return self.sources[self.source_ids[idx]]
+
+    def dense_embeddings(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """행 범위의 임베딩을 float32로 복원"""
+        block = np.asarray(self.embeddings[start:stop], dtype=np.float32)
+        return block * self.scales if self.scales is not None else block
+
+    def _dense_view(self) -> Optional[np.ndarray]:
+        """양자화 저장소의 float32 사본 (DENSE_VIEW_MAX_BYTES 이하일 때만 한 번 복원해 재사용, 크면 None)"""
+        if self._dense is None and len(self) * self.dimension * 4 <= DENSE_VIEW_MAX_BYTES:
+            self._dense = np.ascontiguousarray(self.dense_embeddings())
+        return self._dense
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """쿼리 벡터(Q, D)와 전체 청크의 내적 (Q, N)
+
+        작은 float16/int8 저장소는 한 번 복원한 float32 사본과 GEMM 한 번으로 계산하고,
+        큰 저장소는 블록 단위로 복원하며 계산하므로 float32 사본을 만들지 않습니다.
+        int8은 스케일을 쿼리 쪽에 곱해 (q * s) · e_int8 으로 계산합니다.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.embeddings.dtype == np.float32:
+            return queries @ self.embeddings.T
+        dense = self._dense_view()
+        if dense is not None:
+            return queries @ dense.T
+
+        if self.scales is not None:
+            queries = queries * self.scales
+        out = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            out[:, start:start + len(block)] = queries @ block.T
+        return out
+
+    def row_scores(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """쿼리 벡터(Q, D)와 일부 청크의 내적 (Q, len(rows)) - 근사 색인 후보의 정확한 점수용"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows = np.asarray(rows, dtype=np.intp)
+        if self.embeddings.dtype != np.float32 and self._dense_view() is not None:
+            return queries @ self._dense[rows].T
+        block = np.asarray(self.embeddings[rows], dtype=np.float32)
+        if self.scales is not None:
+            queries = queries * self.scales
+        return queries @ block.T
+
+    def record(self, idx: int, score: float = 0.0) -> ChunkRecord:
+        """청크 한 건의 지연 레코드"""
+        return ChunkRecord(self, idx, score)
+
+    def top_records(self, scores: np.ndarray, k: int, min_score: Optional[float] = None) -> List[ChunkRecord]:
+        """1차원 점수 배열에서 상위 k개 레코드 (텍스트는 아직 디코딩하지 않음)"""
+        scores = np.asarray(scores).ravel()
+        candidates = np.arange(len(scores)) if min_score is None else np.flatnonzero(scores >= min_score)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [ChunkRecord(self, idx, scores[idx]) for idx in candidates]
+
+    def quantized(self, dtype: str) -> 'VectorStore':
+        """임베딩만 양자화한 새 저장소 (텍스트 등 나머지 컬럼은 공유)"""
+        embeddings, scales = quantize_embeddings(self.dense_embeddings(), dtype)
+        return VectorStore(embeddings, self.texts, self.source_ids, self.pages, self.sources,
+                           dict(self.meta), self.path, scales)
+
+    @classmethod
+    def from_columns(cls, embeddings: np.ndarray, texts: List[str],
+                     sources: Optional[List[str]] = None, pages: Optional[List[int]] = None,
+                     meta: Optional[Dict[str, Any]] = None, path: Optional[str] = None) -> 'VectorStore':
+        """청크별 소스 이름/페이지 목록으로부터 생성 (임베딩은 연속 float32 사본으로 정규화)"""
+        embeddings = np.array(embeddings, dtype=np.float32, order='C')
+        if embeddings.ndim != 2:
+            embeddings = embeddings.reshape(len(texts), -1)
+        normalize_rows(embeddings)
+        meta = dict(meta or {})
+        meta['normalized'] = True
+        if len(embeddings) != len(texts):
+            raise ValueError(f"임베딩 {embeddings.shape}와 텍스트 {len(texts)}개의 크기가 맞지 않습니다.")
+
+        sources = sources if sources is not None else [''] * len(texts)
+        source_table = list(dict.fromkeys(sources)) or ['']
+        source_index = {name: i for i, name in enumerate(source_table)}
+        source_ids = np.fromiter((source_index[name] for name in sources), dtype=np.int32, count=len(sources))
+        pages = np.asarray(pages if pages is not None else [-1] * len(texts), dtype=np.int32)
+
+        if not isinstance(texts, TextBlob):
+            texts = TextBlob.from_texts(list(texts))
+        return cls(embeddings, texts, source_ids, pages, source_table, meta, path)
+
+    @classmethod
+    def from_legacy(cls, data: Dict[str, Any], path: Optional[str] = None) -> 'VectorStore':
+        """기존 PKL dict(chunks/documents/texts/metadatas 변형)를 한 번에 변환"""
+        embeddings = np.asarray(data.get('embeddings', np.zeros((0, 0))), dtype=np.float32)
+        metadatas = data.get('metadatas') or []
+
+        if data.get('chunks'):
+            items = data['chunks']
+        elif data.get('documents'):
+            items = data['documents']
+        else:
+            items = data.get('texts') or []
+
+        texts, sources, pages = [], [], []
+        for i, item in enumerate(items):
+            meta = metadatas[i] if i < len(metadatas) and isinstance(metadatas[i], dict) else {}
+            text, source, page = _chunk_columns(item, meta)
+            texts.append(text)
+            sources.append(source)
+            pages.append(page)
+
+        # embeddings와 텍스트 길이가 다르면 짧은 쪽에 맞춤
+        count = min(len(embeddings), len(texts))
+        return cls.from_columns(embeddings[:count], texts[:count], sources[:count], pages[:count],
+                                _manifest_meta(data), path)
+
+    @classmethod
+    def open(cls, store_dir: str) -> 'VectorStore':
+        """컬럼형 저장소 디렉터리를 mmap으로 열기"""
+        manifest = read_manifest(store_dir)
+
+        embeddings = np.load(os.path.join(store_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        offsets = np.load(os.path.join(store_dir, OFFSETS_FILE), mmap_mode='r')
+        source_ids = np.load(os.path.join(store_dir, SOURCE_IDS_FILE), mmap_mode='r')
+        pages = np.load(os.path.join(store_dir, PAGES_FILE), mmap_mode='r')
+
+        texts_path = os.path.join(store_dir, TEXTS_FILE)
+        if os.path.getsize(texts_path) > 0:
+            blob = np.memmap(texts_path, dtype=np.uint8, mode='r')
+        else:
+            blob = np.zeros(0, dtype=np.uint8)
+
+        scales = None
+        if manifest.get('embedding_dtype') == 'int8':
+            scales = np.load(os.path.join(store_dir, SCALES_FILE))
+
+        if not manifest.get('normalized'):
+            # 정규화 플래그가 없는 저장소는 메모리 사본을 만들어 한 번만 정규화
+            dense = np.array(embeddings, dtype=np.float32, order='C')
+            embeddings = normalize_rows(dense * scales if scales is not None else dense)
+            scales = None
+            manifest['normalized'] = True
+
+        return cls(embeddings, TextBlob(blob, offsets), source_ids, pages,
+                   manifest.pop('sources', ['']), manifest, store_dir, scales)
+
+    def save(self, out_dir: str, embedding_dtype: Optional[str] = None,
+             source_signature: Optional[Dict[str, int]] = None) -> str:
+        """컬럼형 저장소 디렉터리 작성 (임시 디렉터리에 쓴 뒤 교체)
+
+        Args:
+            out_dir: 저장 디렉터리
+            embedding_dtype: 'float32', 'float16', 'int8' 중 하나 (None이면 현재 타입 유지)
+            source_signature: 변환 원본 PKL의 pickle_signature (읽기 전에 구한 값, 최신 여부 판단용)
+        """
+        store = self.quantized(embedding_dtype) if embedding_dtype and embedding_dtype != self.embedding_dtype else self
+        texts = self.texts
+
+        manifest = dict(self.meta)
+        manifest.update({
+            'format_version': FORMAT_VERSION,
+            'count': len(self),
+            'dimension': self.dimension,
+            'embedding_dtype': store.embedding_dtype,
+            'sources': list(self.sources),
+            'text_bytes': int(texts.offsets[-1]),
+        })
+        manifest.pop(SOURCE_PICKLE_KEY, None)
+        if source_signature:
+            manifest[SOURCE_PICKLE_KEY] = source_signature
+
+        # 프로세스마다 고유한 임시 디렉터리에 쓴 뒤 교체 (같은 PKL을 동시에 변환해도 서로 지우지 않음)
+        out_dir = out_dir.rstrip('/\\')
+        parent = os.path.dirname(os.path.abspath(out_dir))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(out_dir) + '.tmp-', dir=parent)
+        os.chmod(tmp_dir, 0o755)  # mkdtemp는 소유자 전용(0700)으로 만듦
+        try:
+            self._write_store_dir(store, texts, manifest, tmp_dir, out_dir)
+            _publish_store_dir(tmp_dir, out_dir, source_signature)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return out_dir
+
+    def _write_store_dir(self, store: 'VectorStore', texts: TextBlob, manifest: Dict[str, Any],
+                         tmp_dir: str, out_dir: str) -> None:
+        np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE), np.ascontiguousarray(store.embeddings))
+        if store.scales is not None:
+            np.save(os.path.join(tmp_dir, SCALES_FILE), store.scales)
+        np.save(os.path.join(tmp_dir, OFFSETS_FILE), np.asarray(texts.offsets, dtype=np.int64))
+        np.save(os.path.join(tmp_dir, SOURCE_IDS_FILE), np.asarray(self.source_ids, dtype=np.int32))
+        np.save(os.path.join(tmp_dir, PAGES_FILE), np.asarray(self.pages, dtype=np.int32))
+        with open(os.path.join(tmp_dir, TEXTS_FILE), 'wb') as f:
+            f.write(texts.blob.tobytes())
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 키워드 검색용 BM25 역색인과 청크 특징 컬럼도 저장소와 함께 저장
+        from keyword_index import KeywordIndex
+        from chunk_features import ChunkFeatures
+        KeywordIndex.build(texts).save(tmp_dir)
+        ChunkFeatures.build(texts).save(tmp_dir)
+
+        _copy_query_bank(out_dir, tmp_dir)
+        if os.path.exists(out_dir):
+            # 기존 밀집 검색 색인은 새 임베딩에 맞지 않으므로 같은 백엔드/파라미터로 다시 생성 (빠뜨리면 조용히 전수 내적으로 바뀜)
+            from vector_index import rebuild_saved_index
+            rebuild_saved_index(out_dir, tmp_dir)
+
+
+def _copy_query_bank(out_dir: str, tmp_dir: str) -> None:
+    """쿼리 임베딩 뱅크는 텍스트와 무관하므로 재저장 시 유지 (모델 일치 여부는 로드 시 확인)"""
+    if not os.path.exists(out_dir):
+        return
+    from query_bank import QUERY_BANK_FILE, QUERY_BANK_MANIFEST_FILE
+    for name in (QUERY_BANK_FILE, QUERY_BANK_MANIFEST_FILE):
+        try:
+            shutil.copy2(os.path.join(out_dir, name), os.path.join(tmp_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+class StoreWriter:
+    """배치 단위로 청크를 추가하며 컬럼형 저장소를 작성
+
+    임베딩과 텍스트를 배치마다 임시 디렉터리의 파일에 이어 쓰므로 PKL dict나 전체 임베딩 행렬을 메모리에 두지 않습니다.
+    BM25 포스팅과 특징 컬럼도 배치별로 누적하고, close()에서 임베딩 파일을 .npy로 옮긴 뒤 저장소를 게시합니다.
+
+        with StoreWriter(store_dir_for(output_path), meta) as writer:
+            for batch_embeddings, batch_chunks in batches:
+                writer.add_chunks(batch_embeddings, batch_chunks)
+    """
+
+    _RAW_EMBEDDINGS_FILE = 'embeddings.f32'
+
+    def __init__(self, out_dir: str, meta: Optional[Dict[str, Any]] = None,
+                 embedding_dtype: str = 'float32', source_path: Optional[str] = None):
+        """
+        Args:
+            out_dir: 저장 디렉터리
+            meta: 매니페스트에 기록할 메타 정보 (close 전까지 writer.meta로 갱신 가능)
+            embedding_dtype: 'float32', 'float16', 'int8' 중 하나
+            source_path: 같은 내용으로 함께 쓴 PKL (close 시점의 서명을 기록)
+        """
+        from keyword_index import KeywordIndexBuilder
+        if embedding_dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"지원하지 않는 임베딩 타입: {embedding_dtype} ({', '.join(EMBEDDING_DTYPES)})")
+
+        self.out_dir = out_dir.rstrip('/\\')
+        self.meta = dict(meta or {})
+        self.embedding_dtype = embedding_dtype
+        self.source_path = source_path
+        self.count = 0
+        self.dimension = None
+
+        parent = os.path.dirname(os.path.abspath(self.out_dir))
+        os.makedirs(parent, exist_ok=True)
+        self._tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(self.out_dir) + '.tmp-', dir=parent)
+        os.chmod(self._tmp_dir, 0o755)  # mkdtemp는 소유자 전용(0700)으로 만듦
+        self._embeddings_file = open(os.path.join(self._tmp_dir, self._RAW_EMBEDDINGS_FILE), 'wb')
+        self._texts_file = open(os.path.join(self._tmp_dir, TEXTS_FILE), 'wb')
+        self._offsets = [np.zeros(1, dtype=np.int64)]
+        self._source_ids = []
+        self._pages = []
+        self._source_index = {}
+        self._keyword_builder = KeywordIndexBuilder()
+        self._feature_parts = []
+        self._closed = False
+
+    def __enter__(self) -> 'StoreWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, embeddings: np.ndarray, texts: List[str],
+            sources: Optional[List[str]] = None, pages: Optional[List[int]] = None) -> None:
+        """청크 배치 추가 (임베딩은 L2 정규화해 float32로 이어 씀)"""
+        block = np.array(embeddings, dtype=np.float32, order='C').reshape(len(texts), -1)
+        if self.dimension is None and len(texts):
+            self.dimension = block.shape[1]
+        if len(texts) and block.shape[1] != self.dimension:
+            raise ValueError(f"임베딩 차원이 다릅니다: {block.shape[1]} (기존 {self.dimension})")
+        normalize_rows(block)
+        self._embeddings_file.write(block.tobytes())
+
+        encoded = [text.encode('utf-8') for text in texts]
+        self._texts_file.write(b''.join(encoded))
+        self._offsets.append(int(self._offsets[-1][-1]) + np.cumsum([len(b) for b in encoded], dtype=np.int64))
+
+        sources = sources if sources is not None else [''] * len(texts)
+        self._source_ids.append(np.array([self._source_index.setdefault(name, len(self._source_index))
+                                          for name in sources], dtype=np.int32))
+        self._pages.append(np.asarray(pages if pages is not None else [-1] * len(texts), dtype=np.int32))
+
+        from chunk_features import ChunkFeatures
+        self._keyword_builder.add(texts)
+        self._feature_parts.append(ChunkFeatures.build(texts))
+        self.count += len(texts)
+
+    def add_chunks(self, embeddings: np.ndarray, chunks: List[Any],
+                   metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """빌더의 청크 dict(또는 문자열) 배치 추가 - 텍스트/소스/페이지는 from_legacy와 같은 규칙으로 추출"""
+        metadatas = metadatas or []
+        columns = [_chunk_columns(item, metadatas[i] if i < len(metadatas) and isinstance(metadatas[i], dict) else {})
+                   for i, item in enumerate(chunks)]
+        self.add(embeddings, [text for text, _, _ in columns],
+                 [source for _, source, _ in columns], [page for _, _, page in columns])
+
+    def close(self) -> str:
+        """임베딩을 .npy로 옮기고 색인/매니페스트를 쓴 뒤 저장소를 게시하고 경로 반환"""
+        if self._closed:
+            return self.out_dir
+        from chunk_features import ChunkFeatures
+        try:
+            self._embeddings_file.close()
+            self._texts_file.close()
+            self._write_embeddings()
+
+            offsets = np.concatenate(self._offsets)
+            np.save(os.path.join(self._tmp_dir, OFFSETS_FILE), offsets)
+            np.save(os.path.join(self._tmp_dir, SOURCE_IDS_FILE),
+                    np.concatenate(self._source_ids) if self._source_ids else np.zeros(0, dtype=np.int32))
+            np.save(os.path.join(self._tmp_dir, PAGES_FILE),
+                    np.concatenate(self._pages) if self._pages else np.zeros(0, dtype=np.int32))
+
+            signature = pickle_signature(self.source_path) if self.source_path and os.path.exists(self.source_path) else None
+            manifest = _manifest_meta(self.meta)
+            manifest.update({
+                'normalized': True,
+                'format_version': FORMAT_VERSION,
+                'count': self.count,
+                'dimension': self.dimension or 0,
+                'embedding_dtype': self.embedding_dtype,
+                'sources': list(self._source_index) or [''],
+                'text_bytes': int(offsets[-1]),
+            })
+            manifest.pop(SOURCE_PICKLE_KEY, None)
+            if signature:
+                manifest[SOURCE_PICKLE_KEY] = signature
+            with open(os.path.join(self._tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            # 키워드 색인과 특징 컬럼은 배치별로 누적한 결과만 저장 (텍스트를 다시 읽지 않음)
+            self._keyword_builder.finish().save(self._tmp_dir)
+            ChunkFeatures.concatenate(self._feature_parts).save(self._tmp_dir)
+            _copy_query_bank(self.out_dir, self._tmp_dir)
+            _publish_store_dir(self._tmp_dir, self.out_dir, signature)
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+        return self.out_dir
+
+    def abort(self) -> None:
+        """작성 중인 임시 디렉터리 삭제 (게시하지 않음)"""
+        self._closed = True
+        self._embeddings_file.close()
+        self._texts_file.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def _write_embeddings(self) -> None:
+        """이어 쓴 float32 임베딩을 블록 단위로 양자화하며 embeddings.npy로 옮기기"""
+        raw_path = os.path.join(self._tmp_dir, self._RAW_EMBEDDINGS_FILE)
+        out_path = os.path.join(self._tmp_dir, EMBEDDINGS_FILE)
+        shape = (self.count, self.dimension or 0)
+        dtype = np.dtype(self.embedding_dtype)
+        if self.count == 0:
+            np.save(out_path, np.zeros(shape, dtype=dtype))
+            os.remove(raw_path)
+            return
+
+        raw = np.memmap(raw_path, dtype=np.float32, mode='r', shape=shape)
+        scales = None
+        if self.embedding_dtype == 'int8':
+            # quantize_embeddings와 같은 차원별 스케일 (최대 절댓값/127)
+            scales = np.zeros(shape[1], dtype=np.float32)
+            for start in range(0, self.count, SCORE_BLOCK_ROWS):
+                np.maximum(scales, np.abs(raw[start:start + SCORE_BLOCK_ROWS]).max(axis=0), out=scales)
+            scales = np.where(scales > 0, scales / 127.0, 1.0).astype(np.float32)
+            np.save(os.path.join(self._tmp_dir, SCALES_FILE), scales)
+
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype, shape=shape)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            block = raw[start:start + SCORE_BLOCK_ROWS]
+            if scales is not None:
+                block = np.clip(np.rint(block / scales), -127, 127)
+            out[start:start + len(block)] = block
+        out.flush()
+        del out, raw
+        os.remove(raw_path)
+
+
+def _publish_store_dir(tmp_dir: str, out_dir: str, source_signature: Optional[Dict[str, int]]) -> None:
+    """작성을 마친 임시 디렉터리를 저장소 위치로 교체
+
+    같은 PKL을 동시에 변환한 다른 프로세스가 이미 최신 저장소를 게시했으면 그 결과를 그대로 쓰고 임시 디렉터리는 버립니다.
+    """
+    if source_signature and _store_source(out_dir) == source_signature:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = f"{out_dir}.old-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            os.rename(out_dir, old_dir)
+        except FileNotFoundError:
+            old_dir = None
+    try:
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        # 이름을 옮긴 사이 다른 프로세스가 먼저 게시함 - 같은 PKL에서 만든 것이면 성공으로 처리
+        if not (source_signature and _store_source(out_dir) == source_signature):
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    finally:
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def save_vectorstore_dir(data: Dict[str, Any], out_dir: str, embedding_dtype: str = 'float32',
+                         source_path: Optional[str] = None) -> str:
+    """기존 벡터스토어 dict를 컬럼형 저장소 디렉터리로 저장 (source_path: 같은 내용으로 방금 쓴 PKL)"""
+    signature = pickle_signature(source_path) if source_path and os.path.exists(source_path) else None
+    return VectorStore.from_legacy(data).save(out_dir, embedding_dtype, signature)
+
+
+def convert_pickle_to_store_dir(pkl_path: str, out_dir: Optional[str] = None,
+                                embedding_dtype: str = 'float32') -> str:
+    """PKL 벡터스토어를 컬럼형 저장소 디렉터리로 변환"""
+    signature = pickle_signature(pkl_path)
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    return VectorStore.from_legacy(data).save(out_dir or store_dir_for(pkl_path), embedding_dtype, signature)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """행별 상위 k개 인덱스 (점수 내림차순)"""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+def evaluate_quantization_recall(store: VectorStore, query_vectors: np.ndarray,
+                                 dtypes: Tuple[str, ...] = ('float16', 'int8'),
+                                 ks: Tuple[int, ...] = (1, 5, 10)) -> List[Dict[str, Any]]:
+    """float32 원본 대비 양자화 저장소의 recall@k와 순위 일치율 비교
+
+    Returns:
+        dtype별 {'dtype', 'embedding_bytes', 'recall@k', 'same_ranking@k'} 목록
+    """
+    reference = store if store.embedding_dtype == 'float32' else store.quantized('float32')
+    ref_scores = reference.scores(query_vectors)
+
+    report = [{'dtype': 'float32', 'embedding_bytes': int(reference.embeddings.nbytes)}]
+    for k in ks:
+        report[0][f'recall@{k}'] = 1.0
+        report[0][f'same_ranking@{k}'] = 1.0
+
+    for dtype in dtypes:
+        candidate = reference.quantized(dtype)
+        cand_scores = candidate.scores(query_vectors)
+        row = {'dtype': dtype, 'embedding_bytes': int(candidate.embeddings.nbytes)
+               + (int(candidate.scales.nbytes) if candidate.scales is not None else 0)}
+        for k in ks:
+            ref_top = _top_k(ref_scores, k)
+            cand_top = _top_k(cand_scores, k)
+            overlap = [len(set(r) & set(c)) / len(r) for r, c in zip(ref_top, cand_top)]
+            row[f'recall@{k}'] = float(np.mean(overlap))
+            row[f'same_ranking@{k}'] = float(np.mean(np.all(ref_top == cand_top, axis=1)))
+        report.append(row)
+    return report
+
+
+def read_manifest(store_dir: str) -> Dict[str, Any]:
+    """매니페스트 읽기"""
+    with open(os.path.join(store_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 저장소 버전: {manifest.get('format_version')}")
+    return manifest
+
+
+def _store_source(store_dir: str) -> Optional[Dict[str, int]]:
+    """저장소 매니페스트에 기록된 원본 PKL 서명 (없거나 읽을 수 없으면 None)"""
+    try:
+        return read_manifest(store_dir).get(SOURCE_PICKLE_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_dir_is_fresh(pkl_path: str, store_dir: str) -> bool:
+    if not is_store_dir(store_dir):
+        return False
+    # PKL 없이 디렉터리만 배포한 경우도 허용
+    if not os.path.exists(pkl_path):
+        return True
+    # 변환 당시 PKL의 크기/수정시각이 정확히 같아야 최신 (기록이 없으면 다시 변환)
+    return _store_source(store_dir) == pickle_signature(pkl_path)
+
+
+def vectorstore_exists(path: str) -> bool:
+    """PKL 또는 대응하는 컬럼형 저장소가 존재하는지 확인"""
+    return os.path.exists(path) or is_store_dir(store_dir_for(path))
+
+
+def load_vectorstore(path: str, auto_convert: bool = False) -> VectorStore:
+    """벡터스토어 로드: 컬럼형 디렉터리가 있으면 mmap으로 열고, 없으면 PKL을 변환
+
+    Args:
+        path: PKL 경로 또는 컬럼형 저장소 디렉터리
+        auto_convert: PKL을 읽은 경우 옆에 컬럼형 저장소를 만들어 두고 mmap으로 다시 열지 여부
+    """
+    if is_store_dir(path):
+        return VectorStore.open(path)
+
+    store_dir = store_dir_for(path)
+    if _store_dir_is_fresh(path, store_dir):
+        return VectorStore.open(store_dir)
+
+    signature = pickle_signature(path)
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    store = data if isinstance(data, VectorStore) else VectorStore.from_legacy(data, path)
+    del data  # chunks/documents/metadatas 원본 객체 해제
+
+    if auto_convert:
+        try:
+            return VectorStore.open(store.save(store_dir, source_signature=signature))
+        except OSError as e:
+            print(f"[WARNING] 컬럼형 저장소 생성 실패, PKL 로드 결과 사용: {e}")
+    return store
+
+
+def _resolve_store_path(path: str) -> str:
+    """실제로 읽게 될 파일 (컬럼형 저장소면 매니페스트, 아니면 PKL)"""
+    if is_store_dir(path):
+        return os.path.join(path, MANIFEST_FILE)
+    store_dir = store_dir_for(path)
+    if _store_dir_is_fresh(path, store_dir):
+        return os.path.join(store_dir, MANIFEST_FILE)
+    return path
+
+
+def _file_probe(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _store_probe(path: str) -> Tuple[Any, ...]:
+    """변경 감지용 (PKL, 컬럼형 저장소 매니페스트)의 파일 상태 - 매니페스트를 읽지 않고 stat만 사용"""
+    if os.path.isdir(path):
+        return (None, _file_probe(os.path.join(path, MANIFEST_FILE)))
+    return (_file_probe(path), _file_probe(os.path.join(store_dir_for(path), MANIFEST_FILE)))
+
+
+class VectorStoreRegistry:
+    """프로세스 전역 벡터스토어 캐시
+
+    요청 경로별로 PKL과 저장소 매니페스트의 파일 상태(inode, 수정시각, 크기)를 함께 기억해
+    조회 시 stat만으로 변경 여부를 확인하고, 파일이 바뀌면 다음 조회 시 다시 로드합니다.
+    로드는 경로별 잠금 아래에서 하므로 서로 다른 저장소는 동시에 로드되고 캐시 적중은 로드를 기다리지 않습니다.
+    """
+
+    def __init__(self, loader=load_vectorstore):
+        self.loader = loader
+        self._stores = {}  # 절대경로 -> (파일 상태, 저장소)
+        self._load_locks = {}  # 절대경로 -> 로드 잠금
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, name: str, probe: Tuple[Any, ...]) -> Optional[VectorStore]:
+        with self._lock:
+            entry = self._stores.get(name)
+            if entry is not None and entry[0] == probe:
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def get(self, path: str) -> VectorStore:
+        """저장소 조회 (없거나 파일이 바뀌었으면 로드)"""
+        name = os.path.abspath(path)
+        store = self._cached(name, _store_probe(path))
+        if store is not None:
+            return store
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            # 기다리는 동안 다른 스레드가 같은 저장소를 로드했으면 그 결과 사용
+            store = self._cached(name, _store_probe(path))
+            if store is not None:
+                return store
+
+            store = self.loader(path)
+            # 파일 상태는 로드 후에 구함 (PKL을 자동 변환했으면 새 컬럼형 저장소 기준)
+            probe = _store_probe(path)
+            with self._lock:
+                self._stores[name] = (probe, store)
+                self.misses += 1
+            return store
+
+    def evict(self, path: Optional[str] = None) -> int:
+        """특정 저장소(또는 전체)를 캐시에서 제거하고 제거된 개수 반환"""
+        with self._lock:
+            if path is None:
+                count = len(self._stores)
+                self._stores.clear()
+                return count
+            return 1 if self._stores.pop(os.path.abspath(path), None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 적중 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'loaded': list(self._stores.keys()),
+            }
+
+
+def _load_and_cache(path: str) -> VectorStore:
+    # 공유 메모리 데몬이 게시한 저장소가 있으면 복사 없이 연결
+    from shared_store import shared_stores_enabled, attach_shared_store
+    store = None
+    if shared_stores_enabled():
+        try:
+            store = attach_shared_store(path)
+        except Exception as e:
+            print(f"[WARNING] 공유 메모리 연결 실패, 직접 로드: {e}")
+            store = None
+    if store is None:
+        store = load_vectorstore(path, auto_convert=True)
+
+    # 고정 검색 쿼리 임베딩을 캐시에 등록
+    from query_bank import load_query_bank
+    try:
+        load_query_bank(store)
+    except Exception as e:
+        print(f"[WARNING] 쿼리 임베딩 뱅크 로드 실패: {e}")
+    return store
+
+
+# PKL은 최초 1회만 역직렬화하고 이후 프로세스는 mmap으로 엽니다.
+_registry = VectorStoreRegistry(loader=_load_and_cache)
+
+
+def get_vectorstore_registry() -> VectorStoreRegistry:
+    """프로세스 전역 벡터스토어 레지스트리"""
+    return _registry
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PKL 벡터스토어를 컬럼형 저장소로 변환")
+    parser.add_argument('pkl_files', nargs='+')
+    parser.add_argument('--dtype', choices=EMBEDDING_DTYPES, default='float32', help="임베딩 저장 타입")
+    args = parser.parse_args()
+
+    for pkl_file in args.pkl_files:
+        out = convert_pickle_to_store_dir(pkl_file, embedding_dtype=args.dtype)
+        print(f"[INFO] 변환 완료: {pkl_file} → {out} ({args.dtype})")
@@ -5,19 +5,17 @@
 PKL 파일의 내용을 쉽게 확인할 수 있는 도구
 """
 
-import pickle
 import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import datetime
 import re
+from vector_store import get_vectorstore_registry
 
 def load_vectorstore_data(pkl_path):
-    """벡터스토어 데이터 로드"""
+    """벡터스토어 데이터 로드 (재실행 시에도 프로세스 캐시 재사용)"""
     try:
-        with open(pkl_path, 'rb') as f:
-            data = pickle.load(f)
-        return data
+        return get_vectorstore_registry().get(pkl_path)
     except Exception as e:
         st.error(f"벡터스토어 로드 실패: {str(e)}")
         return None
@@ -54,16 +52,16 @@ def main():
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("총 문서 수", len(data.get('documents', [])))
+        st.metric("총 문서 수", len(data))
 
     with col2:
-        st.metric("임베딩 차원", data.get('embedding_dimension', 'N/A'))
+        st.metric("임베딩 차원", data.dimension)
 
     with col3:
-        st.metric("모델", data.get('model_name', 'N/A'))
+        st.metric("모델", data.model_name)
 
     with col4:
-        created_at = data.get('created_at', 'N/A')
+        created_at = data.meta.get('created_at', 'N/A')
         if created_at != 'N/A':
             try:
                 dt = datetime.fromisoformat(created_at)
@@ -80,9 +78,7 @@ def main():
     with tab1:
         st.header("📄 문서 목록")
 
-        documents = data.get('documents', [])
-        metadatas = data.get('metadatas', [])
-        chunks = data.get('chunks', [])
+        documents = data.texts
 
         if not documents:
             st.warning("문서가 없습니다.")
@@ -108,8 +104,13 @@ def main():
                 doc_text = clean_text_for_display(documents[i])
 
                 # 메타데이터 정보
-                if i < len(metadatas) and metadatas[i]:
-                    metadata = metadatas[i]
+                metadata = {}
+                if data.source(i):
+                    metadata['source'] = data.source(i)
+                if data.pages[i] >= 0:
+                    metadata['page'] = int(data.pages[i])
+
+                if metadata:
                     col1, col2 = st.columns([1, 3])
 
                     with col1:
@@ -131,7 +132,7 @@ def main():
         search_type = st.selectbox("검색 방식", ["단어 포함", "정규식"])
 
         if search_query:
-            documents = data.get('documents', [])
+            documents = data.texts
             results = []
 
             with st.spinner("검색 중..."):
@@ -183,8 +184,7 @@ def main():
     with tab3:
         st.header("📊 통계 정보")
 
-        documents = data.get('documents', [])
-        embeddings = data.get('embeddings', np.array([]))
+        documents = data.texts
 
         if documents:
             # 문서 길이 통계
@@ -248,16 +248,15 @@ def main():
         st.header("🔧 디버그 정보")
 
         st.subheader("📋 데이터 구조")
-        st.code(f"키 목록: {list(data.keys())}")
+        st.code(f"메타 정보 키: {list(data.meta.keys())}")
+        st.code(f"texts: {type(data.texts)} (길이: {len(data.texts)})")
+        st.code(f"sources: {data.sources}")
 
-        for key, value in data.items():
-            if key in ['documents', 'embeddings', 'chunks']:
-                st.code(f"{key}: {type(value)} (길이: {len(value)})")
-            else:
-                st.code(f"{key}: {type(value)} = {value}")
+        for key, value in data.meta.items():
+            st.code(f"{key}: {type(value)} = {value}")
 
         # 임베딩 정보
-        embeddings = data.get('embeddings', np.array([]))
+        embeddings = data.embeddings
         if len(embeddings) > 0:
             st.subheader("🧮 임베딩 정보")
             st.code(f"Shape: {embeddings.shape}")
@@ -268,11 +267,11 @@ def main():
         st.subheader("🔍 원시 데이터 샘플")
 
         if st.button("첫 번째 문서 원시 데이터 보기"):
-            if data.get('documents'):
-                st.code(repr(data['documents'][0]))
+            if len(data) > 0:
+                st.code(repr(data.texts[0]))
 
         if st.button("전체 데이터 구조 보기"):
-            st.json({k: str(type(v)) for k, v in data.items()})
+            st.json({k: str(type(v)) for k, v in vars(data).items()})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file